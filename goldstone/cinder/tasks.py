@@ -15,6 +15,7 @@
 from __future__ import absolute_import
 import logging
 from goldstone.celery import app as celery_app
+from goldstone.models import BulkWriter
 from goldstone.utils import to_es_date
 from .models import ServicesData, VolumesData, BackupsData, SnapshotsData, \
     VolTypesData, EncryptionTypesData, TransfersData
@@ -22,7 +23,7 @@ from .models import ServicesData, VolumesData, BackupsData, SnapshotsData, \
 logger = logging.getLogger(__name__)
 
 
-def _update_cinder_records(rec_type, region, database, items):
+def _update_cinder_records(rec_type, region, database, items, writer=None):
     """Post a cinder record to Elasticsearch
 
     Construct the JSON body and attempt to index a new document into the
@@ -34,7 +35,7 @@ def _update_cinder_records(rec_type, region, database, items):
             "region": region,
             rec_type: [item.__dict__['_info'] for item in items]}
     try:
-        database.post(body)
+        database.post(body, writer=writer)
     except Exception:             # pylint: disable=W0703
         logger.exception("failed to index cinder %s", rec_type)
 
@@ -54,17 +55,19 @@ def discover_cinder_topology():
     cinderclient = cinder_access['client']
     reg = cinder_access['region']
 
-    _update_cinder_records("services", reg, ServicesData(),
-                           cinderclient.services.list())
-    _update_cinder_records("volumes", reg, VolumesData(),
-                           cinderclient.volumes.list())
-    _update_cinder_records("backups", reg, BackupsData(),
-                           cinderclient.backups.list())
-    _update_cinder_records("snapshots", reg, SnapshotsData(),
-                           cinderclient.volume_snapshots.list())
-    _update_cinder_records("volume_types", reg, VolTypesData(),
-                           cinderclient.volume_types.list())
-    _update_cinder_records("encryption_types", reg, EncryptionTypesData(),
-                           cinderclient.volume_encryption_types.list())
-    _update_cinder_records("transfers", reg, TransfersData(),
-                           cinderclient.transfers.list())
+    with BulkWriter() as writer:
+        _update_cinder_records("services", reg, ServicesData(),
+                               cinderclient.services.list(), writer)
+        _update_cinder_records("volumes", reg, VolumesData(),
+                               cinderclient.volumes.list(), writer)
+        _update_cinder_records("backups", reg, BackupsData(),
+                               cinderclient.backups.list(), writer)
+        _update_cinder_records("snapshots", reg, SnapshotsData(),
+                               cinderclient.volume_snapshots.list(), writer)
+        _update_cinder_records("volume_types", reg, VolTypesData(),
+                               cinderclient.volume_types.list(), writer)
+        _update_cinder_records("encryption_types", reg, EncryptionTypesData(),
+                               cinderclient.volume_encryption_types.list(),
+                               writer)
+        _update_cinder_records("transfers", reg, TransfersData(),
+                               cinderclient.transfers.list(), writer)
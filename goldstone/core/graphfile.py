@@ -0,0 +1,756 @@
+"""The memory-mapped resource graph file that web workers share."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import cPickle
+import logging
+import mmap
+import struct
+
+from .graphstore import GraphNode, NodeIndexes
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    """Return a node's uuid, native id or name, or an attribute id, as the
+    bytes that a MappedGraph stores and searches.
+
+    Strings are stored as UTF-8, so that equal str and unicode values are
+    found by each other, as they are in a dict. Other values are pickled. The
+    first byte tells the two apart.
+
+    :param value: The value
+    :type value: str, unicode, or any picklable value
+    :rtype: str
+
+    """
+
+    if isinstance(value, unicode):
+        return "s" + value.encode("utf-8")
+    elif isinstance(value, str):
+        return "s" + value
+
+    return "p" + cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+
+
+def _decode_value(data):
+    """Return the value that _encode_value() encoded."""
+
+    if data[0] == "s":
+        return data[1:].decode("utf-8")
+
+    return cPickle.loads(data[1:])
+
+
+class MappedNode(GraphNode):
+    """A MappedGraph node.
+
+    Its fields are read from the graph's file when they're used, so a worker
+    holds only the nodes that it's using. The fields are read-only, and
+    attributes returns a new dict on each use.
+
+    """
+
+    def __init__(self, graph, index):           # pylint: disable=W0231
+        """Initialize the object.
+
+        :param graph: The node's graph
+        :type graph: MappedGraph
+        :param index: The node's position in the graph's file
+        :type index: int
+
+        """
+
+        self.graph = graph
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, MappedNode) and \
+            self.graph is other.graph and \
+            self.index == other.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def uuid(self):
+        """Return this node's Goldstone UUID."""
+
+        return self.graph.node_field(self.index, MappedGraph.UUID)
+
+    @property
+    def resourcetype(self):
+        """Return this node's Resource Type."""
+
+        return self.graph.node_field(self.index, MappedGraph.TYPE)
+
+    @property
+    def native_id(self):
+        """Return this node's cloud id."""
+
+        return self.graph.node_field(self.index, MappedGraph.NATIVE_ID)
+
+    @property
+    def native_name(self):
+        """Return this node's cloud name."""
+
+        return self.graph.node_field(self.index, MappedGraph.NATIVE_NAME)
+
+    @property
+    def attributes(self):
+        """Return this node's cloud attributes."""
+
+        return self.graph.node_field(self.index, MappedGraph.ATTRIBUTES)
+
+
+class MappedGraph(object):             # pylint: disable=R0902,R0904
+    """A read-only resource instance graph, in a file that's memory-mapped.
+
+    Every web worker that maps the same file shares one copy of the graph in
+    the OS's page cache. So the graph's memory doesn't grow with the number
+    of workers, and a worker's memory doesn't grow with the size of the
+    graph.
+
+    The file holds:
+
+        - A pool of byte strings: the nodes' uuids, native ids and names, and
+          the pickled node attributes, edge attributes, and resource types.
+          Equal strings are stored once.
+        - The resource types. Each type's nodes are adjacent, and in UUID
+          order, so nodes_of_type() reads one range of nodes.
+        - The nodes, as indexes into the pool.
+        - Each node's outgoing and incoming edges, as arrays of (node, edge
+          attributes) pairs. (Compressed sparse row format.)
+        - The nodes in UUID order, each type's nodes in native id order, and
+          the (attribute id, node) pairs in attribute id order. The Instances
+          lookups binary-search these.
+
+    This implements the parts of the networkx MultiDiGraph API that the
+    resource graph's readers use, and the lookups of NodeIndexes. Equal edge
+    attribute dicts are shared, so they must not be modified.
+
+    """
+
+    # The file's magic number and format. Change FORMAT if the format
+    # changes.
+    MAGIC = "GSGRAPH\x00"
+    FORMAT = 1
+
+    # The file header: magic, format, snapshot version, the pool index of the
+    # pickled build time, and the number of pool strings, resource types,
+    # nodes, edges, and attribute id pairs.
+    HEADER = struct.Struct("!8sIQIIIIII")
+
+    # The records and arrays. A type is (pool index, first node, node
+    # count). A node is (type, uuid, native id, native name, attributes),
+    # where all but the type are pool indexes. An edge, and an attribute id
+    # pair, are two indexes.
+    OFFSET = struct.Struct("!Q")
+    INDEX = struct.Struct("!I")
+    PAIR = struct.Struct("!II")
+    TYPE_RECORD = struct.Struct("!III")
+    NODE_RECORD = struct.Struct("!IIIII")
+
+    # The node fields, as positions in a node record.
+    TYPE, UUID, NATIVE_ID, NATIVE_NAME, ATTRIBUTES = range(5)
+
+    # The graph's change counter, for Instances.generation(). A mapped graph
+    # doesn't change.
+    changes = 0
+
+    def __init__(self, mapped):
+        """Initialize the object.
+
+        :param mapped: The graph file's contents
+        :type mapped: mmap.mmap or str
+        :raise: ValueError if the contents aren't a graph in this format
+
+        """
+
+        self._map = mapped
+
+        if len(mapped) < self.HEADER.size:
+            raise ValueError("The graph file is truncated")
+
+        (magic, fileformat, self.version, built, blobs, types, nodes, edges,
+         attribute_ids) = self.HEADER.unpack_from(mapped)
+
+        if magic != self.MAGIC or fileformat != self.FORMAT:
+            raise ValueError("The graph file isn't in format %d" %
+                             self.FORMAT)
+
+        self._counts = {"blobs": blobs,
+                        "types": types,
+                        "nodes": nodes,
+                        "edges": edges,
+                        "attribute_ids": attribute_ids}
+        self._sections = self._layout(blobs, types, nodes, edges,
+                                      attribute_ids)
+
+        # The pool's last offset is the size of its strings.
+        if len(mapped) < self._sections["data"] or \
+                len(mapped) != self._sections["data"] + \
+                self.OFFSET.unpack_from(mapped,
+                                        self._sections["offsets"] +
+                                        blobs * self.OFFSET.size)[0]:
+            raise ValueError("The graph file is truncated")
+
+        self.built = cPickle.loads(self._blob(built))
+
+        # The resource types, and each one's range of nodes.
+        self._types = []
+        self._type_ranges = {}
+
+        for i in xrange(types):
+            blob, first, count = self.TYPE_RECORD.unpack_from(
+                mapped, self._sections["types"] + i * self.TYPE_RECORD.size)
+            nodetype = cPickle.loads(self._blob(blob))
+
+            self._types.append(nodetype)
+            self._type_ranges[nodetype] = (first, count)
+
+        # The edge attribute dicts, by pool index. There are only a few
+        # distinct ones.
+        self._edge_attributes = {}
+
+    @classmethod
+    def _layout(cls, blobs, types, nodes, edges, attribute_ids):
+        """Return the file offset of each section of a graph file.
+
+        :return: Section name -> offset. The "data" section, which holds the
+                 pool's strings, is last.
+        :rtype: dict
+
+        """
+
+        sizes = [("offsets", (blobs + 1) * cls.OFFSET.size),
+                 ("types", types * cls.TYPE_RECORD.size),
+                 ("nodes", nodes * cls.NODE_RECORD.size),
+                 ("out_start", (nodes + 1) * cls.INDEX.size),
+                 ("out_edges", edges * cls.PAIR.size),
+                 ("in_start", (nodes + 1) * cls.INDEX.size),
+                 ("in_edges", edges * cls.PAIR.size),
+                 ("uuid_order", nodes * cls.INDEX.size),
+                 ("native_id_order", nodes * cls.INDEX.size),
+                 ("attribute_ids", attribute_ids * cls.PAIR.size)]
+
+        result = {}
+        position = cls.HEADER.size
+
+        for name, size in sizes:
+            result[name] = position
+            position += size
+
+        result["data"] = position
+        return result
+
+    @classmethod
+    def dumps(cls, graph, built, version):     # pylint: disable=R0914
+        """Return a graph serialized as the contents of a graph file.
+
+        :param graph: A resource instance graph
+        :type graph: networkx.MultiDiGraph
+        :param built: When the graph's data was read from the database
+        :type built: datetime
+        :param version: The snapshot's version
+        :type version: int
+        :rtype: str
+
+        """
+
+        pool = []
+        pool_position = {}
+
+        def add_blob(blob):
+            """Return a string's pool index, adding it to the pool if it's
+            new."""
+
+            if blob not in pool_position:
+                pool_position[blob] = len(pool)
+                pool.append(blob)
+
+            return pool_position[blob]
+
+        def pickled(value):
+            """Return the pool index of a value's pickle."""
+
+            return add_blob(cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL))
+
+        def packed(record, rows):
+            """Return rows of a record format as one string."""
+
+            return "".join(record.pack(*x) for x in rows)
+
+        # Order the types by name, and the nodes by type and then UUID.
+        types = sorted(set(x.resourcetype for x in graph.nodes_iter()),
+                       key=lambda x: (x.__module__, x.__name__))
+        type_position = dict((x, i) for i, x in enumerate(types))
+
+        nodes = sorted(graph.nodes_iter(),
+                       key=lambda x: (type_position[x.resourcetype],
+                                      _encode_value(x.uuid)))
+        node_position = dict((x, i) for i, x in enumerate(nodes))
+
+        counts = {}
+        for node in nodes:
+            counts[node.resourcetype] = counts.get(node.resourcetype, 0) + 1
+
+        type_records = []
+        first = 0
+        for nodetype in types:
+            type_records.append((pickled(nodetype), first, counts[nodetype]))
+            first += counts[nodetype]
+
+        uuids = [_encode_value(x.uuid) for x in nodes]
+        native_ids = [_encode_value(x.native_id) for x in nodes]
+
+        node_records = [(type_position[x.resourcetype],
+                         add_blob(uuids[i]),
+                         add_blob(native_ids[i]),
+                         add_blob(_encode_value(x.native_name)),
+                         pickled(x.attributes))
+                        for i, x in enumerate(nodes)]
+
+        # The adjacency arrays. A node's edges are ordered by their other
+        # node, and then by key.
+        out_start = [0]
+        out_edges = []
+        incoming = [[] for _ in nodes]
+
+        for i, node in enumerate(nodes):
+            edges = sorted(((node_position[dest], key, attributes)
+                            for _, dest, key, attributes
+                            in graph.out_edges_iter(node, keys=True,
+                                                    data=True)),
+                           key=lambda x: (x[0], x[1]))
+
+            for dest, _, attributes in edges:
+                blob = pickled(attributes)
+                out_edges.append((dest, blob))
+                incoming[dest].append((i, blob))
+
+            out_start.append(len(out_edges))
+
+        in_start = [0]
+        in_edges = []
+
+        for edges in incoming:
+            in_edges.extend(edges)
+            in_start.append(len(in_edges))
+
+        # The lookup orders. A type's native id order is within its range.
+        uuid_order = sorted(xrange(len(nodes)), key=lambda x: uuids[x])
+
+        native_id_order = []
+        for _, first, count in type_records:
+            native_id_order.extend(
+                sorted(xrange(first, first + count),
+                       key=lambda x: (native_ids[x], x)))
+
+        attribute_ids = sorted((_encode_value(attribute_id), i)
+                               for i, node in enumerate(nodes)
+                               for attribute_id in
+                               NodeIndexes.attribute_ids(node))
+        attribute_ids = [(add_blob(key), i) for key, i in attribute_ids]
+
+        built_blob = pickled(built)
+
+        offsets = [0]
+        for blob in pool:
+            offsets.append(offsets[-1] + len(blob))
+
+        return "".join([cls.HEADER.pack(cls.MAGIC,
+                                        cls.FORMAT,
+                                        version,
+                                        built_blob,
+                                        len(pool),
+                                        len(types),
+                                        len(nodes),
+                                        len(out_edges),
+                                        len(attribute_ids)),
+                        struct.pack("!%dQ" % len(offsets), *offsets),
+                        packed(cls.TYPE_RECORD, type_records),
+                        packed(cls.NODE_RECORD, node_records),
+                        struct.pack("!%dI" % len(out_start), *out_start),
+                        packed(cls.PAIR, out_edges),
+                        struct.pack("!%dI" % len(in_start), *in_start),
+                        packed(cls.PAIR, in_edges),
+                        struct.pack("!%dI" % len(uuid_order), *uuid_order),
+                        struct.pack("!%dI" % len(native_id_order),
+                                    *native_id_order),
+                        packed(cls.PAIR, attribute_ids)] +
+                       pool)
+
+    @classmethod
+    def load(cls, path):
+        """Return the graph in a file, mapped into memory.
+
+        :param path: The file's path
+        :type path: str
+        :return: The graph, or None if the file is missing or doesn't hold a
+                 graph in this format
+        :rtype: MappedGraph or None
+
+        """
+
+        try:
+            with open(path, "rb") as graph_file:
+                # The mapping stays valid after the file is closed, and after
+                # the file is replaced.
+                mapped = mmap.mmap(graph_file.fileno(),
+                                   0,
+                                   access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError):
+            # The file is missing, unreadable, or empty.
+            return None
+
+        try:
+            return cls(mapped)
+        except (ValueError, struct.error, EOFError, ImportError,
+                AttributeError, cPickle.UnpicklingError):
+            # E.g., the file was truncated, or an add-on's resource type is
+            # gone.
+            logger.warning("Couldn't read the resource graph file %s",
+                           path,
+                           exc_info=True)
+            mapped.close()
+            return None
+
+    ###########################
+    # Reading the file's data #
+    ###########################
+
+    def _blob(self, index):
+        """Return a string from the pool."""
+
+        start = self._sections["offsets"] + index * self.OFFSET.size
+        begin, end = struct.unpack_from("!QQ", self._map, start)
+
+        return self._map[self._sections["data"] + begin:
+                         self._sections["data"] + end]
+
+    def _index(self, section, position):
+        """Return an entry of an index array."""
+
+        return self.INDEX.unpack_from(
+            self._map, self._sections[section] + position * self.INDEX.size)[0]
+
+    def _pair(self, section, position):
+        """Return an entry of a pair array."""
+
+        return self.PAIR.unpack_from(
+            self._map, self._sections[section] + position * self.PAIR.size)
+
+    def _node_record(self, index):
+        """Return a node's record."""
+
+        return self.NODE_RECORD.unpack_from(
+            self._map,
+            self._sections["nodes"] + index * self.NODE_RECORD.size)
+
+    def node_field(self, index, field):
+        """Return a field of a node.
+
+        :param index: The node's position in the file
+        :type index: int
+        :param field: The field, e.g., MappedGraph.UUID
+        :type field: int
+
+        """
+
+        value = self._node_record(index)[field]
+
+        if field == self.TYPE:
+            return self._types[value]
+        elif field == self.ATTRIBUTES:
+            return cPickle.loads(self._blob(value))
+
+        return _decode_value(self._blob(value))
+
+    def _edge_data(self, blob):
+        """Return an edge attribute dict."""
+
+        if blob not in self._edge_attributes:
+            self._edge_attributes[blob] = cPickle.loads(self._blob(blob))
+
+        return self._edge_attributes[blob]
+
+    def _adjacency(self, direction, index):
+        """Yield the (other node, attributes pool index) pairs of a node's
+        outgoing or incoming edges.
+
+        :param direction: "out" or "in"
+        :type direction: str
+        :param index: The node's position in the file
+        :type index: int
+
+        """
+
+        start = self._index(direction + "_start", index)
+        end = self._index(direction + "_start", index + 1)
+
+        for position in xrange(start, end):
+            yield self._pair(direction + "_edges", position)
+
+    @staticmethod
+    def _bisect(count, key_at, target):
+        """Return the first position in [0, count) whose key isn't less than
+        a target, or count."""
+
+        low, high = 0, count
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    ################
+    # networkx API #
+    ################
+
+    @staticmethod
+    def is_directed():
+        """Return True, because the graph is directed."""
+
+        return True
+
+    @staticmethod
+    def is_multigraph():
+        """Return True, because the graph can have parallel edges."""
+
+        return True
+
+    def __len__(self):
+        return self._counts["nodes"]
+
+    def __iter__(self):
+        return self.nodes_iter()
+
+    def __contains__(self, node):
+        return isinstance(node, MappedNode) and node.graph is self
+
+    has_node = __contains__
+
+    def number_of_nodes(self):
+        """Return the number of nodes."""
+
+        return self._counts["nodes"]
+
+    def number_of_edges(self, source=None, dest=None):
+        """Return the number of edges, or of the edges from one node to
+        another."""
+
+        if source is None:
+            return self._counts["edges"]
+
+        return len(self.get_edge_data(source, dest, default={}))
+
+    def nodes_iter(self, data=False):
+        """Yield the nodes, or (node, {}) pairs if data is True."""
+
+        for index in xrange(self._counts["nodes"]):
+            node = MappedNode(self, index)
+            yield (node, {}) if data else node
+
+    def nodes(self, data=False):
+        """Return a list of the nodes."""
+
+        return list(self.nodes_iter(data))
+
+    def _nbunch(self, nbunch):
+        """Return the graph's nodes in an nbunch: None for all the nodes, a
+        node, or an iterable of nodes."""
+
+        if nbunch is None:
+            return self.nodes_iter()
+        elif nbunch in self:
+            return [nbunch]
+
+        return [x for x in nbunch if x in self]
+
+    def out_edges_iter(self, nbunch=None, data=False, keys=False):
+        """Yield the outgoing edges of some nodes, as (source, destination)
+        tuples, plus the key and attributes if they're asked for."""
+
+        for source in self._nbunch(nbunch):
+            seen = {}
+
+            for dest, blob in self._adjacency("out", source.index):
+                key = seen.get(dest, 0)
+                seen[dest] = key + 1
+
+                yield (source, MappedNode(self, dest)) + \
+                    ((key,) if keys else ()) + \
+                    ((self._edge_data(blob),) if data else ())
+
+    def in_edges_iter(self, nbunch=None, data=False, keys=False):
+        """Yield the incoming edges of some nodes, as (source, destination)
+        tuples, plus the key and attributes if they're asked for."""
+
+        for dest in self._nbunch(nbunch):
+            seen = {}
+
+            for source, blob in self._adjacency("in", dest.index):
+                key = seen.get(source, 0)
+                seen[source] = key + 1
+
+                yield (MappedNode(self, source), dest) + \
+                    ((key,) if keys else ()) + \
+                    ((self._edge_data(blob),) if data else ())
+
+    edges_iter = out_edges_iter
+
+    def out_edges(self, nbunch=None, data=False, keys=False):
+        """Return a list of the outgoing edges of some nodes."""
+
+        return list(self.out_edges_iter(nbunch, data, keys))
+
+    def in_edges(self, nbunch=None, data=False, keys=False):
+        """Return a list of the incoming edges of some nodes."""
+
+        return list(self.in_edges_iter(nbunch, data, keys))
+
+    edges = out_edges
+
+    def successors_iter(self, node):
+        """Yield the nodes to which a node has edges."""
+
+        seen = set()
+
+        for dest, _ in self._adjacency("out", node.index):
+            if dest not in seen:
+                seen.add(dest)
+                yield MappedNode(self, dest)
+
+    def predecessors_iter(self, node):
+        """Yield the nodes that have edges to a node."""
+
+        seen = set()
+
+        for source, _ in self._adjacency("in", node.index):
+            if source not in seen:
+                seen.add(source)
+                yield MappedNode(self, source)
+
+    def successors(self, node):
+        """Return a list of the nodes to which a node has edges."""
+
+        return list(self.successors_iter(node))
+
+    def predecessors(self, node):
+        """Return a list of the nodes that have edges to a node."""
+
+        return list(self.predecessors_iter(node))
+
+    def get_edge_data(self, source, dest, key=None, default=None):
+        """Return the attributes of the edges from one node to another, as a
+        key -> attributes dict, or one edge's attributes if a key is given.
+
+        """
+
+        result = {}
+
+        if source in self and dest in self:
+            for other, blob in self._adjacency("out", source.index):
+                if other == dest.index:
+                    result[len(result)] = self._edge_data(blob)
+
+        if key is not None:
+            return result.get(key, default)
+
+        return result or default
+
+    ###########
+    # Lookups #
+    ###########
+
+    def get_uuid(self, uuid):
+        """Return the node having this UUID, or None."""
+
+        target = _encode_value(uuid)
+
+        def key_at(position):
+            """Return the UUID of a node in UUID order."""
+
+            return self._blob(
+                self._node_record(self._index("uuid_order",
+                                              position))[self.UUID])
+
+        position = self._bisect(self._counts["nodes"], key_at, target)
+
+        if position < self._counts["nodes"] and key_at(position) == target:
+            return MappedNode(self, self._index("uuid_order", position))
+
+        return None
+
+    def get_native_id(self, nodetype, native_id):
+        """Return the first node of a type having this native id, or None."""
+
+        first, count = self._type_ranges.get(nodetype, (0, 0))
+        target = _encode_value(native_id)
+
+        def key_at(position):
+            """Return the native id of the type's node in native id order."""
+
+            return self._blob(
+                self._node_record(self._index("native_id_order",
+                                              first + position))
+                [self.NATIVE_ID])
+
+        position = self._bisect(count, key_at, target)
+
+        if position < count and key_at(position) == target:
+            return MappedNode(self,
+                              self._index("native_id_order",
+                                          first + position))
+
+        return None
+
+    def get_attribute_id(self, value):
+        """Return the first node having this id in one of its id-like
+        attributes, or None."""
+
+        target = _encode_value(NodeIndexes.normalize_id(value))
+        count = self._counts["attribute_ids"]
+
+        def key_at(position):
+            """Return an attribute id pair's id."""
+
+            return self._blob(self._pair("attribute_ids", position)[0])
+
+        position = self._bisect(count, key_at, target)
+
+        if position < count and key_at(position) == target:
+            return MappedNode(self, self._pair("attribute_ids", position)[1])
+
+        return None
+
+    def nodes_of_type(self, nodetype):
+        """Return a list of the nodes of a type, in UUID order."""
+
+        first, count = self._type_ranges.get(nodetype, (0, 0))
+        return [MappedNode(self, x) for x in xrange(first, first + count)]
+
+    def count_of_type(self, nodetype):
+        """Return the number of nodes of a type."""
+
+        return self._type_ranges.get(nodetype, (0, 0))[1]
@@ -0,0 +1,242 @@
+"""Resource instance graph storage: the graph object and its lookup
+indexes."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from functools import wraps
+
+import networkx
+
+
+class GraphNode(object):
+    """A Resource graph node."""
+
+    # This node's Goldstone UUID.
+    uuid = None
+
+    # This node's Resource Type.
+    resourcetype = None
+
+    # This node's cloud id and name, from its PolyResource row.
+    native_id = None
+    native_name = None
+
+    # This node's attributes. E.g., from get_xxxxx_client().
+    attributes = {}
+
+    def __init__(self, **kwargs):
+        """Initialize the object."""
+
+        self.uuid = kwargs.get("uuid")
+        self.resourcetype = kwargs.get("resourcetype")
+        self.native_id = kwargs.get("native_id")
+        self.native_name = kwargs.get("native_name")
+        self.attributes = kwargs.get("attributes", {})
+
+    def __repr__(self):
+        """Return a useful string."""
+
+        return "<%s, %s>" % (self.uuid, self.resourcetype().label())
+
+
+def _counted(method):
+    """Return a graph method that counts each call as a change to the
+    graph."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        """Count the change, and make it."""
+
+        self.changes += 1
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class ResourceGraph(networkx.MultiDiGraph):
+    """A resource instance graph that counts the changes made to its nodes and
+    edges.
+
+    Data derived from the graph can record the count from which it was built,
+    and be rebuilt when the count changes.
+
+    """
+
+    def __init__(self, data=None, **attr):
+        """Initialize the object."""
+
+        # The number of node and edge changes made to the graph. (The
+        # parent's __init__ may add the data's nodes and edges.)
+        self.changes = 0
+
+        super(ResourceGraph, self).__init__(data, **attr)
+
+    add_node = _counted(networkx.MultiDiGraph.add_node)
+    add_nodes_from = _counted(networkx.MultiDiGraph.add_nodes_from)
+    remove_node = _counted(networkx.MultiDiGraph.remove_node)
+    remove_nodes_from = _counted(networkx.MultiDiGraph.remove_nodes_from)
+    add_edge = _counted(networkx.MultiDiGraph.add_edge)
+    add_edges_from = _counted(networkx.MultiDiGraph.add_edges_from)
+    remove_edge = _counted(networkx.MultiDiGraph.remove_edge)
+    remove_edges_from = _counted(networkx.MultiDiGraph.remove_edges_from)
+    clear = _counted(networkx.MultiDiGraph.clear)
+
+
+class NodeIndexes(object):
+    """Lookup indexes into a resource instance graph's nodes.
+
+    UUID -> node, (resource type, native id) -> [node, ...], resource type ->
+    set of nodes, and normalized attribute id -> [node, ...]. Where nodes
+    share a key, the first one in its list is found. A type's nodes are
+    returned in UUID order, which is cached until the type's nodes change.
+
+    """
+
+    # The id-like cloud attributes by which get_attribute_id() finds a node.
+    # (Interface has port_id and net_id, but no id.)
+    ATTRIBUTE_ID_KEYS = ["id", "port_id", "net_id"]
+
+    def __init__(self, nodes=()):
+        """Initialize the object.
+
+        :param nodes: The nodes to index
+        :type nodes: iterable of GraphNode
+
+        """
+
+        self._uuid_index = {}
+        self._native_id_index = {}
+        self._type_index = {}
+        self._type_order = {}
+        self._attribute_id_index = {}
+
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def normalize_id(value):
+        """Return a cloud id in normalized form.
+
+        Some ids contain dashes while others do not, so ids are compared
+        without them.
+
+        :param value: A cloud id
+        :type value: str
+        :rtype: str
+
+        """
+
+        return value.replace('-', '')
+
+    @classmethod
+    def attribute_ids(cls, node):
+        """Return a node's normalized attribute ids.
+
+        Non-string values are skipped, because those will be add-ons. (Add-on
+        ids, i.e., pks, are integers.)
+
+        :param node: A resource graph node
+        :type node: GraphNode
+        :rtype: list of str
+
+        """
+
+        return [cls.normalize_id(node.attributes[x])
+                for x in cls.ATTRIBUTE_ID_KEYS
+                if isinstance(node.attributes.get(x), basestring)]
+
+    def add(self, node):
+        """Add a node to the indexes.
+
+        If nodes share a key, the first one added is found. This matches what
+        a linear scan of the graph would return.
+
+        :param node: A node that's been, or is about to be, added to the graph
+        :type node: GraphNode
+
+        """
+
+        self._uuid_index.setdefault(node.uuid, node)
+        self._native_id_index.setdefault((node.resourcetype, node.native_id),
+                                         []).append(node)
+        self._type_index.setdefault(node.resourcetype, set()).add(node)
+        self._type_order.pop(node.resourcetype, None)
+
+        for attribute_id in self.attribute_ids(node):
+            self._attribute_id_index.setdefault(attribute_id, []).append(node)
+
+    def remove(self, node):
+        """Remove a node from the indexes.
+
+        If another node shares one of its keys, that node is found from then
+        on.
+
+        :param node: A node that's about to be removed from the graph
+        :type node: GraphNode
+
+        """
+
+        def discard(index, key):
+            """Remove the node from an index's list of nodes having a key."""
+
+            nodes = index.get(key, [])
+
+            if node in nodes:
+                nodes.remove(node)
+
+                if not nodes:
+                    del index[key]
+
+        if self._uuid_index.get(node.uuid) is node:
+            del self._uuid_index[node.uuid]
+
+        discard(self._native_id_index, (node.resourcetype, node.native_id))
+        self._type_index[node.resourcetype].discard(node)
+        self._type_order.pop(node.resourcetype, None)
+
+        for attribute_id in self.attribute_ids(node):
+            discard(self._attribute_id_index, attribute_id)
+
+    def get_uuid(self, uuid):
+        """Return the node having this UUID, or None."""
+
+        return self._uuid_index.get(uuid)
+
+    def get_native_id(self, nodetype, native_id):
+        """Return the first node of a type having this native id, or None."""
+
+        nodes = self._native_id_index.get((nodetype, native_id))
+        return nodes[0] if nodes else None
+
+    def get_attribute_id(self, value):
+        """Return the first node having this id in one of its id-like
+        attributes, or None."""
+
+        nodes = self._attribute_id_index.get(self.normalize_id(value))
+        return nodes[0] if nodes else None
+
+    def nodes_of_type(self, nodetype):
+        """Return a list of the nodes of a type, in UUID order."""
+
+        if nodetype not in self._type_order:
+            self._type_order[nodetype] = \
+                sorted(self._type_index.get(nodetype, ()),
+                       key=lambda x: x.uuid)
+
+        # Return a copy, so that the caller can't change the index.
+        return list(self._type_order[nodetype])
+
+    def count_of_type(self, nodetype):
+        """Return the number of nodes of a type."""
+
+        return len(self._type_index.get(nodetype, ()))
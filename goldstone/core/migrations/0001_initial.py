@@ -0,0 +1,738 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import connection, models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # A deployment that predates the core migrations got these tables
+        # from syncdb.
+        if u'core_polyresource' in connection.introspection.table_names():
+            return
+
+        # Adding model 'PolyResource'
+        db.create_table(u'core_polyresource', (
+            ('polymorphic_ctype', self.gf('django.db.models.fields.related.ForeignKey')(related_name=u'polymorphic_core.polyresource_set+', null=True, to=orm['contenttypes.ContentType'])),
+            ('uuid', self.gf('django.db.models.fields.CharField')(max_length=36, primary_key=True)),
+            ('native_id', self.gf('django.db.models.fields.CharField')(max_length=128)),
+            ('native_name', self.gf('django.db.models.fields.CharField')(max_length=64)),
+            ('edges', self.gf('picklefield.fields.PickledObjectField')(default=[])),
+            ('cloud_attributes', self.gf('picklefield.fields.PickledObjectField')(default={})),
+            ('created', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime.now, blank=True)),
+            ('updated', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime.now, blank=True)),
+        ))
+        db.send_create_signal(u'core', ['PolyResource'])
+
+        # Adding model 'Addon'
+        db.create_table(u'core_addon', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Addon'])
+
+        # Adding model 'Keystone'
+        db.create_table(u'core_keystone', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Keystone'])
+
+        # Adding model 'User'
+        db.create_table(u'core_user', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['User'])
+
+        # Adding model 'Domain'
+        db.create_table(u'core_domain', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Domain'])
+
+        # Adding model 'Group'
+        db.create_table(u'core_group', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Group'])
+
+        # Adding model 'Token'
+        db.create_table(u'core_token', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Token'])
+
+        # Adding model 'Credential'
+        db.create_table(u'core_credential', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Credential'])
+
+        # Adding model 'Role'
+        db.create_table(u'core_role', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Role'])
+
+        # Adding model 'Region'
+        db.create_table(u'core_region', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Region'])
+
+        # Adding model 'Endpoint'
+        db.create_table(u'core_endpoint', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Endpoint'])
+
+        # Adding model 'Service'
+        db.create_table(u'core_service', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Service'])
+
+        # Adding model 'Project'
+        db.create_table(u'core_project', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Project'])
+
+        # Adding model 'Nova'
+        db.create_table(u'core_nova', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Nova'])
+
+        # Adding model 'AvailabilityZone'
+        db.create_table(u'core_availabilityzone', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['AvailabilityZone'])
+
+        # Adding model 'Aggregate'
+        db.create_table(u'core_aggregate', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Aggregate'])
+
+        # Adding model 'Flavor'
+        db.create_table(u'core_flavor', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Flavor'])
+
+        # Adding model 'Keypair'
+        db.create_table(u'core_keypair', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Keypair'])
+
+        # Adding model 'Host'
+        db.create_table(u'core_host', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+            ('fqdn', self.gf('django.db.models.fields.CharField')(unique=True, max_length=255)),
+        ))
+        db.send_create_signal(u'core', ['Host'])
+
+        # Adding model 'Hypervisor'
+        db.create_table(u'core_hypervisor', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+            ('virt_cpus', self.gf('django.db.models.fields.IntegerField')(default=8, blank=True)),
+            ('memory', self.gf('django.db.models.fields.IntegerField')(default=8192, blank=True)),
+        ))
+        db.send_create_signal(u'core', ['Hypervisor'])
+
+        # Adding model 'Cloudpipe'
+        db.create_table(u'core_cloudpipe', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Cloudpipe'])
+
+        # Adding model 'ServerGroup'
+        db.create_table(u'core_servergroup', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['ServerGroup'])
+
+        # Adding model 'Server'
+        db.create_table(u'core_server', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Server'])
+
+        # Adding model 'Interface'
+        db.create_table(u'core_interface', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Interface'])
+
+        # Adding model 'NovaLimits'
+        db.create_table(u'core_novalimits', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['NovaLimits'])
+
+        # Adding model 'Glance'
+        db.create_table(u'core_glance', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Glance'])
+
+        # Adding model 'Image'
+        db.create_table(u'core_image', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Image'])
+
+        # Adding model 'Cinder'
+        db.create_table(u'core_cinder', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Cinder'])
+
+        # Adding model 'QuotaSet'
+        db.create_table(u'core_quotaset', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['QuotaSet'])
+
+        # Adding model 'QOSSpec'
+        db.create_table(u'core_qosspec', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['QOSSpec'])
+
+        # Adding model 'Snapshot'
+        db.create_table(u'core_snapshot', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Snapshot'])
+
+        # Adding model 'Transfer'
+        db.create_table(u'core_transfer', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Transfer'])
+
+        # Adding model 'VolumeType'
+        db.create_table(u'core_volumetype', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['VolumeType'])
+
+        # Adding model 'Volume'
+        db.create_table(u'core_volume', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Volume'])
+
+        # Adding model 'Limits'
+        db.create_table(u'core_limits', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Limits'])
+
+        # Adding model 'Neutron'
+        db.create_table(u'core_neutron', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Neutron'])
+
+        # Adding model 'MeteringLabelRule'
+        db.create_table(u'core_meteringlabelrule', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['MeteringLabelRule'])
+
+        # Adding model 'MeteringLabel'
+        db.create_table(u'core_meteringlabel', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['MeteringLabel'])
+
+        # Adding model 'NeutronQuota'
+        db.create_table(u'core_neutronquota', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['NeutronQuota'])
+
+        # Adding model 'RemoteGroup'
+        db.create_table(u'core_remotegroup', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['RemoteGroup'])
+
+        # Adding model 'SecurityRules'
+        db.create_table(u'core_securityrules', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['SecurityRules'])
+
+        # Adding model 'SecurityGroup'
+        db.create_table(u'core_securitygroup', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['SecurityGroup'])
+
+        # Adding model 'Port'
+        db.create_table(u'core_port', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Port'])
+
+        # Adding model 'LBVIP'
+        db.create_table(u'core_lbvip', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['LBVIP'])
+
+        # Adding model 'LBPool'
+        db.create_table(u'core_lbpool', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['LBPool'])
+
+        # Adding model 'HealthMonitor'
+        db.create_table(u'core_healthmonitor', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['HealthMonitor'])
+
+        # Adding model 'FloatingIP'
+        db.create_table(u'core_floatingip', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['FloatingIP'])
+
+        # Adding model 'FloatingIPPool'
+        db.create_table(u'core_floatingippool', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['FloatingIPPool'])
+
+        # Adding model 'FixedIP'
+        db.create_table(u'core_fixedip', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['FixedIP'])
+
+        # Adding model 'LBMember'
+        db.create_table(u'core_lbmember', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['LBMember'])
+
+        # Adding model 'Subnet'
+        db.create_table(u'core_subnet', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Subnet'])
+
+        # Adding model 'Network'
+        db.create_table(u'core_network', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Network'])
+
+        # Adding model 'Router'
+        db.create_table(u'core_router', (
+            (u'polyresource_ptr', self.gf('django.db.models.fields.related.OneToOneField')(to=orm['core.PolyResource'], unique=True, primary_key=True)),
+        ))
+        db.send_create_signal(u'core', ['Router'])
+
+
+    def backwards(self, orm):
+        # Deleting model 'PolyResource'
+        db.delete_table(u'core_polyresource')
+
+        # Deleting model 'Addon'
+        db.delete_table(u'core_addon')
+
+        # Deleting model 'Keystone'
+        db.delete_table(u'core_keystone')
+
+        # Deleting model 'User'
+        db.delete_table(u'core_user')
+
+        # Deleting model 'Domain'
+        db.delete_table(u'core_domain')
+
+        # Deleting model 'Group'
+        db.delete_table(u'core_group')
+
+        # Deleting model 'Token'
+        db.delete_table(u'core_token')
+
+        # Deleting model 'Credential'
+        db.delete_table(u'core_credential')
+
+        # Deleting model 'Role'
+        db.delete_table(u'core_role')
+
+        # Deleting model 'Region'
+        db.delete_table(u'core_region')
+
+        # Deleting model 'Endpoint'
+        db.delete_table(u'core_endpoint')
+
+        # Deleting model 'Service'
+        db.delete_table(u'core_service')
+
+        # Deleting model 'Project'
+        db.delete_table(u'core_project')
+
+        # Deleting model 'Nova'
+        db.delete_table(u'core_nova')
+
+        # Deleting model 'AvailabilityZone'
+        db.delete_table(u'core_availabilityzone')
+
+        # Deleting model 'Aggregate'
+        db.delete_table(u'core_aggregate')
+
+        # Deleting model 'Flavor'
+        db.delete_table(u'core_flavor')
+
+        # Deleting model 'Keypair'
+        db.delete_table(u'core_keypair')
+
+        # Deleting model 'Host'
+        db.delete_table(u'core_host')
+
+        # Deleting model 'Hypervisor'
+        db.delete_table(u'core_hypervisor')
+
+        # Deleting model 'Cloudpipe'
+        db.delete_table(u'core_cloudpipe')
+
+        # Deleting model 'ServerGroup'
+        db.delete_table(u'core_servergroup')
+
+        # Deleting model 'Server'
+        db.delete_table(u'core_server')
+
+        # Deleting model 'Interface'
+        db.delete_table(u'core_interface')
+
+        # Deleting model 'NovaLimits'
+        db.delete_table(u'core_novalimits')
+
+        # Deleting model 'Glance'
+        db.delete_table(u'core_glance')
+
+        # Deleting model 'Image'
+        db.delete_table(u'core_image')
+
+        # Deleting model 'Cinder'
+        db.delete_table(u'core_cinder')
+
+        # Deleting model 'QuotaSet'
+        db.delete_table(u'core_quotaset')
+
+        # Deleting model 'QOSSpec'
+        db.delete_table(u'core_qosspec')
+
+        # Deleting model 'Snapshot'
+        db.delete_table(u'core_snapshot')
+
+        # Deleting model 'Transfer'
+        db.delete_table(u'core_transfer')
+
+        # Deleting model 'VolumeType'
+        db.delete_table(u'core_volumetype')
+
+        # Deleting model 'Volume'
+        db.delete_table(u'core_volume')
+
+        # Deleting model 'Limits'
+        db.delete_table(u'core_limits')
+
+        # Deleting model 'Neutron'
+        db.delete_table(u'core_neutron')
+
+        # Deleting model 'MeteringLabelRule'
+        db.delete_table(u'core_meteringlabelrule')
+
+        # Deleting model 'MeteringLabel'
+        db.delete_table(u'core_meteringlabel')
+
+        # Deleting model 'NeutronQuota'
+        db.delete_table(u'core_neutronquota')
+
+        # Deleting model 'RemoteGroup'
+        db.delete_table(u'core_remotegroup')
+
+        # Deleting model 'SecurityRules'
+        db.delete_table(u'core_securityrules')
+
+        # Deleting model 'SecurityGroup'
+        db.delete_table(u'core_securitygroup')
+
+        # Deleting model 'Port'
+        db.delete_table(u'core_port')
+
+        # Deleting model 'LBVIP'
+        db.delete_table(u'core_lbvip')
+
+        # Deleting model 'LBPool'
+        db.delete_table(u'core_lbpool')
+
+        # Deleting model 'HealthMonitor'
+        db.delete_table(u'core_healthmonitor')
+
+        # Deleting model 'FloatingIP'
+        db.delete_table(u'core_floatingip')
+
+        # Deleting model 'FloatingIPPool'
+        db.delete_table(u'core_floatingippool')
+
+        # Deleting model 'FixedIP'
+        db.delete_table(u'core_fixedip')
+
+        # Deleting model 'LBMember'
+        db.delete_table(u'core_lbmember')
+
+        # Deleting model 'Subnet'
+        db.delete_table(u'core_subnet')
+
+        # Deleting model 'Network'
+        db.delete_table(u'core_network')
+
+        # Deleting model 'Router'
+        db.delete_table(u'core_router')
+
+
+    models = {
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'core.addon': {
+            'Meta': {'object_name': 'Addon', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.aggregate': {
+            'Meta': {'object_name': 'Aggregate', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.availabilityzone': {
+            'Meta': {'object_name': 'AvailabilityZone', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.cinder': {
+            'Meta': {'object_name': 'Cinder', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.cloudpipe': {
+            'Meta': {'object_name': 'Cloudpipe', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.credential': {
+            'Meta': {'object_name': 'Credential', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.domain': {
+            'Meta': {'object_name': 'Domain', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.endpoint': {
+            'Meta': {'object_name': 'Endpoint', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.fixedip': {
+            'Meta': {'object_name': 'FixedIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.flavor': {
+            'Meta': {'object_name': 'Flavor', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.floatingip': {
+            'Meta': {'object_name': 'FloatingIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.floatingippool': {
+            'Meta': {'object_name': 'FloatingIPPool', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.glance': {
+            'Meta': {'object_name': 'Glance', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.group': {
+            'Meta': {'object_name': 'Group', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.healthmonitor': {
+            'Meta': {'object_name': 'HealthMonitor', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.host': {
+            'Meta': {'object_name': 'Host', '_ormbases': [u'core.PolyResource']},
+            'fqdn': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '255'}),
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.hypervisor': {
+            'Meta': {'object_name': 'Hypervisor', '_ormbases': [u'core.PolyResource']},
+            'memory': ('django.db.models.fields.IntegerField', [], {'default': '8192', 'blank': 'True'}),
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'}),
+            'virt_cpus': ('django.db.models.fields.IntegerField', [], {'default': '8', 'blank': 'True'})
+        },
+        u'core.image': {
+            'Meta': {'object_name': 'Image', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.interface': {
+            'Meta': {'object_name': 'Interface', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.keypair': {
+            'Meta': {'object_name': 'Keypair', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.keystone': {
+            'Meta': {'object_name': 'Keystone', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbmember': {
+            'Meta': {'object_name': 'LBMember', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbpool': {
+            'Meta': {'object_name': 'LBPool', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbvip': {
+            'Meta': {'object_name': 'LBVIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.limits': {
+            'Meta': {'object_name': 'Limits', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.meteringlabel': {
+            'Meta': {'object_name': 'MeteringLabel', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.meteringlabelrule': {
+            'Meta': {'object_name': 'MeteringLabelRule', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.network': {
+            'Meta': {'object_name': 'Network', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.neutron': {
+            'Meta': {'object_name': 'Neutron', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.neutronquota': {
+            'Meta': {'object_name': 'NeutronQuota', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.nova': {
+            'Meta': {'object_name': 'Nova', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.novalimits': {
+            'Meta': {'object_name': 'NovaLimits', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.polyresource': {
+            'Meta': {'object_name': 'PolyResource'},
+            'cloud_attributes': ('picklefield.fields.PickledObjectField', [], {'default': '{}'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'blank': 'True'}),
+            'edges': ('picklefield.fields.PickledObjectField', [], {'default': '[]'}),
+            'native_id': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'native_name': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'polymorphic_ctype': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "u'polymorphic_core.polyresource_set+'", 'null': 'True', 'to': u"orm['contenttypes.ContentType']"}),
+            'updated': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'blank': 'True'}),
+            'uuid': ('django.db.models.fields.CharField', [], {'max_length': '36', 'primary_key': 'True'})
+        },
+        u'core.port': {
+            'Meta': {'object_name': 'Port', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.project': {
+            'Meta': {'object_name': 'Project', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.qosspec': {
+            'Meta': {'object_name': 'QOSSpec', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.quotaset': {
+            'Meta': {'object_name': 'QuotaSet', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.region': {
+            'Meta': {'object_name': 'Region', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.remotegroup': {
+            'Meta': {'object_name': 'RemoteGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.role': {
+            'Meta': {'object_name': 'Role', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.router': {
+            'Meta': {'object_name': 'Router', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.securitygroup': {
+            'Meta': {'object_name': 'SecurityGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.securityrules': {
+            'Meta': {'object_name': 'SecurityRules', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.server': {
+            'Meta': {'object_name': 'Server', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.servergroup': {
+            'Meta': {'object_name': 'ServerGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.service': {
+            'Meta': {'object_name': 'Service', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.snapshot': {
+            'Meta': {'object_name': 'Snapshot', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.subnet': {
+            'Meta': {'object_name': 'Subnet', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.token': {
+            'Meta': {'object_name': 'Token', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.transfer': {
+            'Meta': {'object_name': 'Transfer', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.user': {
+            'Meta': {'object_name': 'User', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.volume': {
+            'Meta': {'object_name': 'Volume', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.volumetype': {
+            'Meta': {'object_name': 'VolumeType', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        }
+    }
+
+    complete_apps = ['core']
\ No newline at end of file
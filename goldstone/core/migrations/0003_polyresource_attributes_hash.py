@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding field 'PolyResource.attributes_hash'
+        db.add_column(u'core_polyresource', 'attributes_hash',
+                      self.gf('django.db.models.fields.CharField')(default='', max_length=64, blank=True),
+                      keep_default=False)
+
+
+    def backwards(self, orm):
+        # Deleting field 'PolyResource.attributes_hash'
+        db.delete_column(u'core_polyresource', 'attributes_hash')
+
+
+    models = {
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        },
+        u'core.addon': {
+            'Meta': {'object_name': 'Addon', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.aggregate': {
+            'Meta': {'object_name': 'Aggregate', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.availabilityzone': {
+            'Meta': {'object_name': 'AvailabilityZone', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.cinder': {
+            'Meta': {'object_name': 'Cinder', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.cloudpipe': {
+            'Meta': {'object_name': 'Cloudpipe', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.credential': {
+            'Meta': {'object_name': 'Credential', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.domain': {
+            'Meta': {'object_name': 'Domain', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.endpoint': {
+            'Meta': {'object_name': 'Endpoint', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.fixedip': {
+            'Meta': {'object_name': 'FixedIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.flavor': {
+            'Meta': {'object_name': 'Flavor', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.floatingip': {
+            'Meta': {'object_name': 'FloatingIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.floatingippool': {
+            'Meta': {'object_name': 'FloatingIPPool', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.glance': {
+            'Meta': {'object_name': 'Glance', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.group': {
+            'Meta': {'object_name': 'Group', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.healthmonitor': {
+            'Meta': {'object_name': 'HealthMonitor', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.host': {
+            'Meta': {'object_name': 'Host', '_ormbases': [u'core.PolyResource']},
+            'fqdn': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '255'}),
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.hypervisor': {
+            'Meta': {'object_name': 'Hypervisor', '_ormbases': [u'core.PolyResource']},
+            'memory': ('django.db.models.fields.IntegerField', [], {'default': '8192', 'blank': 'True'}),
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'}),
+            'virt_cpus': ('django.db.models.fields.IntegerField', [], {'default': '8', 'blank': 'True'})
+        },
+        u'core.image': {
+            'Meta': {'object_name': 'Image', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.interface': {
+            'Meta': {'object_name': 'Interface', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.keypair': {
+            'Meta': {'object_name': 'Keypair', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.keystone': {
+            'Meta': {'object_name': 'Keystone', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbmember': {
+            'Meta': {'object_name': 'LBMember', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbpool': {
+            'Meta': {'object_name': 'LBPool', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.lbvip': {
+            'Meta': {'object_name': 'LBVIP', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.limits': {
+            'Meta': {'object_name': 'Limits', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.meteringlabel': {
+            'Meta': {'object_name': 'MeteringLabel', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.meteringlabelrule': {
+            'Meta': {'object_name': 'MeteringLabelRule', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.network': {
+            'Meta': {'object_name': 'Network', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.neutron': {
+            'Meta': {'object_name': 'Neutron', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.neutronquota': {
+            'Meta': {'object_name': 'NeutronQuota', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.nova': {
+            'Meta': {'object_name': 'Nova', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.novalimits': {
+            'Meta': {'object_name': 'NovaLimits', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.polyresource': {
+            'Meta': {'object_name': 'PolyResource'},
+            'attributes_hash': ('django.db.models.fields.CharField', [], {'default': "''", 'max_length': '64', 'blank': 'True'}),
+            'cloud_attributes': ('picklefield.fields.PickledObjectField', [], {'default': '{}'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'blank': 'True'}),
+            'edges': ('picklefield.fields.PickledObjectField', [], {'default': '[]'}),
+            'native_id': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'native_name': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'polymorphic_ctype': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "u'polymorphic_core.polyresource_set+'", 'null': 'True', 'to': u"orm['contenttypes.ContentType']"}),
+            'updated': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'blank': 'True'}),
+            'uuid': ('django.db.models.fields.CharField', [], {'max_length': '36', 'primary_key': 'True'})
+        },
+        u'core.polyresourcetombstone': {
+            'Meta': {'object_name': 'PolyResourceTombstone'},
+            'deleted': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'db_index': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'uuid': ('django.db.models.fields.CharField', [], {'max_length': '36'})
+        },
+        u'core.port': {
+            'Meta': {'object_name': 'Port', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.project': {
+            'Meta': {'object_name': 'Project', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.qosspec': {
+            'Meta': {'object_name': 'QOSSpec', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.quotaset': {
+            'Meta': {'object_name': 'QuotaSet', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.region': {
+            'Meta': {'object_name': 'Region', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.remotegroup': {
+            'Meta': {'object_name': 'RemoteGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.role': {
+            'Meta': {'object_name': 'Role', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.router': {
+            'Meta': {'object_name': 'Router', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.securitygroup': {
+            'Meta': {'object_name': 'SecurityGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.securityrules': {
+            'Meta': {'object_name': 'SecurityRules', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.server': {
+            'Meta': {'object_name': 'Server', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.servergroup': {
+            'Meta': {'object_name': 'ServerGroup', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.service': {
+            'Meta': {'object_name': 'Service', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.snapshot': {
+            'Meta': {'object_name': 'Snapshot', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.subnet': {
+            'Meta': {'object_name': 'Subnet', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.token': {
+            'Meta': {'object_name': 'Token', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.transfer': {
+            'Meta': {'object_name': 'Transfer', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.user': {
+            'Meta': {'object_name': 'User', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.volume': {
+            'Meta': {'object_name': 'Volume', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        },
+        u'core.volumetype': {
+            'Meta': {'object_name': 'VolumeType', '_ormbases': [u'core.PolyResource']},
+            u'polyresource_ptr': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['core.PolyResource']", 'unique': 'True', 'primary_key': 'True'})
+        }
+    }
+
+    complete_apps = ['core']
\ No newline at end of file
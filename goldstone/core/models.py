@@ -12,23 +12,28 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from datetime import timedelta
+import json
+import sys
+
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db.models import CharField, IntegerField
+from django.db.models import CharField, IntegerField, DateTimeField, Model
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django_extensions.db.fields import UUIDField, CreationDateTimeField, \
     ModificationDateTimeField
 from elasticsearch_dsl import String, Date, Integer, A
 from elasticsearch_dsl.query import Q, QueryString      # pylint: disable=E0611
-from goldstone.drfes.models import DailyIndexDocType
-from goldstone.glogging.models import LogData, LogEvent
 from picklefield.fields import PickledObjectField
 from polymorphic import PolymorphicModel
 
+from goldstone.drfes.models import DailyIndexDocType
+from goldstone.glogging.models import LogData, LogEvent
+
 # Get_glance_client is defined here for easy unit test mocking.
 from goldstone.utils import get_glance_client, get_nova_client, \
-    get_cinder_client, get_keystone_client, get_cloud
-
-import sys
+    get_cinder_client, get_keystone_client, get_cloud, nova_listing
 
 # Aliases to make the Resource Graph definitions less verbose.
 MAX = settings.R_ATTRIBUTE.MAX
@@ -36,6 +41,7 @@ MIN = settings.R_ATTRIBUTE.MIN
 TO = settings.R_ATTRIBUTE.TO
 TYPE = settings.R_ATTRIBUTE.TYPE
 MATCHING_FN = settings.R_ATTRIBUTE.MATCHING_FN
+JOIN_KEYS = settings.R_ATTRIBUTE.JOIN_KEYS
 EDGE_ATTRIBUTES = settings.R_ATTRIBUTE.EDGE_ATTRIBUTES
 
 ALLOCATED_TO = settings.R_EDGE.ALLOCATED_TO
@@ -72,6 +78,49 @@ def _hash(*args):
     return result.hexdigest()
 
 
+# Callable join keys. These are module-level functions, rather than lambdas
+# written in type_outgoing_edges(), so that an EdgeMatcher sees the same key
+# on every call and can reuse the index it built for it.
+
+def _flavor_id(attributes):
+    """Return a server's flavor id.
+
+    :param attributes: A server's attributes
+    :type attributes: dict
+    :rtype: str or None
+
+    """
+
+    return attributes.get("flavor", {}).get("id")
+
+
+def _mac_addrs(attributes):
+    """Return a server's interfaces' MAC addresses.
+
+    :param attributes: A server's attributes
+    :type attributes: dict
+    :rtype: list
+
+    """
+
+    return [y.get("OS-EXT-IPS-MAC:mac_addr")
+            for x in attributes.get("addresses", {}).values()
+            for y in x]
+
+
+def _edge_order(edge):
+    """Return a sort key for a persistent node's edge.
+
+    :param edge: An edge, as stored in PolyResource.edges
+    :type edge: tuple
+    :return: The destination uuid, and the edge attributes' items
+    :rtype: tuple
+
+    """
+
+    return edge[0], sorted(edge[1].items())
+
+
 #
 # Goldstone Agent Metrics and Reports
 #
@@ -156,6 +205,21 @@ class ApiPerfData(DailyIndexDocType):
                          {"from": 500, "to": 599}])
 
 
+class RollupData(DailyIndexDocType):
+    """Pre-aggregated metric and API performance statistics, and log counts.
+
+    Each document summarizes the raw documents of one source, e.g., metrics,
+    in one rollup tier's time bucket, for one combination of key field
+    values. See goldstone.core.rollup.
+
+    """
+
+    INDEX_PREFIX = 'goldstone_rollup-'
+
+    class Meta:          # pylint: disable=C0111,W0232,C1001
+        doc_type = 'core_rollup'
+
+
 ######################################
 # Resource graph types and instances #
 ######################################
@@ -186,9 +250,9 @@ class PolyResource(PolymorphicModel):
     # This object's unique id within its OpenStack cloud. This may be an
     # OpenStack-generated string, or a value we generate from the object's
     # attributes.
-    native_id = CharField(max_length=128)
+    native_id = CharField(max_length=128, db_index=True)
 
-    native_name = CharField(max_length=64)
+    native_name = CharField(max_length=64, db_index=True)
 
     # This instance's outgoing edges, as [(dest_uuid, attribute_dict),
     # (dest_uuid, attribute_dict), ...]
@@ -197,6 +261,10 @@ class PolyResource(PolymorphicModel):
     # This node's cloud attributes.
     cloud_attributes = PickledObjectField(default={})
 
+    # A hash of cloud_attributes. This tells whether the attributes have
+    # changed, without unpickling them.
+    attributes_hash = CharField(max_length=64, blank=True, default='')
+
     created = CreationDateTimeField(editable=False,
                                     blank=True,
                                     default=utc_now)
@@ -206,6 +274,27 @@ class PolyResource(PolymorphicModel):
     class Meta:               # pylint: disable=C0111,W0232,C1001
         verbose_name = "polyresource"
 
+    def save(self, *args, **kwargs):
+        """Save the row, with a hash of its current cloud attributes."""
+
+        self.attributes_hash = self.hash_attributes(self.cloud_attributes)
+
+        super(PolyResource, self).save(*args, **kwargs)
+
+    @staticmethod
+    def hash_attributes(attributes):
+        """Return a hash of cloud attributes.
+
+        Equal attribute dicts have equal hashes, regardless of their key order.
+
+        :param attributes: A node's cloud attributes
+        :type attributes: dict
+        :rtype: str
+
+        """
+
+        return _hash(json.dumps(attributes, sort_keys=True, default=repr))
+
     @classmethod
     def unique_class_id(cls):
         """Return this class' (not object!) unique id."""
@@ -293,6 +382,13 @@ class PolyResource(PolymorphicModel):
                               to_node's attribute dicts, we draw a Resource
                               graph edge. Note: This must be prepared for
                               absent keys, and not throw exceptions.
+                 JOIN_KEYS: Optional. (from_key, to_key). If present, an
+                            edge is drawn when the from_node's from_key
+                            value is truthy and equals the to_node's to_key
+                            value, or is a member of it if it's a list.
+                            This must agree with MATCHING_FN. A callable
+                            key must be a module-level function, so that
+                            it's the same object on every call.
                  EDGE_ATTTRIBUTES: This edge's attributes:
                      TYPE: The type of this edge
                      MIN: A resource graph node has a minimum number of this
@@ -348,28 +444,44 @@ class PolyResource(PolymorphicModel):
 
         return self.resourcetype()
 
-    def update_edges(self):
+    def update_edges(self, matcher=None):
         """Update this persistent instance's edges with what's in the
-        persistent resource graph."""
+        persistent resource graph.
+
+        The row is saved only if its edges changed.
+
+        :param matcher: The matcher to use. Pass one matcher when updating
+                        many nodes, so that its candidate rows and indexes are
+                        shared.
+        :type matcher: EdgeMatcher or None
+        :return: True if the edges changed
+        :rtype: bool
+
+        """
+
+        if matcher is None:
+            matcher = EdgeMatcher()
 
         outgoing = []
 
-        # For every possible edge from this node's type...
+        # For every possible edge from this node's type, create an edge to
+        # every matching neighbor.
         for edge in self.type_outgoing_edges():
-            # Get the target neighbor's type and matching function.
-            neighbor_type = edge[TO]
-            match_fn = edge[MATCHING_FN]
+            outgoing.extend((candidate.uuid, edge[EDGE_ATTRIBUTES])
+                            for candidate in matcher.matches(self, edge))
 
-            # For all nodes of the desired type...
-            for candidate in neighbor_type.objects.all():
-                if match_fn(self.cloud_attributes, candidate.cloud_attributes):
-                    # We have a match! Create an edge to this candidate.
-                    outgoing.append((candidate.uuid, edge[EDGE_ATTRIBUTES]))
+        # Save the edges if they've changed. The candidate rows aren't read
+        # in any particular order, so the edges are compared sorted.
+        outgoing.sort(key=_edge_order)
+
+        if outgoing == sorted(self.edges, key=_edge_order):
+            return False
 
-        # Save the edges.
         self.edges = outgoing
         self.save()
 
+        return True
+
     def logs(self):
         """Return a search object for logs related to this resource.
 
@@ -396,6 +508,172 @@ class PolyResource(PolymorphicModel):
         return LogEvent.search().query(name_query)
 
 
+class EdgeMatcher(object):
+    """Finds the neighbors to which a resource's outgoing edges go.
+
+    Each neighbor type's rows are read once. For edges that declare
+    JOIN_KEYS, the rows are indexed by the join key, so that an edge is
+    resolved with a dict lookup. Other edges fall back to calling their
+    MATCHING_FN on every row of the neighbor type.
+
+    The rows are cached, so a matcher must not be used after the persistent
+    graph's nodes are added, deleted, or updated.
+
+    """
+
+    def __init__(self):
+        """Initialize the object."""
+
+        # Resource type -> [row, row, ...]
+        self._candidates = {}
+
+        # (resource type, to_key) -> {value: [row, row, ...]}
+        self._indexes = {}
+
+    @staticmethod
+    def _values(attributes, key):
+        """Return the truthy values of an attribute dict's join key.
+
+        :param attributes: A node's attributes
+        :type attributes: dict
+        :param key: An attribute name, or a callable that returns the value
+        :type key: str or callable
+        :return: The value, or its members if it's a list
+        :rtype: list
+
+        """
+
+        value = key(attributes) if callable(key) else attributes.get(key)
+        values = value if isinstance(value, (list, tuple)) else [value]
+
+        return [x for x in values if x]
+
+    def candidates(self, nodetype):
+        """Return all the rows of a resource type.
+
+        :param nodetype: A resource type
+        :type nodetype: PolyResource subclass
+        :rtype: list of PolyResource
+
+        """
+
+        if nodetype not in self._candidates:
+            self._candidates[nodetype] = list(nodetype.objects.all())
+
+        return self._candidates[nodetype]
+
+    def _index(self, nodetype, key):
+        """Return an index of a resource type's rows by a join key.
+
+        Values that can't be hashed aren't indexed.
+
+        :param nodetype: A resource type
+        :type nodetype: PolyResource subclass
+        :param key: The destination's join key
+        :type key: str or callable
+        :rtype: dict
+
+        """
+
+        if (nodetype, key) not in self._indexes:
+            index = {}
+
+            for row in self.candidates(nodetype):
+                for value in self._values(row.cloud_attributes, key):
+                    try:
+                        rows = index.setdefault(value, [])
+                    except TypeError:
+                        continue
+
+                    # A list may hold a value more than once.
+                    if not rows or rows[-1] is not row:
+                        rows.append(row)
+
+            self._indexes[(nodetype, key)] = index
+
+        return self._indexes[(nodetype, key)]
+
+    def matches(self, node, edge):
+        """Return the rows to which an outgoing edge goes.
+
+        :param node: The edge's source
+        :type node: PolyResource
+        :param edge: An entry from the source type's type_outgoing_edges()
+        :type edge: dict
+        :rtype: list of PolyResource
+
+        """
+
+        neighbor_type = edge[TO]
+
+        if JOIN_KEYS not in edge:
+            match_fn = edge[MATCHING_FN]
+
+            return [x for x in self.candidates(neighbor_type)
+                    if match_fn(node.cloud_attributes, x.cloud_attributes)]
+
+        from_key, to_key = edge[JOIN_KEYS]
+        index = self._index(neighbor_type, to_key)
+
+        result = []
+        for value in self._values(node.cloud_attributes, from_key):
+            try:
+                rows = index.get(value, [])
+            except TypeError:
+                continue
+
+            result.extend(x for x in rows if x not in result)
+
+        return result
+
+
+class PolyResourceTombstone(Model):
+    """A record of a deleted PolyResource row.
+
+    The in-memory resource graph is refreshed from the rows whose updated
+    timestamp has moved. Deleted rows leave nothing behind to be found that
+    way, so we record them here.
+
+    """
+
+    # Tombstones older than this are culled. An in-memory graph that hasn't
+    # been refreshed for this long must be re-unpacked from scratch.
+    LIFETIME = timedelta(hours=1)
+
+    # The deleted row's Goldstone UUID.
+    uuid = CharField(max_length=36)
+
+    deleted = DateTimeField(default=utc_now, db_index=True)
+
+    class Meta:               # pylint: disable=C0111,W0232,C1001
+        verbose_name = "polyresource tombstone"
+
+    @classmethod
+    def cull(cls):
+        """Delete the tombstones that have outlived their usefulness."""
+
+        cls.objects.filter(deleted__lt=utc_now() - cls.LIFETIME).delete()
+
+
+@receiver(post_delete, sender=PolyResource)
+def _polyresource_deleted(sender, **kwargs):     # pylint: disable=W0613
+    """Leave a tombstone for a deleted PolyResource row.
+
+    Deleting a subclass row also deletes its PolyResource parent row, and
+    Django sends this signal for the parent row too. So, this receiver is
+    connected to PolyResource alone, and isn't called for other models'
+    deletions.
+
+    :param sender: The sending model class
+    :type sender: Model subclass
+    :keyword instance: The actual instance being deleted
+    :type instance: Model row
+
+    """
+
+    PolyResourceTombstone.objects.create(uuid=kwargs["instance"].uuid)
+
+
 ############################################
 # These classes represent add-on entities. #
 ############################################
@@ -495,22 +773,26 @@ class User(PolyResource):
         return [{TO: Credential,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["user_id"],
+                 JOIN_KEYS: ("id", "user_id"),
                  EDGE_ATTRIBUTES: {TYPE: CONTAINS, MIN: 0, MAX: sys.maxint}},
                 {TO: Credential,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["user_id"],
+                 JOIN_KEYS: ("id", "user_id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Domain,
                  MATCHING_FN:
                  lambda f, t:
                  f.get("domain_id") and f["domain_id"] == t["id"],
+                 JOIN_KEYS: ("domain_id", "id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: ASSIGNED_TO, MIN: 0, MAX: sys.maxint}},
                 {TO: Group,
                  MATCHING_FN:
                  lambda f, t:
                  f.get("domain_id") and f["domain_id"] == t["domain_id"],
+                 JOIN_KEYS: ("domain_id", "domain_id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: ASSIGNED_TO, MIN: 0, MAX: sys.maxint}},
                 {TO: Project,
@@ -518,6 +800,7 @@ class User(PolyResource):
                  lambda f, t:
                  f.get("default_project_id") and
                  f["default_project_id"] == t["id"],
+                 JOIN_KEYS: ("default_project_id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: ASSIGNED_TO, MIN: 0, MAX: 1}},
                 {TO: QuotaSet,
                  MATCHING_FN: lambda f, t: False,
@@ -569,19 +852,23 @@ class Domain(PolyResource):
         return [{TO: Group,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["domain_id"],
+                 JOIN_KEYS: ("id", "domain_id"),
                  EDGE_ATTRIBUTES: {TYPE: CONTAINS, MIN: 0, MAX: sys.maxint}},
                 {TO: Group,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["domain_id"],
+                 JOIN_KEYS: ("id", "domain_id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Project,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["domain_id"],
+                 JOIN_KEYS: ("id", "domain_id"),
                  EDGE_ATTRIBUTES: {TYPE: CONTAINS, MIN: 0, MAX: sys.maxint}},
                 {TO: Project,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["domain_id"],
+                 JOIN_KEYS: ("id", "domain_id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 ]
@@ -624,6 +911,7 @@ class Group(PolyResource):
         return [{TO: Domain,
                  MATCHING_FN:
                  lambda f, t: f.get("domain_id") and f["domain_id"] == t["id"],
+                 JOIN_KEYS: ("domain_id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: MEMBER_OF, MIN: 0, MAX: sys.maxint}},
                 ]
 
@@ -747,22 +1035,27 @@ class Region(PolyResource):
         return [{TO: Keystone,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["id"],
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: 1}},
                 {TO: Cinder,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["id"],
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: 1}},
                 {TO: Nova,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["id"],
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: 1}},
                 {TO: Neutron,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["id"],
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: 1}},
                 {TO: Glance,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["id"],
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: 1}},
                 {TO: Addon,
                  # Any add-on can be used in any region...
@@ -920,89 +1213,110 @@ class Project(PolyResource):
         return [{TO: Image,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: MEMBER_OF, MIN: 0, MAX: sys.maxint}},
                 {TO: Keypair,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Keypair,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: NovaLimits,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 1, MAX: 1}},
                 {TO: Server,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 1, MAX: sys.maxint}},
                 {TO: MeteringLabel,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: NeutronQuota,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: SUBSCRIBED_TO, MIN: 1, MAX: 1}},
                 {TO: Network,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: USES, MIN: 0, MAX: sys.maxint}},
                 {TO: Network,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Subnet,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: LBMember,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: HealthMonitor,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: LBVIP,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Port,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: SecurityRules,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: QuotaSet,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: SUBSCRIBED_TO, MIN: 0, MAX: sys.maxint}},
                 {TO: QOSSpec,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Snapshot,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Volume,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: MEMBER_OF, MIN: 0, MAX: sys.maxint}},
                 {TO: Volume,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Limits,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 ]
 
@@ -1063,11 +1377,13 @@ class Nova(PolyResource):
                 {TO: AvailabilityZone,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["zoneName"],
+                 JOIN_KEYS: ("id", "zoneName"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: sys.maxint}},
                 {TO: Cloudpipe,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t["zoneName"],
+                 JOIN_KEYS: ("id", "zoneName"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 1, MAX: sys.maxint}},
                 ]
@@ -1089,13 +1405,9 @@ class AvailabilityZone(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        for entry in nova_client.availability_zones.list():
-            this_entry = entry.to_dict()
+        for this_entry in nova_listing("availability_zones"):
 
             # The resource's name is at key "zoneName", so we have to copy it
             # to where the client expects it. And add the name of the resource
@@ -1123,23 +1435,27 @@ class AvailabilityZone(PolyResource):
              lambda f, t:
              f.get("zoneName") and
              f.get("zoneName") == t.get("availability_zone"),
+             JOIN_KEYS: ("zoneName", "availability_zone"),
              EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
             {TO: Aggregate,
              MATCHING_FN:
              lambda f, t:
              f.get("zoneName") and
              f.get("zoneName") == t.get("availability_zone"),
+             JOIN_KEYS: ("zoneName", "availability_zone"),
              EDGE_ATTRIBUTES:
              {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
             {TO: Host,
              MATCHING_FN:
              lambda f, t:
              f.get("zoneName") and f.get("zoneName") == t.get("zone"),
+             JOIN_KEYS: ("zoneName", "zone"),
              EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
             {TO: Host,
              MATCHING_FN:
              lambda f, t:
              f.get("zoneName") and f.get("zoneName") == t.get("zone"),
+             JOIN_KEYS: ("zoneName", "zone"),
              EDGE_ATTRIBUTES:
              {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
             ]
@@ -1161,15 +1477,10 @@ class Aggregate(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        # For every Aggregate in the cloud...
-        for entry in nova_client.aggregates.list():
-            # Make a dict for this entry, and concoct a unique id for it.
-            this_entry = entry.to_dict()
+        # For every Aggregate in the cloud, concoct a unique id.
+        for this_entry in nova_listing("aggregates"):
             this_entry[cls.native_id_key()] = \
                 cls.native_id_from_attributes(this_entry)
 
@@ -1209,10 +1520,7 @@ class Flavor(PolyResource):
         """Because this is a topological leaf node, the returned list contains
         one entry. """
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
-        if nova_client.flavors.list():
+        if nova_listing("flavors"):
             return [{"name": "flavors",
                      cls.native_id_key(): "flavors",
                      cls.resource_type_name_key(): cls.unique_class_id()}]
@@ -1238,11 +1546,13 @@ class Flavor(PolyResource):
              MATCHING_FN:
              lambda f, t:
              f.get("id") and f.get("id") == t.get("flavor", {}).get("id"),
+             JOIN_KEYS: ("id", _flavor_id),
              EDGE_ATTRIBUTES: {TYPE: DEFINES, MIN: 0, MAX: sys.maxint}},
             {TO: Server,
              MATCHING_FN:
              lambda f, t:
              f.get("id") and f.get("id") == t.get("flavor", {}).get("id"),
+             JOIN_KEYS: ("id", _flavor_id),
              EDGE_ATTRIBUTES:
              {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
             ]
@@ -1269,13 +1579,10 @@ class Keypair(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        for entry in nova_client.keypairs.list():
-            this_entry = entry.to_dict()["keypair"]
+        for entry in nova_listing("keypairs"):
+            this_entry = entry["keypair"]
 
             # Add the name of the resource type.
             this_entry[cls.resource_type_name_key()] = cls.unique_class_id()
@@ -1346,9 +1653,7 @@ class Host(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-        hosts = [x.to_dict() for x in nova_client.hosts.list()]
+        hosts = nova_listing("hosts")
 
         # Nova has no problem showing you multiple instance of the same host.
         # If a host shows up multiple times in the list, it probably has
@@ -1398,18 +1703,21 @@ class Host(PolyResource):
              MATCHING_FN:
              lambda f, t:
              f.get("host_name") and f.get("host_name") in t.get("hosts", []),
+             JOIN_KEYS: ("host_name", "hosts"),
              EDGE_ATTRIBUTES: {TYPE: MEMBER_OF, MIN: 0, MAX: sys.maxint}},
             {TO: Hypervisor,
              MATCHING_FN:
              lambda f, t:
              f.get("host_name") and
              f.get("host_name") == t.get("hypervisor_hostname"),
+             JOIN_KEYS: ("host_name", "hypervisor_hostname"),
              EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: 1}},
             {TO: Hypervisor,
              MATCHING_FN:
              lambda f, t:
              f.get("host_name") and
              f.get("host_name") == t.get("hypervisor_hostname"),
+             JOIN_KEYS: ("host_name", "hypervisor_hostname"),
              EDGE_ATTRIBUTES:
              {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: 1}},
             ]
@@ -1442,15 +1750,10 @@ class Hypervisor(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        # For every Hypervisor in the cloud...
-        for entry in nova_client.hypervisors.list():
-            # Make a dict for this entry, and concoct a unique id for it.
-            this_entry = entry.to_dict()
+        # For every Hypervisor in the cloud, concoct a unique id.
+        for this_entry in nova_listing("hypervisors"):
             this_entry[cls.native_id_key()] = \
                 cls.native_id_from_attributes(this_entry)
 
@@ -1482,12 +1785,14 @@ class Hypervisor(PolyResource):
                  lambda f, t:
                  f.get("id") and
                  f.get("id") == t.get("OS-EXT-SRV-ATTR:hypervisor_hostname"),
+                 JOIN_KEYS: ("id", "OS-EXT-SRV-ATTR:hypervisor_hostname"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Server,
                  MATCHING_FN:
                  lambda f, t:
                  f.get("id") and
                  f.get("id") == t.get("OS-EXT-SRV-ATTR:hypervisor_hostname"),
+                 JOIN_KEYS: ("id", "OS-EXT-SRV-ATTR:hypervisor_hostname"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 ]
@@ -1514,13 +1819,9 @@ class Cloudpipe(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        for entry in nova_client.cloudpipe.list():
-            this_entry = entry.to_dict()
+        for this_entry in nova_listing("cloudpipe"):
 
             # Indicate that the cloudpipe has no name, and add the name of the
             # resource type.
@@ -1544,6 +1845,7 @@ class Cloudpipe(PolyResource):
             {TO: Server,
              MATCHING_FN:
              lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+             JOIN_KEYS: ("id", "id"),
              EDGE_ATTRIBUTES: {TYPE: INSTANCE_OF, MIN: 1, MAX: 1}},
             ]
 
@@ -1564,14 +1866,10 @@ class ServerGroup(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
         # For every ServerGroup...
-        for entry in nova_client.server_groups.list():
-            this_entry = entry.to_dict()
+        for this_entry in nova_listing("server_groups"):
 
             # Add the name of the resource type.
             this_entry[cls.resource_type_name_key()] = cls.unique_class_id()
@@ -1599,14 +1897,11 @@ class Server(PolyResource):
         """Because this is a topological leaf node, the returned list contains
         one entry per availability_zone."""
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
         seen_zones = set()
 
-        for entry in nova_client.servers.list(search_opts={"all_tenants": 1}):
-            zone = entry.to_dict()["OS-EXT-AZ:availability_zone"]
+        for entry in nova_listing("servers", search_opts={"all_tenants": 1}):
+            zone = entry["OS-EXT-AZ:availability_zone"]
 
             if zone not in seen_zones:
                 # We haven't seen this zone before.  Add it.
@@ -1631,6 +1926,7 @@ class Server(PolyResource):
                  t.get("mac_addr") in
                  [y["OS-EXT-IPS-MAC:mac_addr"]
                   for x in f.get("addresses").values() for y in x],
+                 JOIN_KEYS: (_mac_addrs, "mac_addr"),
                  EDGE_ATTRIBUTES: {TYPE: OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: Interface,
                  MATCHING_FN:
@@ -1639,12 +1935,14 @@ class Server(PolyResource):
                  t.get("mac_addr") in
                  [y["OS-EXT-IPS-MAC:mac_addr"]
                   for x in f.get("addresses").values() for y in x],
+                 JOIN_KEYS: (_mac_addrs, "mac_addr"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 {TO: ServerGroup,
                  MATCHING_FN:
                  lambda f, t:
                  f.get("hostId") and f.get("hostId") in t["members"],
+                 JOIN_KEYS: ("hostId", "members"),
                  EDGE_ATTRIBUTES: {TYPE: MEMBER_OF, MIN: 0, MAX: sys.maxint}},
                 {TO: Volume,
                  MATCHING_FN:
@@ -1693,14 +1991,13 @@ class Interface(PolyResource):
     def clouddata(cls):
 
         nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
 
         # Each server has an interface list. Since we're interested in the
         # Interfaces themselves, we flatten the list, and de-dup it.
         raw = [x.to_dict()
                for y in
-               nova_client.servers.list(search_opts={"all_tenants": 1})
-               for x in y.interface_list()]
+               nova_listing("servers", search_opts={"all_tenants": 1})
+               for x in nova_client.servers.interface_list(y["id"])]
 
         mac_addresses = set()
         result = []
@@ -1732,6 +2029,7 @@ class Interface(PolyResource):
                  MATCHING_FN:
                  lambda f, t: f.get("mac_addr") and
                  f.get("mac_addr") == t["mac_address"],
+                 JOIN_KEYS: ("mac_addr", "mac_address"),
                  EDGE_ATTRIBUTES: {TYPE: ATTACHED_TO, MIN: 0, MAX: 1}},
                 ]
 
@@ -1752,13 +2050,9 @@ class NovaLimits(PolyResource):
     @classmethod
     def clouddata(cls):
 
-        nova_client = get_nova_client()["client"]
-        nova_client.client.authenticate()
-
         result = []
 
-        for entry in nova_client.limits.list():
-            this_entry = entry.to_dict()
+        for this_entry in nova_listing("limits"):
 
             # This has no name, and add the name of the resource type.
             this_entry[cls.resource_name_key()] = "None"
@@ -1843,6 +2137,7 @@ class Image(PolyResource):
         return [{TO: Server,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f.get("id") == t.get("id"),
+                 JOIN_KEYS: ("id", "id"),
                  EDGE_ATTRIBUTES: {TYPE: DEFINES, MIN: 0, MAX: sys.maxint}},
                 ]
 
@@ -2002,6 +2297,7 @@ class Snapshot(PolyResource):
                  MATCHING_FN:
                  lambda f, t:
                  f.get("id") and f.get("id") == t.get("snapshot_id"),
+                 JOIN_KEYS: ("id", "snapshot_id"),
                  EDGE_ATTRIBUTES: {TYPE: APPLIES_TO, MIN: 1, MAX: 1}},
                 ]
 
@@ -2082,10 +2378,12 @@ class VolumeType(PolyResource):
         return [{TO: Volume,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t.get("volume_type"),
+                 JOIN_KEYS: ("id", "volume_type"),
                  EDGE_ATTRIBUTES: {TYPE: APPLIES_TO, MIN: 0, MAX: sys.maxint}},
                 {TO: Volume,
                  MATCHING_FN:
                  lambda f, t: f.get("id") and f["id"] == t.get("volume_type"),
+                 JOIN_KEYS: ("id", "volume_type"),
                  EDGE_ATTRIBUTES:
                  {TYPE: TOPOLOGICALLY_OWNS, MIN: 0, MAX: sys.maxint}},
                 ]
@@ -13,12 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from datetime import datetime, timedelta
-from django.conf import settings
 import logging
-import networkx
 import sys
 
+from django.conf import settings
+import networkx
+
 from goldstone.addons.models import Addon as AddonTable
+from .graphfile import MappedGraph
+from .graphstore import GraphNode, NodeIndexes, ResourceGraph
 from .models import User, Domain, Group, Token, Credential, Role, Region, \
     Endpoint, Service, Project, AvailabilityZone, Aggregate, \
     Flavor, Keypair, Host, Hypervisor, Cloudpipe, ServerGroup, Server, \
@@ -27,7 +30,8 @@ from .models import User, Domain, Group, Token, Credential, Role, Region, \
     RemoteGroup, SecurityRules, SecurityGroup, Port, LBVIP, LBPool, \
     HealthMonitor, FloatingIP, FloatingIPPool, FixedIP, LBMember, Subnet, \
     Network, Router, Addon, PolyResource, Cinder, Glance, Nova, Neutron, \
-    Keystone, Transfer
+    Keystone, Transfer, PolyResourceTombstone, utc_now
+from .snapshots import GraphSnapshots
 
 # These are the types of resources in an OpenStack cloud.
 RESOURCE_TYPES = [User, Domain, Group, Token, Credential, Role, Region,
@@ -52,31 +56,6 @@ MIN = settings.R_ATTRIBUTE.MIN
 logger = logging.getLogger(__name__)
 
 
-class GraphNode(object):
-    """A Resource graph node."""
-
-    # This node's Goldstone UUID.
-    uuid = None
-
-    # This node's Resource Type.
-    resourcetype = None
-
-    # This node's attributes. E.g., from get_xxxxx_client().
-    attributes = {}
-
-    def __init__(self, **kwargs):
-        """Initialize the object."""
-
-        self.uuid = kwargs.get("uuid")
-        self.resourcetype = kwargs.get("resourcetype")
-        self.attributes = kwargs.get("attributes", {})
-
-    def __repr__(self):
-        """Return a useful string."""
-
-        return "<%s, %s>" % (self.uuid, self.resourcetype().label())
-
-
 class Graph(object):
     """The base class for Resource Type and Instance graphs.
 
@@ -213,6 +192,15 @@ class Instances(Graph):
     # How often to refresh the graph from the database.
     PERIOD = timedelta(minutes=2)
 
+    # If True, a refresh patches the graph with only the rows that changed
+    # since the last refresh. Otherwise, the entire graph is re-unpacked.
+    INCREMENTAL = True
+
+    # A changed row may be committed slightly after its updated timestamp was
+    # set. Refreshes look this far before the last refresh time, so that such
+    # rows aren't missed. Re-reading a row is harmless.
+    OVERLAP = timedelta(seconds=30)
+
     def __init__(self):              # pylint: disable=W0231
         """Initialize the object, and unpack the persistent graph data into it.
 
@@ -228,6 +216,22 @@ class Instances(Graph):
         # When the graph object was last updated.
         self._timestamp = datetime.now()
 
+        # The UTC time at which the last unpack or refresh started reading the
+        # database.
+        self._refreshed = None
+
+        # The version of the snapshot from which the graph was loaded, or None.
+        self._version = None
+
+        # Incremented whenever the graph object is replaced or patched.
+        self._generation = 0
+
+        # Lookup indexes into the graph. These are built lazily, and are
+        # rebuilt whenever the generation() from which they were built
+        # changes.
+        self._indexes = NodeIndexes()
+        self._indexed_generation = None
+
     @staticmethod
     def unpack():
         """Return a graph object that was unpaced fromk the persistent graph
@@ -240,40 +244,30 @@ class Instances(Graph):
 
         """
 
-        def get_uuid(uuid):
-            """Return the graph node having this UUID.
-
-            :param UUID: A resource graph UUID
-            :type UUID: str
-            :return: A node
-            :rtype: GraphNode or None
-
-            """
-
-            for entry in graph.nodes():
-                if entry.uuid == uuid:
-                    return entry
-
-            return None
-
-        # Start with an empty graph.
-        graph = networkx.MultiDiGraph()
+        # Start with an empty graph, and a UUID -> node map used to find the
+        # edges' endpoints.
+        graph = ResourceGraph()
+        uuid_index = {}
 
         # Collect the table nodes once.
         nodes = PolyResource.objects.all()
 
         # Create all the nodes.
         for node in nodes:
-            graph.add_node(GraphNode(uuid=node.uuid,
-                                     resourcetype=type(node),
-                                     attributes=node.cloud_attributes))
+            graphnode = GraphNode(uuid=node.uuid,
+                                  resourcetype=type(node),
+                                  native_id=node.native_id,
+                                  native_name=node.native_name,
+                                  attributes=node.cloud_attributes)
+            graph.add_node(graphnode)
+            uuid_index[node.uuid] = graphnode
 
         # Create all the edges.
         for node in nodes:
             for edge in node.edges:
                 # Get the source and destination nodes in the graph.
-                source_node = get_uuid(node.uuid)
-                dest_node = get_uuid(edge[0])
+                source_node = uuid_index.get(node.uuid)
+                dest_node = uuid_index.get(edge[0])
 
                 # If either aren't there, it could be because of a database
                 # inonsistency or a deleted add-on. Log it and skip it.
@@ -298,18 +292,197 @@ class Instances(Graph):
     def graph(self):
         """Return a lazy-evaluated graph object.
 
-        The graph is unpacked from the database if it's never been unpacked, or
-        if was last unpacked more than N time units ago.
+        The graph is loaded if it's never been loaded, or if was last loaded
+        more than N time units ago. It's taken from the current snapshot if
+        there is one. Otherwise, it's refreshed from the rows that changed
+        since the last load, or unpacked from the database.
+
+        A snapshot that was published to a file is a read-only MappedGraph.
+        Other graphs are ResourceGraphs.
 
         """
 
         if self._graph is None or \
            self._timestamp + self.PERIOD < datetime.now():
-            self._graph = self.unpack()
+            # If settings.RESOURCE_GRAPH_SNAPSHOTS is True, the graph is
+            # loaded from the snapshots published by the celery task that
+            # updates the persistent graph. We fall back to unpacking or
+            # refreshing the graph from the database if no snapshot is
+            # available.
+            if settings.RESOURCE_GRAPH_SNAPSHOTS and self._load_snapshot():
+                # The graph is the current snapshot.
+                pass
+            elif isinstance(self._graph, ResourceGraph) and \
+                    self.INCREMENTAL and \
+                    self._refreshed is not None and \
+                    self._refreshed + PolyResourceTombstone.LIFETIME > \
+                    utc_now():
+                self._refresh()
+            else:
+                self._refreshed = utc_now()
+                self._graph = self.unpack()
+                self._version = None
+                self._generation += 1
+
             self._timestamp = datetime.now()
 
         return self._graph
 
+    def _load_snapshot(self):
+        """Swap in the current graph snapshot if it's newer than our graph.
+
+        :return: True if the graph is now the current snapshot, False if
+                 there's no usable snapshot
+        :rtype: bool
+
+        """
+        from redis import RedisError
+
+        snapshots = GraphSnapshots()
+
+        try:
+            version = snapshots.version()
+
+            if version is None:
+                return False
+            elif version == self._version and self._graph is not None:
+                return True
+
+            snapshot = snapshots.load(version)
+        except RedisError:
+            logger.warning("Couldn't read the resource graph snapshot",
+                           exc_info=True)
+            return False
+
+        if snapshot is None:
+            return False
+
+        # Swap in the new graph. The lookup indexes will be rebuilt because
+        # the graph object changed.
+        self._graph, self._refreshed = snapshot
+        self._version = version
+        self._generation += 1
+
+        return True
+
+    def _refresh(self):
+        """Patch the graph with the persistent rows that changed since the
+        last refresh.
+
+        Changed rows are found through their updated timestamps, and deleted
+        rows through their tombstones. A changed row's node is updated in
+        place, so that edges coming into it from unchanged rows are kept, and
+        its outgoing edges are replaced.
+
+        """
+
+        graph = self._graph
+        self._check_indexes(graph)
+
+        since = self._refreshed - self.OVERLAP
+        self._refreshed = utc_now()
+        self._generation += 1
+
+        # Remove the deleted rows' nodes. This also removes their edges.
+        for uuid in PolyResourceTombstone.objects \
+                .filter(deleted__gte=since) \
+                .values_list("uuid", flat=True):
+            node = self._indexes.get_uuid(uuid)
+
+            if node is not None:
+                self._indexes.remove(node)
+                graph.remove_node(node)
+
+        # Add or update the changed rows' nodes.
+        rows = PolyResource.objects.filter(updated__gte=since)
+
+        for row in rows:
+            node = self._indexes.get_uuid(row.uuid)
+
+            if node is None:
+                node = GraphNode(uuid=row.uuid,
+                                 resourcetype=type(row),
+                                 native_id=row.native_id,
+                                 native_name=row.native_name,
+                                 attributes=row.cloud_attributes)
+                graph.add_node(node)
+                self._indexes.add(node)
+            else:
+                self._indexes.remove(node)
+                node.native_id = row.native_id
+                node.native_name = row.native_name
+                node.attributes = row.cloud_attributes
+                self._indexes.add(node)
+
+                graph.remove_edges_from(graph.out_edges(node, keys=True))
+
+        # Now that all the nodes are present, replace the changed rows'
+        # outgoing edges.
+        for row in rows:
+            source_node = self._indexes.get_uuid(row.uuid)
+
+            for edge in row.edges:
+                dest_node = self._indexes.get_uuid(edge[0])
+
+                if dest_node is None:
+                    logger.warning("Missing destination node in refreshed "
+                                   "graph state: source uuid %s, source "
+                                   "native_id %s, destination uuid %s",
+                                   row.uuid,
+                                   row.native_id,
+                                   edge[0])
+                    continue
+
+                graph.add_edge(source_node, dest_node, attr_dict=edge[1])
+
+        # The indexes were patched along with the graph.
+        self._indexed_generation = (self._generation, graph.changes)
+
+    def generation(self):
+        """Return a value that changes whenever the graph does.
+
+        Data derived from the graph can be cached under this value. It changes
+        when a snapshot is swapped in, when the graph is unpacked or
+        refreshed, and when the graph's nodes or edges are changed directly
+        (e.g., by unit tests).
+
+        :rtype: tuple
+
+        """
+
+        graph = self.graph
+        return (self._generation, graph.changes)   # pylint: disable=E1101
+
+    def _lookups(self):
+        """Return the lookup indexes of the current graph object.
+
+        A MappedGraph has its own, in its file.
+
+        """
+
+        graph = self.graph
+
+        if isinstance(graph, MappedGraph):
+            return graph
+
+        self._check_indexes(graph)
+        return self._indexes
+
+    def _check_indexes(self, graph):
+        """Rebuild the lookup indexes if they weren't built from the current
+        generation of a graph object.
+
+        :param graph: The current graph object
+        :type graph: ResourceGraph
+
+        """
+
+        generation = (self._generation, graph.changes)
+
+        if self._indexed_generation != generation:
+            self._indexes = NodeIndexes(graph.nodes_iter())
+            self._indexed_generation = generation
+
     def get_uuid(self, uuid):
         """Return the node having this UUID.
 
@@ -320,11 +493,36 @@ class Instances(Graph):
 
         """
 
-        for entry in self.graph.nodes():
-            if entry.uuid == uuid:
-                return entry
+        return self._lookups().get_uuid(uuid)
 
-        return None
+    def get_native_id(self, nodetype, native_id):
+        """Return the node of a resource type having this native id.
+
+        Native ids are unique only within a resource type, so the type must
+        also be supplied.
+
+        :param nodetype: The node's Resource Type
+        :type nodetype: A node in Types
+        :param native_id: The node's cloud id
+        :type native_id: str
+        :return: A node
+        :rtype: GraphNode or None
+
+        """
+
+        return self._lookups().get_native_id(nodetype, native_id)
+
+    def get_attribute_id(self, value):
+        """Return the node having this id in one of its id-like attributes.
+
+        :param value: A cloud id, with or without dashes
+        :type value: str
+        :return: A node
+        :rtype: GraphNode or None
+
+        """
+
+        return self._lookups().get_attribute_id(value)
 
     def nodes_of_type(self, nodetype):
         """Return all the instances that are of type <nodetype>.
@@ -332,12 +530,23 @@ class Instances(Graph):
         :param nodetype: The Resource Type that is desired
         :type nodetype: A node in Types
         :return: All the nodes in the Instances graph that have a type equal to
-                 <nodetype>
+                 <nodetype>, in UUID order
         :rtype: list of node
 
         """
 
-        return [x for x in self.graph.nodes() if x.resourcetype == nodetype]
+        return self._lookups().nodes_of_type(nodetype)
+
+    def count_of_type(self, nodetype):
+        """Return the number of instances that are of type <nodetype>.
+
+        :param nodetype: The Resource Type that is desired
+        :type nodetype: A node in Types
+        :rtype: int
+
+        """
+
+        return self._lookups().count_of_type(nodetype)
 
     @staticmethod
     def locate(nodelist, source_fn, source_value):
@@ -0,0 +1,967 @@
+"""Rollups of metric and API performance statistics, and of log counts.
+
+A week-long aggregation over raw documents scans millions of them. So, a
+periodic task summarizes the raw documents into rollup documents, per rollup
+tier time bucket (e.g., one minute and one hour) and per combination of key
+field values. Each one holds the count, sum, min, max and sum of squares of
+the source's value field, which is enough to rebuild extended statistics,
+or just the count for a source without statistics, like logs.
+
+An aggregation view then answers from the coarsest tier whose bucket evenly
+divides the requested interval. The rolled-up span of the request's time
+range comes from the rollup documents, and its ends come from the raw
+documents.
+
+"""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+
+from django.conf import settings
+
+from goldstone.drfes.utils import interval_seconds
+from goldstone.glogging.models import LogData
+from .models import MetricData, ApiPerfData, RollupData
+
+logger = logging.getLogger(__name__)
+
+# The redis key under which a tier's progress is kept. It's formatted with the
+# tier and "origin" or "watermark". The rollup documents of a tier cover
+# [origin, watermark), in epoch milliseconds.
+PROGRESS_KEY = "goldstone:rollup:%s:%s"
+
+# The raw documents' time field.
+TIME_FIELD = '@timestamp'
+
+# The names of the aggregations, within a rebuilt aggregation response. These
+# are what the aggregation views' serializers expect.
+DATEHIST_AGG_NAME = 'per_interval'
+STATS_AGG_NAME = 'stats'
+UNIT_AGG_NAME = 'units'
+RANGE_AGG_NAME = 'response_status'
+HOST_AGG_NAME = 'per_host'
+LEVEL_AGG_NAME = 'per_level'
+
+# The number of terms that LogData.ranged_log_agg's terms aggregations return.
+LOG_TERMS_SIZE = 10
+
+# The fields that a rollup document summarizes.
+STATS_FIELDS = ('count', 'sum', 'min', 'max', 'sum_of_squares')
+
+# The rolled-up sources. Each one is rolled up for every grouping, which is a
+# tuple of key fields. An aggregation request can use rollups if its query
+# parameters, other than its reserved ones, are exactly one grouping's
+# fields. A source's "queries" can instead map each allowed set of query
+# parameters to the grouping that answers it. A key field is aggregated on
+# its exact-value form unless the source's "fields" say otherwise.
+SOURCES = {'metric': {'model': MetricData,
+                      'groupings': [('name', ), ('name', 'node')]},
+           'apiperf': {'model': ApiPerfData,
+                       'groupings': [(), ('component', )]},
+           'log': {'model': LogData,
+                   'groupings': [('host', 'syslog_severity')],
+                   'queries': {(): ('host', 'syslog_severity')},
+                   'fields': {'host': 'host.raw',
+                              'syslog_severity': 'syslog_severity'}},
+           }
+
+
+def _step(tier):
+    """Return a rollup tier's bucket length, in milliseconds."""
+
+    return int(interval_seconds(tier) * 1000)
+
+
+def _ranges(model):
+    """Return a model's response range keys, or [] if it has no range
+    aggregation."""
+
+    if not hasattr(model, 'range_agg'):
+        return []
+
+    return ["%s-%s" % (float(x['from']), float(x['to']))
+            for x in model.range_agg().to_dict()['range']['ranges']]
+
+
+def _key_field(source, field):
+    """Return the name of the field to aggregate a source's key field on."""
+
+    if field in source.get('fields', {}):
+        return source['fields'][field]
+
+    model = source['model']
+    return field + ".raw" if model.field_has_raw(field) else field
+
+
+def _queries(source):
+    """Return a source's map of sorted query parameters to the grouping that
+    answers them."""
+
+    if 'queries' in source:
+        return source['queries']
+
+    return dict((tuple(sorted(x)), x) for x in source['groupings'])
+
+
+def _leaves(bucket, fields, keys):
+    """Yield the key values and innermost bucket of each grouping within a
+    bucket, which is nested by terms aggregations named after the fields."""
+
+    if not fields:
+        yield keys, bucket
+        return
+
+    for inner in bucket[fields[0]]['buckets']:
+        for leaf in _leaves(inner, fields[1:], keys + [inner['key']]):
+            yield leaf
+
+
+def _progress(conn, tier):
+    """Return a tier's rollup origin and watermark, or Nones if it hasn't been
+    rolled up."""
+
+    origin, watermark = conn.mget(PROGRESS_KEY % (tier, "origin"),
+                                  PROGRESS_KEY % (tier, "watermark"))
+
+    if origin is None or watermark is None:
+        return None, None
+
+    return int(origin), int(watermark)
+
+
+##########
+# Writes #
+##########
+
+def _doc_id(*args):
+    """Return a rollup document's id, so that rewriting a bucket replaces its
+    documents."""
+    from hashlib import sha256
+
+    return sha256(repr(args)).hexdigest()
+
+
+def _rollup_search(source, grouping, tier, start, end):
+    """Return the search that aggregates a source's raw documents into the
+    statistics of one grouping and tier, over a time span.
+
+    :param source: The source
+    :type source: dict
+    :param grouping: The key fields
+    :type grouping: tuple of str
+    :param tier: The rollup tier, e.g., "1m"
+    :type tier: str
+    :param start: The span's start, in epoch milliseconds
+    :type start: int
+    :param end: The span's end (exclusive), in epoch milliseconds
+    :type end: int
+    :rtype: Search
+
+    """
+
+    model = source['model']
+
+    search = model.search().params(search_type="count") \
+        .filter('range', **{TIME_FIELD: {'gte': start, 'lt': end}})
+
+    agg = search.aggs.bucket(DATEHIST_AGG_NAME,
+                             'date_histogram',
+                             field=TIME_FIELD,
+                             interval=tier,
+                             min_doc_count=1)
+
+    for field in grouping:
+        agg = agg.bucket(field, 'terms', field=_key_field(source, field),
+                         size=0)
+
+    if hasattr(model, 'stats_agg'):
+        agg.metric(STATS_AGG_NAME, model.stats_agg())
+    if hasattr(model, 'units_agg'):
+        agg.bucket(UNIT_AGG_NAME, model.units_agg())
+    if hasattr(model, 'range_agg'):
+        agg.bucket(RANGE_AGG_NAME, model.range_agg())
+
+    return search
+
+
+def _rollup_doc(leaf, stats, ranges):
+    """Return the statistics fields of a rollup document.
+
+    :param leaf: A grouping's innermost bucket
+    :type leaf: dict
+    :param stats: The bucket's statistics
+    :type stats: dict
+    :param ranges: The source's response range keys
+    :type ranges: list of str
+    :rtype: dict
+
+    """
+
+    result = dict((x, stats[x]) for x in STATS_FIELDS if x in stats)
+
+    if UNIT_AGG_NAME in leaf:
+        result[UNIT_AGG_NAME] = \
+            [x['key'] for x in leaf[UNIT_AGG_NAME]['buckets']]
+
+    for i, key in enumerate(ranges):
+        result["%s_%d" % (RANGE_AGG_NAME, i)] = \
+            leaf[RANGE_AGG_NAME]['buckets'][key]['doc_count']
+
+    return result
+
+
+def _rollup_docs(name, grouping, tier, start, end):
+    """Yield the rollup documents for one source, grouping, and tier, over a
+    time span.
+
+    :param name: The source's name
+    :type name: str
+    :param grouping: The key fields
+    :type grouping: tuple of str
+    :param tier: The rollup tier, e.g., "1m"
+    :type tier: str
+    :param start: The span's start, in epoch milliseconds
+    :type start: int
+    :param end: The span's end (exclusive), in epoch milliseconds
+    :type end: int
+    :return: The index name, document id, and document for each rollup
+    :rtype: generator of tuple
+
+    """
+    import arrow
+
+    source = SOURCES[name]
+    ranges = _ranges(source['model'])
+
+    response = _rollup_search(source, grouping, tier, start, end) \
+        .execute().aggregations.to_dict()
+
+    for bucket in response[DATEHIST_AGG_NAME]['buckets']:
+        when = arrow.get(bucket['key'] / 1000.0)
+
+        for keys, leaf in _leaves(bucket, list(grouping), []):
+            stats = leaf.get(STATS_AGG_NAME, {'count': leaf['doc_count']})
+            if not stats['count']:
+                continue
+
+            doc = {TIME_FIELD: when.isoformat(),
+                   'source': name,
+                   'tier': tier,
+                   'grouping': ",".join(grouping)}
+            doc.update(zip(grouping, keys))
+            doc.update(_rollup_doc(leaf, stats, ranges))
+
+            yield (RollupData.INDEX_PREFIX + when.format('YYYY.MM.DD'),
+                   _doc_id(name, grouping, tier, keys, bucket['key']),
+                   doc)
+
+
+def _span(conn, tier, now):
+    """Return the span of a tier to roll up now.
+
+    The span ends settings.ROLLUP_DELAY ago. It starts at the tier's
+    watermark, less settings.ROLLUP_REROLL, so that documents that arrived
+    late are added to the buckets that were already rolled up.
+
+    A tier whose buckets are longer than settings.ROLLUP_REROLL would re-roll
+    a whole bucket on every run, to add a few minutes' late documents. So its
+    span ends settings.ROLLUP_DELAY plus settings.ROLLUP_REROLL ago, and each
+    bucket is rolled up once, after its late documents have arrived.
+
+    :param conn: A redis connection
+    :type conn: StrictRedis
+    :param tier: The rollup tier
+    :type tier: str
+    :param now: The time, in epoch milliseconds
+    :type now: int
+    :return: The span's start and end (exclusive), in epoch milliseconds
+    :rtype: tuple of int
+
+    """
+
+    def millis(delta):
+        """Return a timedelta in milliseconds."""
+
+        return int(delta.total_seconds() * 1000)
+
+    step = _step(tier)
+    delay = millis(settings.ROLLUP_DELAY)
+    reroll = millis(settings.ROLLUP_REROLL)
+
+    if step > reroll:
+        delay, reroll = delay + reroll, 0
+
+    end = now - delay
+    end -= end % step
+
+    origin, watermark = _progress(conn, tier)
+    if watermark is None:
+        origin = end - millis(settings.ROLLUP_BACKFILL)
+        origin -= origin % step
+        watermark = origin
+        conn.set(PROGRESS_KEY % (tier, "origin"), origin)
+
+    end = min(end, watermark + millis(settings.ROLLUP_MAX_SPAN))
+    end -= end % step
+
+    start = max(origin, watermark - reroll)
+    start -= start % step
+
+    return start, end
+
+
+def _tier_docs(tier, start, end):
+    """Yield every source's and grouping's rollup documents for one tier,
+    over a time span.
+
+    :return: The index name, document id, and document for each rollup
+    :rtype: generator of tuple
+
+    """
+
+    for name, source in SOURCES.items():
+        for grouping in source['groupings']:
+            for doc in _rollup_docs(name, grouping, tier, start, end):
+                yield doc
+
+
+def update_rollups():
+    """Roll up the raw documents that have arrived since the last update.
+
+    See _span for the time span of each tier that's rolled up. Documents that
+    arrive more than settings.ROLLUP_DELAY plus settings.ROLLUP_REROLL late
+    are missing from the rollups, and so from the aggregations that use
+    them.
+
+    """
+    import time
+    from goldstone.models import BulkWriter, RedisConnection
+
+    # pylint: disable=E1101,W0212
+    doc_type = RollupData._doc_type.name
+    conn = RedisConnection().conn
+    now = int(time.time() * 1000)
+
+    for tier in settings.ROLLUP_TIERS:
+        start, end = _span(conn, tier, now)
+
+        if end <= start:
+            continue
+
+        # Rollup documents have deterministic ids, so re-rolling a bucket, or
+        # retrying after a failure part way through, rewrites the same
+        # documents.
+        with BulkWriter() as writer:
+            for index, doc_id, doc in _tier_docs(tier, start, end):
+                writer.add(index, doc_type, doc, doc_id)
+
+        if writer.failed:
+            # Leave the watermark, so that the span is rolled up again.
+            logger.warning("[update_rollups] %d %s rollups failed",
+                           writer.failed, tier)
+            continue
+
+        conn.set(PROGRESS_KEY % (tier, "watermark"), end)
+        logger.debug("[update_rollups] rolled up %s to %d", tier, end)
+
+
+#########
+# Reads #
+#########
+
+def _range_bounds(view, request):
+    """Return an aggregation request's time range, if it has a numeric lower
+    bound.
+
+    :param view: The aggregation view
+    :type view: ElasticListAPIView
+    :param request: The HTTP request
+    :type request: Request
+    :return: The range's query parameter, bounds, and lower and upper bound
+             operators; or None
+    :rtype: tuple or None
+
+    """
+    import ast
+
+    range_param = getattr(view, 'AGG_FIELD', TIME_FIELD) + "__range"
+    try:
+        bounds = ast.literal_eval(request.query_params.get(range_param, ""))
+    except (ValueError, SyntaxError):
+        return None
+
+    if not isinstance(bounds, dict) or \
+            not all(isinstance(x, (int, long, float))
+                    for x in bounds.values()):
+        return None
+
+    low_op = "gt" if "gt" in bounds else "gte"
+    high_op = "lt" if "lt" in bounds else "lte"
+
+    return (range_param, bounds, low_op, high_op) if low_op in bounds \
+        else None
+
+
+def _query_keys(view, request, range_param):
+    """Return an aggregation request's query parameters, other than its
+    reserved ones and its time range.
+
+    :param view: The aggregation view
+    :type view: ElasticListAPIView
+    :param request: The HTTP request
+    :type request: Request
+    :param range_param: The time range's query parameter
+    :type range_param: str
+    :rtype: dict
+
+    """
+
+    reserved = set(view.reserved_params +
+                   [view.pagination_class.page_query_param,
+                    view.pagination_class.page_size_query_param,
+                    view.pagination_class.cursor_query_param,
+                    range_param, 'interval'])
+
+    return dict((param, request.query_params.get(param))
+                for param in request.query_params if param not in reserved)
+
+
+def _tier_span(conn, seconds, bounds, low_op, high_op):
+    """Return the coarsest rollup tier that divides an interval, and covers a
+    whole bucket of a time range.
+
+    :param conn: A redis connection
+    :type conn: StrictRedis
+    :param seconds: The interval, in seconds
+    :type seconds: float
+    :param bounds: The time range
+    :type bounds: dict
+    :param low_op: The range's lower bound operator
+    :type low_op: str
+    :param high_op: The range's upper bound operator
+    :type high_op: str
+    :return: The tier, and the start and end (exclusive) of its rolled-up
+             span of the range; or None
+    :rtype: tuple or None
+
+    """
+
+    for tier in sorted(settings.ROLLUP_TIERS,
+                       key=interval_seconds,
+                       reverse=True):
+        step = _step(tier)
+        if (seconds * 1000) % step:
+            continue
+
+        origin, watermark = _progress(conn, tier)
+        if origin is None:
+            continue
+
+        head = int(bounds[low_op]) // step * step
+        if head < bounds[low_op] or low_op == "gt":
+            head += step
+
+        tail = watermark
+        if high_op in bounds:
+            tail = min(tail, int(bounds[high_op]) // step * step)
+
+        if origin <= head < tail:
+            return tier, head, tail
+
+    return None
+
+
+def _plan(view, request, interval):
+    """Return how rollups can answer an aggregation request, or None if they
+    can't.
+
+    :param view: The aggregation view
+    :type view: ElasticListAPIView
+    :param request: The HTTP request
+    :type request: Request
+    :param interval: The request's aggregation interval
+    :type interval: str
+    :rtype: dict or None
+
+    """
+    from redis import RedisError
+    from goldstone.models import RedisConnection
+
+    name = next((x for x, source in SOURCES.items()
+                 if source['model'] is view.Meta.model),
+                None)
+    seconds = interval_seconds(interval)
+    time_range = _range_bounds(view, request)
+
+    if name is None or not seconds or time_range is None:
+        return None
+
+    # The other query parameters must be exactly one grouping's fields.
+    keys = _query_keys(view, request, time_range[0])
+    grouping = _queries(SOURCES[name]).get(tuple(sorted(keys)))
+    if grouping is None:
+        return None
+
+    bounds, low_op, high_op = time_range[1:]
+
+    try:
+        span = _tier_span(RedisConnection().conn, seconds, bounds, low_op,
+                          high_op)
+    except RedisError:
+        logger.warning("Couldn't read the rollup progress", exc_info=True)
+        return None
+
+    if span is None:
+        return None
+
+    return {'source': name,
+            'tier': span[0],
+            'grouping': grouping,
+            'keys': keys,
+            'head': span[1],
+            'tail': span[2],
+            'bounds': (bounds[low_op], bounds.get(high_op))}
+
+
+def _empty():
+    """Return the statistics of no documents."""
+
+    return {'count': 0, 'sum': 0, 'min': None, 'max': None,
+            'sum_of_squares': 0}
+
+
+def _merge(stats, other):
+    """Merge the statistics in other into stats."""
+
+    if not other['count']:
+        return
+
+    stats['count'] += other['count']
+    stats['sum'] += other['sum']
+    stats['sum_of_squares'] += other['sum_of_squares']
+
+    for field, choose in (('min', min), ('max', max)):
+        if stats[field] is None:
+            stats[field] = other[field]
+        else:
+            stats[field] = choose(stats[field], other[field])
+
+
+def _extended_stats(stats):
+    """Return merged statistics in the form of an extended_stats
+    aggregation."""
+    import math
+
+    count = stats['count']
+    if not count:
+        return {'count': 0, 'min': None, 'max': None, 'avg': None,
+                'sum': None, 'sum_of_squares': None, 'variance': None,
+                'std_deviation': None,
+                'std_deviation_bounds': {'upper': None, 'lower': None}}
+
+    avg = float(stats['sum']) / count
+    variance = max(float(stats['sum_of_squares']) / count - avg * avg, 0.0)
+    deviation = math.sqrt(variance)
+
+    return {'count': count,
+            'min': stats['min'],
+            'max': stats['max'],
+            'avg': avg,
+            'sum': stats['sum'],
+            'sum_of_squares': stats['sum_of_squares'],
+            'variance': variance,
+            'std_deviation': deviation,
+            'std_deviation_bounds': {'upper': avg + 2 * deviation,
+                                     'lower': avg - 2 * deviation}}
+
+
+def _stats_rollups(plan, interval, ranges, has_units):
+    """Return the search of the rollup documents that answer the rolled-up
+    span of a statistics aggregation.
+
+    :param plan: The _plan() result
+    :type plan: dict
+    :param interval: The date histogram interval
+    :type interval: str
+    :param ranges: The source's response range keys
+    :type ranges: list of str
+    :param has_units: Aggregate the units?
+    :type has_units: bool
+    :rtype: Search
+
+    """
+
+    search = RollupData.search().params(search_type="count") \
+        .filter('term', source=plan['source']) \
+        .filter('term', tier=plan['tier']) \
+        .filter('term', grouping=",".join(plan['grouping'])) \
+        .filter('range', **{TIME_FIELD: {'gte': plan['head'],
+                                         'lt': plan['tail']}})
+
+    for field, value in plan['keys'].items():
+        search = search.filter('term', **{field: value})
+
+    # pylint: disable=W0212
+    agg = search.aggs.bucket(DATEHIST_AGG_NAME,
+                             RollupData._datehist_agg(interval,
+                                                      plan['bounds'][0],
+                                                      plan['bounds'][1],
+                                                      0,
+                                                      TIME_FIELD))
+
+    for field in STATS_FIELDS:
+        agg.metric(field,
+                   field if field in ('min', 'max') else 'sum',
+                   field=field)
+    for i in range(len(ranges)):
+        field = "%s_%d" % (RANGE_AGG_NAME, i)
+        agg.metric(field, 'sum', field=field)
+
+    if has_units:
+        search.aggs.bucket(UNIT_AGG_NAME, 'terms', field=UNIT_AGG_NAME,
+                           size=0)
+
+    return search
+
+
+def _stats_buckets(raw, rollups, ranges):
+    """Return the merged statistics and range counts of each date histogram
+    bucket of a raw and a rollup aggregation response.
+
+    :param raw: The raw documents' aggregations
+    :type raw: dict
+    :param rollups: The rollup documents' aggregations
+    :type rollups: dict
+    :param ranges: The source's response range keys
+    :type ranges: list of str
+    :return: Bucket key -> {'stats': statistics, 'ranges': [count, ...]}
+    :rtype: dict
+
+    """
+
+    result = {}
+
+    def entry(key):
+        """Return a bucket's entry."""
+
+        return result.setdefault(key, {'stats': _empty(),
+                                       'ranges': [0] * len(ranges)})
+
+    for bucket in raw[DATEHIST_AGG_NAME]['buckets']:
+        merged = entry(bucket['key'])
+        _merge(merged['stats'], bucket[STATS_AGG_NAME])
+
+        for i, key in enumerate(ranges):
+            merged['ranges'][i] += \
+                bucket[RANGE_AGG_NAME]['buckets'][key]['doc_count']
+
+    for bucket in rollups[DATEHIST_AGG_NAME]['buckets']:
+        merged = entry(bucket['key'])
+        if bucket['doc_count']:
+            _merge(merged['stats'],
+                   dict((x, bucket[x]['value']) for x in STATS_FIELDS))
+
+        for i in range(len(ranges)):
+            merged['ranges'][i] += \
+                int(bucket["%s_%d" % (RANGE_AGG_NAME, i)]['value'] or 0)
+
+    return result
+
+
+def _stats_bucket(key, merged, ranges):
+    """Return a date histogram bucket of a statistics aggregation response.
+
+    :param key: The bucket key
+    :type key: int
+    :param merged: The bucket's _stats_buckets() entry
+    :type merged: dict
+    :param ranges: The source's response range keys
+    :type ranges: list of str
+    :rtype: dict
+
+    """
+
+    result = {'key': key,
+              'doc_count': merged['stats']['count'],
+              STATS_AGG_NAME: _extended_stats(merged['stats'])}
+
+    if ranges:
+        result[RANGE_AGG_NAME] = \
+            {'buckets': dict((x, {'doc_count': merged['ranges'][i]})
+                             for i, x in enumerate(ranges))}
+
+    return result
+
+
+def rollup_aggregations(view, request, search):    # pylint: disable=R0914
+    """Return the aggregations of an aggregation view's search, answering as
+    much of it from rollups as possible.
+
+    The view's search must have a date histogram named DATEHIST_AGG_NAME,
+    with an extended_stats aggregation named STATS_AGG_NAME in each bucket.
+    It may also have a top-level units aggregation, and a per-bucket range
+    aggregation, as MetricAggView and ApiPerfSummarizeView do.
+
+    :param view: The aggregation view
+    :type view: DateHistogramAggView
+    :param request: The HTTP request
+    :type request: Request
+    :param search: The view's search of the raw documents
+    :type search: Search
+    :return: The aggregations, in the form that search.execute() would return
+    :rtype: AttrDict
+
+    """
+    from elasticsearch_dsl import F
+    from elasticsearch_dsl.utils import AttrDict
+
+    interval = request.query_params.get('interval')
+
+    plan = _plan(view, request, interval)
+    if plan is None:
+        return search.execute().aggregations
+
+    ranges = _ranges(SOURCES[plan['source']]['model'])
+    # pylint: disable=W0212
+    has_units = UNIT_AGG_NAME in search.aggs._params.get('aggs', {})
+
+    # The raw documents cover the range's ends, and the rollups cover the
+    # rest.
+    raw = search.filter(F('range', **{TIME_FIELD: {'lt': plan['head']}}) |
+                        F('range', **{TIME_FIELD: {'gte': plan['tail']}}))
+    raw = raw.execute().aggregations.to_dict()
+    rollups = _stats_rollups(plan, interval, ranges, has_units) \
+        .execute().aggregations.to_dict()
+
+    # Merge the two, bucket by bucket.
+    result = {DATEHIST_AGG_NAME:
+              {'buckets': [_stats_bucket(key, merged, ranges)
+                           for key, merged in
+                           sorted(_stats_buckets(raw, rollups,
+                                                 ranges).items())]}}
+
+    if has_units:
+        units = set(x['key'] for x in raw[UNIT_AGG_NAME]['buckets']) | \
+            set(x['key'] for x in rollups[UNIT_AGG_NAME]['buckets'])
+        result[UNIT_AGG_NAME] = {'buckets': [{'key': x}
+                                             for x in sorted(units)]}
+
+    return AttrDict(result)
+
+
+def _terms(counts, known):
+    """Return the buckets of a terms aggregation over some term counts.
+
+    The known terms are included with a zero count, and the buckets are
+    ordered and truncated, as a min_doc_count=0 terms aggregation does.
+
+    :param counts: The count of each term
+    :type counts: Counter
+    :param known: All of the terms
+    :type known: iterable
+    :rtype: list of dict
+
+    """
+
+    terms = dict.fromkeys(known, 0)
+    terms.update(counts)
+
+    ordered = sorted(terms.items(), key=lambda x: (-x[1], x[0]))
+    return [{'key': key, 'doc_count': count}
+            for key, count in ordered[:LOG_TERMS_SIZE]]
+
+
+def _select(counter, prefix):
+    """Return the counts of the keys that start with a prefix, by their last
+    element.
+
+    :param counter: Counts, keyed by tuples
+    :type counter: Counter
+    :param prefix: The key prefix
+    :type prefix: tuple
+    :rtype: Counter
+
+    """
+    from collections import Counter
+
+    return Counter(dict((key[-1], count)
+                        for key, count in counter.items()
+                        if key[:-1] == prefix))
+
+
+def _log_counts(plan, search, interval):    # pylint: disable=R0914
+    """Return the log counts per interval, host, and level, from the raw logs
+    at the ends of a plan's range and the rollups in between.
+
+    :param plan: The _plan() result
+    :type plan: dict
+    :param search: The view's search of the raw logs
+    :type search: Search
+    :param interval: The date histogram interval, e.g., "1h"
+    :type interval: str
+    :return: (interval, host, level) -> count
+    :rtype: Counter
+
+    """
+    from collections import Counter
+    from elasticsearch_dsl import F
+
+    source = SOURCES[plan['source']]
+    grouping = list(plan['grouping'])
+
+    # The raw logs cover the range's ends.
+    raw = search.params(search_type="count") \
+        .filter(F('range', **{TIME_FIELD: {'lt': plan['head']}}) |
+                F('range', **{TIME_FIELD: {'gte': plan['tail']}}))
+
+    agg = raw.aggs.bucket(DATEHIST_AGG_NAME, 'date_histogram',
+                          field=TIME_FIELD,
+                          interval=interval,
+                          min_doc_count=1)
+    for field in grouping:
+        agg = agg.bucket(field, 'terms', field=_key_field(source, field),
+                         size=0)
+
+    # The rollups cover the rest.
+    rollups = RollupData.search().params(search_type="count") \
+        .filter('term', source=plan['source']) \
+        .filter('term', tier=plan['tier']) \
+        .filter('term', grouping=",".join(grouping)) \
+        .filter('range', **{TIME_FIELD: {'gte': plan['head'],
+                                         'lt': plan['tail']}})
+
+    agg = rollups.aggs.bucket(DATEHIST_AGG_NAME, 'date_histogram',
+                              field=TIME_FIELD,
+                              interval=interval,
+                              min_doc_count=1)
+    for field in grouping:
+        agg = agg.bucket(field, 'terms', field=field, size=0)
+    agg.metric('count', 'sum', field='count')
+
+    result = Counter()
+
+    for response, count in \
+            ((raw, lambda x: x['doc_count']),
+             (rollups, lambda x: int(x['count']['value'] or 0))):
+        response = response.execute().aggregations.to_dict()
+
+        for bucket in response[DATEHIST_AGG_NAME]['buckets']:
+            for keys, leaf in _leaves(bucket, grouping, []):
+                result[(bucket['key'], ) + tuple(keys)] += count(leaf)
+
+    return result
+
+
+def _log_buckets(counts, interval, per_host, hosts, levels):
+    # pylint: disable=R0914
+    """Return the date histogram buckets of a log aggregation response.
+
+    Like a min_doc_count=0 date histogram, the empty intervals between the
+    first and last non-empty ones are filled in.
+
+    :param counts: The _log_counts() result
+    :type counts: Counter
+    :param interval: The date histogram interval, e.g., "1h"
+    :type interval: str
+    :param per_host: Aggregate by host inside the time aggregation?
+    :type per_host: bool
+    :param hosts: The log count per host
+    :type hosts: Counter
+    :param levels: The log count per level
+    :type levels: Counter
+    :rtype: list of dict
+
+    """
+    from collections import Counter
+
+    per_interval = Counter()
+    per_interval_host = Counter()
+    per_interval_level = Counter()
+
+    for (when, host, level), count in counts.items():
+        per_interval[when] += count
+        per_interval_host[(when, host)] += count
+        per_interval_level[(when, level)] += count
+
+    step = int(interval_seconds(interval) * 1000)
+    whens = range(min(per_interval), max(per_interval) + step, step) \
+        if per_interval else []
+    result = []
+
+    for when in whens:
+        bucket = {'key': when, 'doc_count': per_interval[when]}
+
+        if per_host:
+            bucket[HOST_AGG_NAME] = {'buckets': []}
+
+            for host in _terms(_select(per_interval_host, (when, )), hosts):
+                host[LEVEL_AGG_NAME] = \
+                    {'buckets': _terms(_select(counts, (when, host['key'])),
+                                       levels)}
+                bucket[HOST_AGG_NAME]['buckets'].append(host)
+        else:
+            bucket[LEVEL_AGG_NAME] = \
+                {'buckets': _terms(_select(per_interval_level, (when, )),
+                                   levels)}
+
+        result.append(bucket)
+
+    return result
+
+
+def rollup_log_aggregations(view, request, search, interval, per_host):
+    # pylint: disable=R0914
+    """Return the aggregations of LogData.ranged_log_agg over a log search,
+    answering as much of it from rollups as possible.
+
+    :param view: The log aggregation view
+    :type view: LogAggView
+    :param request: The HTTP request
+    :type request: Request
+    :param search: The view's search of the raw logs
+    :type search: Search
+    :param interval: The date histogram interval, e.g., "1h"
+    :type interval: str
+    :param per_host: Aggregate by host inside the time aggregation?
+    :type per_host: bool
+    :return: The aggregations, in the form that ranged_log_agg returns
+    :rtype: AttrDict
+
+    """
+    from collections import Counter
+    from elasticsearch_dsl.utils import AttrDict
+
+    plan = _plan(view, request, interval)
+    if plan is None:
+        return LogData.ranged_log_agg(search, interval, per_host)
+
+    # Count the logs per interval, host, and level.
+    counts = _log_counts(plan, search, interval)
+
+    hosts = Counter()
+    levels = Counter()
+
+    for (_, host, level), count in counts.items():
+        hosts[host] += count
+        levels[level] += count
+
+    result = {DATEHIST_AGG_NAME:
+              {'buckets': _log_buckets(counts, interval, per_host, hosts,
+                                       levels)},
+              LEVEL_AGG_NAME: {'buckets': _terms(levels, levels)}}
+
+    if per_host:
+        result[HOST_AGG_NAME] = {'buckets': _terms(hosts, hosts)}
+
+    return AttrDict(result)
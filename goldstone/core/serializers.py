@@ -112,10 +112,6 @@ class EventSerializer(ReadOnlyElasticSerializer):
     # These metadata fields will be added to the return value.
     METADATA = ["doc_type", "id", "index"]
 
-    # When we look for a resource graph node's id, we look for these keys.
-    # (Interface has port_id and net_id, but no id.)
-    NODE_ID_KEYS = ["id", "port_id", "net_id"]
-
     # We add these "_name" and "_type" fields to the return value.
     # N.B. Tenant is the old name for project, but is being used for now.
     INSTANCE_GRAPH_IDS = ["instance", "tenant", "user"]
@@ -175,31 +171,19 @@ class EventSerializer(ReadOnlyElasticSerializer):
 
                 target_value = instance.traits.get(source_key)
 
-                # If the target value is a non-empty string...
+                # If the target value is a non-empty string, look for it in
+                # the resource graph's index of id-like attribute values. The
+                # index ignores dashes, because some ids contain them while
+                # others do not.
                 if isinstance(target_value, basestring) and target_value != '':
-                    # Some ids contain dashes while others do not. We're unsure
-                    # when and where the dashes are embedded or stripped, so
-                    # we'll 'normalize' the ids here by removing the dashes.
-                    target_value = target_value.replace('-', '')
-
-                    # Iterate over every resource graph node, looking for this
-                    # id in one of the "id-ish" fields.
-                    for node in resource.instances.graph.nodes():
-                        # Look for a match against values in id-like fields. We
-                        # filter out non-stering id-values because those will
-                        # be add-ons. (Add-on ids (i.e., pks) are integers.)
-                        id_values = \
-                            [node.attributes[x].replace('-', '')
-                             for x in self.NODE_ID_KEYS
-                             if isinstance(node.attributes.get(x), basestring)]
-
-                        if target_value in id_values:
-                            # We found this instance! Plug in the resource type
-                            # and name, and return.
-                            result[resource_type] = node.resourcetype().label()
-                            result[resource_name] = \
-                                node.attributes.get("name", NOT_FOUND)
-                            break
+                    node = resource.instances.get_attribute_id(target_value)
+
+                    if node is not None:
+                        # We found this instance! Plug in the resource type
+                        # and name.
+                        result[resource_type] = node.resourcetype().label()
+                        result[resource_name] = \
+                            node.attributes.get("name", NOT_FOUND)
 
         return result
 
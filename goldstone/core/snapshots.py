@@ -0,0 +1,276 @@
+"""Resource graph snapshots, which the graph task publishes and web workers
+load."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from array import array
+import cPickle
+from datetime import timedelta
+import logging
+import os
+import zlib
+
+from django.conf import settings
+
+from .graphfile import MappedGraph
+from .graphstore import GraphNode, ResourceGraph
+
+logger = logging.getLogger(__name__)
+
+
+class GraphSnapshots(object):
+    """Versioned, pre-built resource instance graphs, shared through redis or
+    a memory-mapped file.
+
+    The celery task that updates the persistent resource graph publishes a
+    snapshot of the graph it built. Web workers load a snapshot when its
+    version changes, so no request has to unpack the graph itself, and every
+    worker shares one build.
+
+    If settings.RESOURCE_GRAPH_SNAPSHOT_FILE is set, the snapshot is written
+    to that file as a MappedGraph, which each worker maps read-only. The
+    workers then share one copy of the graph, so its memory doesn't grow with
+    the number of workers. Redis still holds the version number.
+
+    Otherwise, the snapshot is stored in redis in a compact serialized form,
+    in which equal edge attribute dicts are stored once. Each worker unpacks
+    it into its own networkx graph, and what's shared is the work of building
+    the graph.
+
+    """
+
+    # The snapshot serialization format. Change this if the format changes.
+    FORMAT = 2
+
+    # The redis keys. The counter generates version numbers, and the version
+    # key holds the current snapshot's version.
+    COUNTER_KEY = "goldstone:resource_graph:counter"
+    VERSION_KEY = "goldstone:resource_graph:version"
+    SNAPSHOT_KEY = "goldstone:resource_graph:snapshot:%d"
+
+    # How long a snapshot is kept. This must be long enough for a worker that
+    # read the version key to then read the snapshot.
+    LIFETIME = timedelta(minutes=10)
+
+    def __init__(self):
+        """Initialize the object."""
+
+        self.path = settings.RESOURCE_GRAPH_SNAPSHOT_FILE
+
+    @staticmethod
+    def dumps(graph, built):
+        """Return a graph serialized as a compact binary string.
+
+        The nodes are stored in a list, and the edges in a flat array of
+        (source, destination, attributes) indexes. Most edges have one of a
+        few attribute dicts, so each distinct dict is stored once.
+
+        :param graph: A resource instance graph
+        :type graph: networkx.MultiDiGraph
+        :param built: When the graph's data was read from the database
+        :type built: datetime
+        :rtype: str
+
+        """
+
+        nodes = graph.nodes()
+        position = dict((node, i) for i, node in enumerate(nodes))
+
+        packed_nodes = [(x.uuid, x.resourcetype, x.native_id, x.native_name,
+                         x.attributes)
+                        for x in nodes]
+
+        # Intern the edge attributes by their pickled form.
+        blobs = []
+        blob_position = {}
+        packed_edges = array("l")
+
+        for source, dest, attributes in graph.edges_iter(data=True):
+            blob = cPickle.dumps(attributes, cPickle.HIGHEST_PROTOCOL)
+
+            if blob not in blob_position:
+                blob_position[blob] = len(blobs)
+                blobs.append(blob)
+
+            packed_edges.extend((position[source],
+                                 position[dest],
+                                 blob_position[blob]))
+
+        return zlib.compress(
+            cPickle.dumps((GraphSnapshots.FORMAT,
+                           built,
+                           packed_nodes,
+                           blobs,
+                           packed_edges.tostring()),
+                          cPickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def loads(data):                    # pylint: disable=R0914
+        """Return a graph deserialized from a dumps() string.
+
+        Edges that had equal attributes share one attribute dict, so the
+        graph's edge attributes must not be modified in place.
+
+        :param data: A serialized graph
+        :type data: str or buffer
+        :return: The graph, and when its data was read from the database, or
+                 None if the data is in an unknown format
+        :rtype: (ResourceGraph, datetime) or None
+
+        """
+
+        unpacked = cPickle.loads(zlib.decompress(data))
+
+        if unpacked[0] != GraphSnapshots.FORMAT:
+            return None
+
+        _, built, packed_nodes, blobs, edge_string = unpacked
+
+        graph = ResourceGraph()
+
+        nodes = [GraphNode(uuid=uuid,
+                           resourcetype=resourcetype,
+                           native_id=native_id,
+                           native_name=native_name,
+                           attributes=attributes)
+                 for uuid, resourcetype, native_id, native_name, attributes
+                 in packed_nodes]
+        graph.add_nodes_from(nodes)
+
+        attributes = [cPickle.loads(x) for x in blobs]
+        packed_edges = array("l")
+        packed_edges.fromstring(edge_string)
+
+        # Add the edges directly to the adjacency dicts, because add_edge()
+        # would copy each edge's attribute dict.
+        succ = graph.succ
+        pred = graph.pred
+
+        for i in xrange(0, len(packed_edges), 3):
+            source = nodes[packed_edges[i]]
+            dest = nodes[packed_edges[i + 1]]
+
+            keydict = succ[source].get(dest)
+            if keydict is None:
+                keydict = {}
+                succ[source][dest] = keydict
+                pred[dest][source] = keydict
+
+            key = len(keydict)
+            while key in keydict:
+                key += 1
+
+            keydict[key] = attributes[packed_edges[i + 2]]
+
+        return graph, built
+
+    @staticmethod
+    def _conn():
+        """Return a redis connection."""
+        from goldstone.models import RedisConnection
+
+        return RedisConnection().conn
+
+    def _write_file(self, data):
+        """Atomically replace the snapshot file.
+
+        :param data: The MappedGraph file contents
+        :type data: str
+
+        """
+
+        temp_path = "%s.%d.tmp" % (self.path, os.getpid())
+
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(data)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+
+        # Workers that have the old file mapped keep reading it.
+        os.rename(temp_path, self.path)
+
+    def _read_file(self, version):
+        """Return the snapshot that's in the snapshot file.
+
+        :param version: The snapshot version that's wanted
+        :type version: int
+        :return: The mapped graph, and when its data was read from the
+                 database, or None if the file is missing, unreadable, or
+                 holds an older snapshot
+        :rtype: (MappedGraph, datetime) or None
+
+        """
+
+        graph = MappedGraph.load(self.path)
+
+        if graph is None or graph.version < version:
+            return None
+
+        return graph, graph.built
+
+    def publish(self, graph, built):
+        """Store a new snapshot, and make it the current version.
+
+        :param graph: A resource instance graph
+        :type graph: networkx.MultiDiGraph
+        :param built: When the graph's data was read from the database
+        :type built: datetime
+        :return: The snapshot's version
+        :rtype: int
+
+        """
+
+        conn = self._conn()
+        version = conn.incr(self.COUNTER_KEY)
+
+        # Store the snapshot before pointing the version key to it, so that
+        # readers never see a version whose snapshot isn't ready. If storing
+        # it fails, the version key isn't changed.
+        if self.path:
+            self._write_file(MappedGraph.dumps(graph, built, version))
+            conn.set(self.VERSION_KEY, version)
+        else:
+            pipeline = conn.pipeline()
+            pipeline.setex(self.SNAPSHOT_KEY % version,
+                           int(self.LIFETIME.total_seconds()),
+                           self.dumps(graph, built))
+            pipeline.set(self.VERSION_KEY, version)
+            pipeline.execute()
+
+        return version
+
+    def version(self):
+        """Return the current snapshot's version.
+
+        :rtype: int, or None if no snapshot has been published
+
+        """
+
+        version = self._conn().get(self.VERSION_KEY)
+        return int(version) if version is not None else None
+
+    def load(self, version):
+        """Return a snapshot.
+
+        :param version: The snapshot's version
+        :type version: int
+        :return: The graph, and when its data was read from the database
+        :rtype: (ResourceGraph or MappedGraph, datetime) or None
+
+        """
+
+        if self.path:
+            return self._read_file(version)
+
+        data = self._conn().get(self.SNAPSHOT_KEY % version)
+        return self.loads(data) if data is not None else None
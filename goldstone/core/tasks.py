@@ -32,10 +32,15 @@ def delete_indices(prefix,
     Returns 0 or None if no cutoff was provided.
     """
 
+    from goldstone.models import clear_indices_cache
+
     if cutoff is not None:
         cmd = "curator --host %s --port %s delete --prefix %s " \
               "--older-than %d" % (es_host, es_port, prefix, cutoff)
-        return check_call(cmd.split())
+        try:
+            return check_call(cmd.split())
+        finally:
+            clear_indices_cache()
     else:
         return "Cutoff was none, no action taken"
 
@@ -50,16 +55,49 @@ def update_persistent_graph():
        - added if they are in the OpenStack cloud, but not in the graph.
        - updated from the cloud if they are already in the graph.
 
+    Then the edges that may have been affected by these changes are updated.
+
     """
-    from goldstone.cinder.utils import update_nodes as update_cinder_nodes
-    from goldstone.glance.utils import update_nodes as update_glance_nodes
-    from goldstone.keystone.utils import update_nodes as update_keystone_nodes
-    from goldstone.nova.utils import update_nodes as update_nova_nodes
-
-    update_cinder_nodes()
-    update_glance_nodes()
-    update_keystone_nodes()
-    update_nova_nodes()
+    from goldstone.cinder import utils as cinder_utils
+    from goldstone.glance import utils as glance_utils
+    from goldstone.keystone import utils as keystone_utils
+    from goldstone.nova import utils as nova_utils
+    from .models import PolyResourceTombstone, utc_now
+    from .resource import GraphSnapshots, Instances
+    from .utils import collect_clouddata, update_edges
+
+    integrations = [cinder_utils, glance_utils, keystone_utils, nova_utils]
+
+    # Query the cloud for all the resource types concurrently. Then update
+    # the database serially.
+    clouddata = collect_clouddata([nodetype
+                                   for integration in integrations
+                                   for nodetype in integration.node_types()])
+
+    changed = set()
+
+    for integration in integrations:
+        changed |= integration.update_nodes(clouddata)
+
+    # Now that all the nodes are current, update the edges that the changed
+    # nodes may have affected.
+    update_edges(changed)
+
+    # Cull the tombstones that the in-memory graphs no longer need.
+    PolyResourceTombstone.cull()
+
+    # Publish a snapshot of the updated graph for the web workers.
+    if settings.RESOURCE_GRAPH_SNAPSHOTS:
+        GraphSnapshots().publish(Instances.unpack(), utc_now())
+
+
+@celery_app.task()
+def update_rollups():
+    """Roll up the metric, API performance, and log documents that have
+    arrived since the last run."""
+    from .rollup import update_rollups as _update_rollups
+
+    _update_rollups()
 
 
 @celery_app.task()
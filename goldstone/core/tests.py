@@ -25,10 +25,12 @@ from rest_framework.test import APISimpleTestCase
 
 from goldstone.test_utils import Setup
 from .models import Image, ServerGroup, NovaLimits, PolyResource, Host, \
-    Aggregate, Hypervisor, Port, Cloudpipe, Network, Project, Server, Addon
+    Aggregate, Hypervisor, Port, Cloudpipe, Network, Project, Server, Addon, \
+    Flavor
 
 from . import tasks
-from .utils import custom_exception_handler, process_resource_type, parse
+from .utils import custom_exception_handler, process_resource_type, parse, \
+    update_edges, collect_clouddata, query_filter_map
 
 # Using the latest version of django-polymorphic, a
 # PolyResource.objects.all().delete() throws an IntegrityError exception. So
@@ -385,6 +387,110 @@ class UpdateEdges(SimpleTestCase):
         edges = [x for x in node.edges if x[0] in dest]
         self.assertEqual(len(edges), 2)
 
+    def test_join_keys(self):
+        """Edges are found through the join key indexes."""
+        from .models import EdgeMatcher
+
+        NODES = [(Host, "deadbeef"),
+                 (Aggregate, "0"),
+                 (Aggregate, "1"),
+                 (Aggregate, "2"),
+                 (Hypervisor, "3"),
+                 (Hypervisor, "4")]
+
+        load_persistent_rg(NODES, [])
+
+        # The host is in two of the aggregates, and is hypervisor "3".
+        node = Host.objects.all()[0]
+        node.cloud_attributes = {"host_name": "fred"}
+        node.save()
+
+        for nodetype, native_id, attributes in \
+                [(Aggregate, "0", {"hosts": ["fred", "fred", "lucy"]}),
+                 (Aggregate, "1", {"hosts": ["fred"]}),
+                 (Aggregate, "2", {"hosts": ["ethel"]}),
+                 (Hypervisor, "3", {"hypervisor_hostname": "fred"}),
+                 (Hypervisor, "4", {"hypervisor_hostname": "ricky"})]:
+            row = nodetype.objects.get(native_id=native_id)
+            row.cloud_attributes = attributes
+            row.save()
+
+        # Do the test, with a matcher that could be shared by many nodes.
+        node.update_edges(EdgeMatcher())
+
+        # Test the results, re-reading from the db.
+        node = Host.objects.all()[0]
+        aggregates = [Aggregate.objects.get(native_id=x).uuid
+                      for x in ["0", "1"]]
+        hypervisor = Hypervisor.objects.get(native_id="3").uuid
+
+        self.assertEqual(len(node.edges), 4)
+        self.assertEqual(
+            sorted(x[0] for x in node.edges
+                   if x[1][TYPE] == settings.R_EDGE.MEMBER_OF),
+            sorted(aggregates))
+        self.assertEqual(
+            len([x for x in node.edges if x[0] == hypervisor]), 2)
+
+    def test_join_key_index_reused(self):
+        """A callable join key's index is built once per matcher."""
+        from .models import EdgeMatcher
+
+        load_persistent_rg([(Flavor, "f0"), (Flavor, "f1"), (Server, "s0")],
+                           [])
+
+        matcher = EdgeMatcher()
+        for node in Flavor.objects.all():
+            node.update_edges(matcher)
+
+        self.assertEqual(len(matcher._indexes), 1)  # pylint: disable=W0212
+
+    def test_edge_order(self):
+        """Edges that only differ in order aren't saved."""
+
+        load_persistent_rg([(Host, "deadbeef"),
+                            (Aggregate, "0"),
+                            (Aggregate, "1")],
+                           [])
+
+        node = Host.objects.all()[0]
+        node.cloud_attributes = {"host_name": "fred"}
+        node.save()
+
+        for row in Aggregate.objects.all():
+            row.cloud_attributes = {"hosts": ["fred"]}
+            row.save()
+
+        self.assertTrue(node.update_edges())
+
+        node = Host.objects.all()[0]
+        node.edges = list(reversed(node.edges))
+        node.save()
+
+        with patch.object(Host, "save") as mock_save:
+            self.assertFalse(node.update_edges())
+            self.assertFalse(mock_save.called)
+
+    def test_join_keys_agree(self):
+        """The built-in join keys agree with their matching functions."""
+        from .resource import RESOURCE_TYPES
+
+        JOIN_KEYS = settings.R_ATTRIBUTE.JOIN_KEYS
+        MATCHING_FN = settings.R_ATTRIBUTE.MATCHING_FN
+
+        for nodetype in RESOURCE_TYPES:
+            for edge in nodetype.type_outgoing_edges():
+                if JOIN_KEYS not in edge or \
+                        any(callable(x) for x in edge[JOIN_KEYS]):
+                    continue
+
+                from_key, to_key = edge[JOIN_KEYS]
+
+                self.assertTrue(edge[MATCHING_FN]({from_key: "v"},
+                                                  {to_key: "v"}))
+                self.assertFalse(edge[MATCHING_FN]({from_key: "v"},
+                                                   {to_key: "w"}))
+
 
 class ProcessResourceType(Setup):
     """Test utilities.process_resource_type."""
@@ -500,9 +606,125 @@ class ProcessResourceType(Setup):
         ggc.return_value = {"client": self.EmptyClientObject(),
                             "region": "Siberia"}
 
-        process_resource_type(Image)
+        changed = process_resource_type(Image)
 
         self.assertEqual(PolyResource.objects.count(), 3)
+        self.assertEqual(len(changed), 5)
+
+    def test_sync(self):
+        """Nodes are added, updated, and deleted, and only the changed nodes
+        are written."""
+
+        NODES = [(Image, "a"), (Image, "b"), (Image, "c")]
+        load_persistent_rg(NODES, [])
+
+        for row in Image.objects.all():
+            row.cloud_attributes = {"id": row.native_id}
+            row.save()
+
+        unchanged = Image.objects.get(native_id="a")
+        updated = Image.objects.get(native_id="b")
+        deleted = Image.objects.get(native_id="c")
+
+        with patch.object(Image, "clouddata") as clouddata:
+            clouddata.return_value = [{"id": "a"},
+                                      {"id": "b", "name": "new"},
+                                      {"id": "d", "name": "added"}]
+            changed = process_resource_type(Image)
+
+        added = Image.objects.get(native_id="d")
+
+        self.assertEqual(changed,
+                         set([updated.uuid, deleted.uuid, added.uuid]))
+        self.assertEqual(sorted(x.native_id for x in Image.objects.all()),
+                         ["a", "b", "d"])
+        self.assertEqual(added.native_name, "added")
+
+        row = Image.objects.get(native_id="a")
+        self.assertEqual(row.updated, unchanged.updated)
+
+        row = Image.objects.get(native_id="b")
+        self.assertEqual(row.cloud_attributes, {"id": "b", "name": "new"})
+        self.assertGreater(row.updated, updated.updated)
+        self.assertEqual(row.attributes_hash,
+                         PolyResource.hash_attributes({"name": "new",
+                                                       "id": "b"}))
+        self.assertEqual(added.attributes_hash,
+                         PolyResource.hash_attributes(added.cloud_attributes))
+
+
+class CollectClouddata(SimpleTestCase):
+    """Test utilities.collect_clouddata."""
+
+    def test_collect(self):
+        """Each type's clouddata is returned."""
+
+        with patch.object(Image, "clouddata") as image, \
+                patch.object(Host, "clouddata") as host:
+            image.return_value = [{"id": "a"}]
+            host.return_value = [{"id": "b"}, {"id": "c"}]
+
+            result = collect_clouddata([Image, Host])
+
+        self.assertEqual(result, {Image: [{"id": "a"}],
+                                  Host: [{"id": "b"}, {"id": "c"}]})
+        self.assertEqual(collect_clouddata([]), {})
+
+    def test_exception(self):
+        """A query's exception is raised to the caller."""
+
+        with patch.object(Image, "clouddata") as image, \
+                patch.object(Host, "clouddata") as host:
+            image.return_value = []
+            host.side_effect = ValueError
+
+            self.assertRaises(ValueError,
+                              collect_clouddata,
+                              [Image, Host])
+
+
+class UpdateChangedEdges(Setup):
+    """Test utilities.update_edges."""
+
+    def setUp(self):
+        """Run before every test."""
+
+        super(UpdateChangedEdges, self).setUp()
+
+        for nodetype in NODE_TYPES:
+            nodetype.objects.all().delete()
+
+    def test_changed_nodes(self):
+        """Only the edges affected by the changed nodes are updated, and only
+        changed edge lists are written."""
+
+        NODES = [(Project, "cad"), (Image, "cad"), (Image, "dog")]
+
+        load_persistent_rg(NODES, [])
+
+        for row in PolyResource.objects.all():
+            row.cloud_attributes = {"id": row.native_id}
+            row.save()
+
+        project = Project.objects.all()[0]
+        image = Image.objects.get(native_id="cad")
+
+        # Nothing changed.
+        self.assertEqual(update_edges(set()), 0)
+        self.assertEqual(Project.objects.all()[0].edges, [])
+
+        # The image changed, so the project's edges to it are created.
+        self.assertEqual(update_edges(set([image.uuid])), 1)
+        self.assertEqual(set(x[0] for x in Project.objects.all()[0].edges),
+                         set([image.uuid]))
+
+        # Nothing more changes, so nothing is written.
+        self.assertEqual(update_edges(set([image.uuid, project.uuid])), 0)
+
+        # The image is deleted, so the project's edges to it are removed.
+        image.delete()
+        self.assertEqual(update_edges(set([image.uuid])), 1)
+        self.assertEqual(Project.objects.all()[0].edges, [])
 
 
 class ParseTests(SimpleTestCase):
@@ -608,3 +830,22 @@ class ParseTests(SimpleTestCase):
 
         for test, expected in TESTS:
             self.assertEqual(parse(test), expected)
+
+    def test_query_filter_map(self):
+        """Parsed regexes of literal terms become indexable lookups, and other
+        regexes become database regex lookups."""
+
+        # Each entry is (regex, expected_lookups).
+        TESTS = [("deadbeef", [("native_id__contains", "deadbeef")]),
+                 ("^tom|dick", [("native_id__startswith", "tom"),
+                                ("native_id__contains", "dick")]),
+                 ("^tom$|^dick$|harry$", [("native_id__in", ["tom", "dick"]),
+                                          ("native_id__endswith", "harry")]),
+                 ("^tom|d.*k", [("native_id__regex", "^tom|d.*k")]),
+                 ]
+
+        for regex, expected in TESTS:
+            self.assertEqual(query_filter_map("native_id")(regex).children,
+                             expected)
+
+        self.assertIsNone(query_filter_map("john"))
@@ -173,6 +173,225 @@ class CoreResourcesUnpacking(Setup):
         self.assertIn({"some!": "stuff"}, edge_attributes)
         self.assertIn({"success!": True}, edge_attributes)
 
+    def test_lookup_indexes(self):
+        """Test the uuid and native id lookups of an unpacked graph."""
+
+        # Create two persistent graph rows having the same native_id.
+        image = Image.objects.create(native_id="bar",
+                                     native_name="foo",
+                                     edges=[],
+                                     cloud_attributes={"high": "school"})
+        server = Server.objects.create(native_id="bar",
+                                       native_name="foo",
+                                       edges=[],
+                                       cloud_attributes={"id": "42"})
+
+        # Unpack the graph
+        resource.instances._graph = None       # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        # Check the lookups.
+        for entry, entrytype in ((image, Image), (server, Server)):
+            node = resource.instances.get_native_id(entrytype, "bar")
+            self.assertEqual(node.uuid, entry.uuid)
+            self.assertEqual(node.native_name, "foo")
+            self.assertIs(resource.instances.get_uuid(entry.uuid), node)
+
+        self.assertIsNone(resource.instances.get_uuid("66666"))
+        self.assertIsNone(resource.instances.get_native_id(Project, "bar"))
+
+        # A node that's added directly to the graph is found.
+        node = GraphNode(uuid="66666", resourcetype=Project, native_id="bar")
+        resource.instances.graph.add_node(node)
+        self.assertIs(resource.instances.get_uuid("66666"), node)
+        self.assertIs(resource.instances.get_native_id(Project, "bar"), node)
+
+    def test_type_index(self):
+        """Test the per-type lookups of an unpacked graph."""
+
+        # Create three persistent graph rows, of two types.
+        images = [Image.objects.create(native_id=x,
+                                       native_name="foo",
+                                       edges=[],
+                                       cloud_attributes={})
+                  for x in ["bar", "baz"]]
+        Server.objects.create(native_id="bar",
+                              native_name="foo",
+                              edges=[],
+                              cloud_attributes={"id": "42"})
+
+        # Unpack the graph
+        resource.instances._graph = None       # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        # Check the lookups. A type's nodes are in UUID order.
+        self.assertEqual(
+            [x.uuid for x in resource.instances.nodes_of_type(Image)],
+            sorted(x.uuid for x in images))
+        self.assertEqual(len(resource.instances.nodes_of_type(Server)), 1)
+        self.assertEqual(resource.instances.nodes_of_type(Project), [])
+
+        self.assertEqual(resource.instances.count_of_type(Image), 2)
+        self.assertEqual(resource.instances.count_of_type(Server), 1)
+        self.assertEqual(resource.instances.count_of_type(Project), 0)
+
+        # Changing the returned list doesn't change the index.
+        resource.instances.nodes_of_type(Image).pop()
+        self.assertEqual(resource.instances.count_of_type(Image), 2)
+
+    def test_attribute_id_index(self):
+        """Test the id-like attribute lookups of an unpacked and refreshed
+        graph."""
+        from datetime import datetime
+
+        # Create persistent graph rows with id-like attributes, and one with
+        # an add-on's integer id.
+        server = Server.objects.create(
+            native_id="bar",
+            native_name="foo",
+            edges=[],
+            cloud_attributes={"id": "4242-abcd", "name": "srv"})
+        Image.objects.create(native_id="baz",
+                             native_name="foo",
+                             edges=[],
+                             cloud_attributes={"port_id": "p-1"})
+        Project.objects.create(native_id="bat",
+                               native_name="foo",
+                               edges=[],
+                               cloud_attributes={"id": 7})
+
+        # Unpack the graph
+        resource.instances._graph = None       # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        # Ids are found with or without their dashes.
+        for value in ["4242-abcd", "4242abcd", "42-42-ab-cd"]:
+            node = resource.instances.get_attribute_id(value)
+            self.assertEqual(node.uuid, server.uuid)
+
+        self.assertIs(resource.instances.get_attribute_id("p1").resourcetype,
+                      Image)
+        self.assertIsNone(resource.instances.get_attribute_id("7"))
+        self.assertIsNone(resource.instances.get_attribute_id("nope"))
+
+        # A changed row's new id replaces its old one after a refresh.
+        server.cloud_attributes = {"id": "9999"}
+        server.save()
+
+        resource.instances._timestamp = datetime.min  # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        self.assertIsNone(resource.instances.get_attribute_id("4242abcd"))
+        self.assertEqual(resource.instances.get_attribute_id("9999").uuid,
+                         server.uuid)
+
+    def test_shared_attribute_id(self):
+        """Test that when nodes share an attribute id, removing the one that's
+        found finds another."""
+        from datetime import datetime
+        from goldstone.core.models import Region, Keystone
+
+        # A region's name is the id of its Region and Keystone nodes.
+        rows = [nodetype.objects.create(native_id="RegionOne",
+                                        native_name="RegionOne",
+                                        edges=[],
+                                        cloud_attributes={"id": "RegionOne"})
+                for nodetype in (Region, Keystone)]
+
+        # Unpack the graph
+        resource.instances._graph = None       # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        found = resource.instances.get_attribute_id("RegionOne")
+        self.assertIn(found.uuid, [x.uuid for x in rows])
+
+        # Delete the row that was found, and refresh.
+        PolyResource.objects.get(uuid=found.uuid).delete()
+
+        resource.instances._timestamp = datetime.min  # pylint: disable=W0212
+        resource.instances.graph               # pylint: disable=W0104
+
+        remaining = resource.instances.get_attribute_id("RegionOne")
+        self.assertIsNotNone(remaining)
+        self.assertNotEqual(remaining.uuid, found.uuid)
+        self.assertEqual(resource.instances.nodes_of_type(found.resourcetype),
+                         [])
+
+    def test_incremental_refresh(self):
+        """Test refreshing the graph from changed and deleted rows."""
+        from datetime import datetime
+
+        # Create three persistent graph rows, with two edges.
+        image = Image.objects.create(native_id="bar",
+                                     native_name="foo",
+                                     edges=[],
+                                     cloud_attributes={"high": "school"})
+        server = Server.objects.create(native_id="bar",
+                                       native_name="foo",
+                                       edges=[],
+                                       cloud_attributes={"id": "42"})
+        project = Project.objects.create(native_id="foo",
+                                         native_name="bar",
+                                         edges=[(image.uuid, {"score": 7}),
+                                                (server.uuid, {"score": 8})],
+                                         cloud_attributes={"madonn": 'a'})
+
+        # Unpack the graph
+        resource.instances._graph = None       # pylint: disable=W0212
+        graph = resource.instances.graph
+        self.assertEqual(graph.number_of_nodes(), 3)
+        self.assertEqual(graph.number_of_edges(), 2)
+        image_node = resource.instances.get_uuid(image.uuid)
+
+        # Delete a row, change a row, and add a row with an edge to an
+        # unchanged row.
+        server.delete()
+        image.cloud_attributes = {"high": "college"}
+        image.save()
+        network = Network.objects.create(native_id="baz",
+                                         native_name="baz",
+                                         edges=[(project.uuid, {"score": 9})],
+                                         cloud_attributes={})
+
+        # Force a refresh.
+        resource.instances._timestamp = datetime.min  # pylint: disable=W0212
+        self.assertIs(resource.instances.graph, graph)
+
+        # Check the results.
+        self.assertEqual(graph.number_of_nodes(), 3)
+        self.assertIsNone(resource.instances.get_uuid(server.uuid))
+        self.assertEqual(resource.instances.count_of_type(Server), 0)
+
+        # The changed node was updated in place, and kept its incoming edge.
+        self.assertIs(resource.instances.get_uuid(image.uuid), image_node)
+        self.assertEqual(image_node.attributes, {"high": "college"})
+
+        edges = [(x[0].uuid, x[1].uuid, x[2])
+                 for x in graph.edges(data=True)]
+        self.assertEqual(len(edges), 2)
+        self.assertIn((project.uuid, image.uuid, {"score": 7}), edges)
+        self.assertIn((network.uuid, project.uuid, {"score": 9}), edges)
+
+    def test_tombstones(self):
+        """Test that deleting a resource row, and only a resource row, leaves a
+        tombstone."""
+        from django.contrib.auth import get_user_model
+        from goldstone.core.models import PolyResourceTombstone
+
+        PolyResourceTombstone.objects.all().delete()
+
+        image = Image.objects.create(native_id="bar", native_name="foo")
+        user = get_user_model().objects.create_user(username="fred",
+                                                    password="fredpw")
+
+        user.delete()
+        self.assertEqual(PolyResourceTombstone.objects.count(), 0)
+
+        image.delete()
+        self.assertEqual(
+            list(PolyResourceTombstone.objects.values_list("uuid", flat=True)),
+            [image.uuid])
+
 
 class CoreResources(Setup):
     """Test /core/resources/."""
@@ -500,6 +719,77 @@ class CoreResources(Setup):
 
         self.assertItemsEqual(content["nodes"], EXPECTED_NODES)
 
+    def test_queries(self):
+        """The nodes' rows are read in one query, however many nodes there
+        are."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        # Create a user.
+        token = create_and_login()
+
+        counts = []
+
+        for native_id in ["a", "b", "c"]:
+            Image.objects.create(native_id=native_id, native_name=native_id)
+
+            # Re-unpack the graph before the request.
+            resource.instances._graph = None       # pylint: disable=W0212
+            resource.instances.graph               # pylint: disable=W0104
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    RES_URL,
+                    HTTP_AUTHORIZATION=AUTHORIZATION_PAYLOAD % token)
+
+            # pylint: disable=E1101
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertEqual(len(json.loads(response.content)["nodes"]),
+                             len(counts) + 1)
+
+            counts.append(len(queries))
+
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_pagination(self):
+        """The nodes are paged, with the edges that are from or to them."""
+
+        # Create the nodes, and an edge between the first two.
+        for native_id in ["a", "b", "c"]:
+            Image.objects.create(native_id=native_id, native_name=native_id)
+
+        resource.instances._graph = None           # pylint: disable=W0212
+
+        nodes = sorted(resource.instances.graph.nodes(),
+                       key=lambda x: x.uuid)
+        resource.instances.graph.add_edge(nodes[0],
+                                          nodes[1],
+                                          attr_dict={TYPE: OWNS})
+
+        # Create a user, and get each page.
+        token = create_and_login()
+        pages = []
+
+        for page in [1, 2]:
+            response = self.client.get(
+                RES_URL + "?page_size=2&page=%d" % page,
+                HTTP_AUTHORIZATION=AUTHORIZATION_PAYLOAD % token)
+
+            # pylint: disable=E1101
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            pages.append(json.loads(response.content))
+
+        self.assertEqual([x["count"] for x in pages], [3, 3])
+        self.assertIsNotNone(pages[0]["next"])
+        self.assertIsNone(pages[1]["next"])
+        self.assertEqual([x["uuid"] for y in pages for x in y["nodes"]],
+                         [x.uuid for x in nodes])
+
+        # The edge is on the first page only, once.
+        self.assertEqual(len(pages[0]["edges"]), 1)
+        self.assertEqual(pages[0]["edges"][0]["type"], OWNS)
+        self.assertEqual(pages[1]["edges"], [])
+
 
 class CoreResourcesDetail(Setup):
     """Test /core/resource/<unique_id>/."""
@@ -0,0 +1,275 @@
+"""Resource graph snapshot unit tests."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from mock import patch
+
+from goldstone.core.models import Image, Project, Server
+from goldstone.core.resource import Instances, GraphNode, GraphSnapshots, \
+    MappedGraph, ResourceGraph
+from goldstone.test_utils import Setup
+
+
+class CoreResourcesSnapshots(Setup):
+    """The graph snapshots that are shared by the web workers."""
+
+    def test_dumps_loads(self):
+        """Test serializing and deserializing a graph."""
+        from goldstone.core.models import utc_now
+
+        # Create two persistent graph rows, with one edge between them.
+        image = Image.objects.create(native_id="bar",
+                                     native_name="foo",
+                                     edges=[],
+                                     cloud_attributes={"high": "school"})
+        project = Project.objects.create(native_id="foo",
+                                         native_name="bar",
+                                         edges=[(image.uuid,
+                                                 {"edgescore": 7})],
+                                         cloud_attributes={"madonn": 'a'})
+
+        built = utc_now()
+        graph, result_built = \
+            GraphSnapshots.loads(GraphSnapshots.dumps(Instances.unpack(),
+                                                      built))
+
+        # Check the results.
+        self.assertEqual(result_built, built)
+        self.assertEqual(graph.number_of_nodes(), 2)
+        self.assertEqual(graph.number_of_edges(), 1)
+
+        nodes = dict((x.uuid, x) for x in graph.nodes())
+        for entry, entrytype in ((image, Image), (project, Project)):
+            node = nodes[entry.uuid]
+            self.assertEqual(node.resourcetype, entrytype)
+            self.assertEqual(node.native_id, entry.native_id)
+            self.assertEqual(node.native_name, entry.native_name)
+            self.assertEqual(node.attributes, entry.cloud_attributes)
+
+        edge = graph.edges(data=True)[0]
+        self.assertEqual(edge[0].uuid, project.uuid)
+        self.assertEqual(edge[1].uuid, image.uuid)
+        self.assertEqual(edge[2], {"edgescore": 7})
+
+    def test_swap(self):
+        """Test that the graph is swapped only when the version changes."""
+        from datetime import datetime
+        from goldstone.core.models import utc_now
+
+        # Two snapshots, each having one node.
+        snapshots = {}
+        for version in [1, 2]:
+            graph = ResourceGraph()
+            graph.add_node(GraphNode(uuid=str(version),
+                                     resourcetype=Image,
+                                     native_id="bar"))
+            snapshots[version] = (graph, utc_now())
+
+        instances = Instances()
+
+        with self.settings(RESOURCE_GRAPH_SNAPSHOTS=True), \
+                patch.object(GraphSnapshots, "version") as ver, \
+                patch.object(GraphSnapshots, "load") as load:
+            load.side_effect = snapshots.get
+
+            ver.return_value = 1
+            first = instances.graph
+            self.assertIs(first, snapshots[1][0])
+            self.assertEqual(instances.get_uuid("1").native_id, "bar")
+
+            # The version hasn't changed, so the graph isn't reloaded.
+            instances._timestamp = datetime.min  # pylint: disable=W0212
+            self.assertIs(instances.graph, first)
+            self.assertEqual(load.call_count, 1)
+
+            # The version has changed.
+            ver.return_value = 2
+            instances._timestamp = datetime.min  # pylint: disable=W0212
+            self.assertIs(instances.graph, snapshots[2][0])
+            self.assertIsNone(instances.get_uuid("1"))
+            self.assertEqual(instances.get_uuid("2").native_id, "bar")
+
+        # Without snapshots, the graph is unpacked from the database.
+        instances = Instances()
+
+        with patch.object(GraphSnapshots, "version") as ver:
+            instances.graph                    # pylint: disable=W0104
+            self.assertFalse(ver.called)
+
+    def test_publish(self):
+        """Test that a snapshot's version is published only after the snapshot
+        is stored."""
+        import networkx
+
+        graph = networkx.MultiDiGraph()
+
+        with patch.object(GraphSnapshots, "_conn") as conn, \
+                patch.object(GraphSnapshots, "_write_file") as write_file:
+            conn.return_value.incr.return_value = 5
+
+            # The file couldn't be written.
+            write_file.side_effect = IOError
+
+            with self.settings(RESOURCE_GRAPH_SNAPSHOT_FILE="/graph"):
+                self.assertRaises(IOError,
+                                  GraphSnapshots().publish,
+                                  graph,
+                                  None)
+                self.assertFalse(conn.return_value.set.called)
+
+                # The file was written.
+                write_file.side_effect = None
+                self.assertEqual(GraphSnapshots().publish(graph, None), 5)
+                conn.return_value.set.assert_called_once_with(
+                    GraphSnapshots.VERSION_KEY, 5)
+
+    def test_file(self):
+        """Test publishing and loading a snapshot through a file."""
+        from goldstone.core.models import utc_now
+        import os
+        import shutil
+        import tempfile
+
+        image = Image.objects.create(native_id="bar",
+                                     native_name="foo",
+                                     edges=[],
+                                     cloud_attributes={"high": "school"})
+        Project.objects.create(native_id="foo",
+                               native_name="bar",
+                               edges=[(image.uuid, {"edgescore": 7}),
+                                      (image.uuid, {"edgescore": 7})],
+                               cloud_attributes={"madonn": 'a'})
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "graph")
+
+        try:
+            with self.settings(RESOURCE_GRAPH_SNAPSHOT_FILE=path), \
+                    patch("goldstone.core.resource.GraphSnapshots._conn"):
+                snapshots = GraphSnapshots()
+
+                # There's no file yet.
+                self.assertIsNone(snapshots.load(1))
+
+                # Write the file, and load it.
+                snapshots._write_file(    # pylint: disable=W0212
+                    MappedGraph.dumps(Instances.unpack(), utc_now(), 3))
+
+                graph, _ = snapshots.load(3)
+                self.assertIsInstance(graph, MappedGraph)
+                self.assertEqual(graph.number_of_nodes(), 2)
+                self.assertEqual(graph.number_of_edges(), 2)
+
+                # Equal edge attributes are shared.
+                edges = graph.edges(data=True)
+                self.assertEqual(edges[0][2], {"edgescore": 7})
+                self.assertIs(edges[0][2], edges[1][2])
+
+                # The file is older than the wanted version.
+                self.assertIsNone(snapshots.load(4))
+
+                # The file is empty or truncated.
+                with open(path, "rb") as snapshot_file:
+                    data = snapshot_file.read()
+
+                for size in [0, 4, len(data) // 2]:
+                    with open(path, "wb") as snapshot_file:
+                        snapshot_file.write(data[:size])
+
+                    self.assertIsNone(snapshots.load(3))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_mapped(self):
+        """Test a memory-mapped graph's networkx API and lookups."""
+        from goldstone.core.models import utc_now
+        import mmap
+        import networkx
+        import tempfile
+
+        # Two images, and a project with an edge to each of them.
+        images = [Image.objects.create(native_id=x,
+                                       native_name=x,
+                                       edges=[],
+                                       cloud_attributes={"id": y})
+                  for x, y in (("foo", "ab-cd"), ("bar", "ef-gh"))]
+        project = Project.objects.create(
+            native_id="foo",
+            native_name=u"caf\xe9",
+            edges=[(images[0].uuid, {"edgescore": 7}),
+                   (images[1].uuid, {"edgescore": 8})],
+            cloud_attributes={"madonn": 'a'})
+
+        built = utc_now()
+
+        with tempfile.TemporaryFile() as graph_file:
+            graph_file.write(MappedGraph.dumps(Instances.unpack(), built, 9))
+            graph_file.flush()
+
+            graph = MappedGraph(mmap.mmap(graph_file.fileno(),
+                                          0,
+                                          access=mmap.ACCESS_READ))
+
+        self.assertEqual(graph.version, 9)
+        self.assertEqual(graph.built, built)
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(graph.number_of_edges(), 2)
+
+        # Lookups.
+        node = graph.get_uuid(project.uuid)
+        self.assertEqual(node.resourcetype, Project)
+        self.assertEqual(node.native_id, "foo")
+        self.assertEqual(node.native_name, u"caf\xe9")
+        self.assertEqual(node.attributes, {"madonn": 'a'})
+        self.assertIsNone(graph.get_uuid("nope"))
+
+        self.assertEqual(graph.get_native_id(Image, "bar").uuid,
+                         images[1].uuid)
+        self.assertEqual(graph.get_native_id(Project, "foo"), node)
+        self.assertIsNone(graph.get_native_id(Image, "baz"))
+        self.assertIsNone(graph.get_native_id(Server, "foo"))
+
+        self.assertEqual(graph.get_attribute_id("abcd").uuid, images[0].uuid)
+        self.assertEqual(graph.get_attribute_id("ef-gh").uuid,
+                         images[1].uuid)
+        self.assertIsNone(graph.get_attribute_id("ab"))
+
+        self.assertEqual([x.uuid for x in graph.nodes_of_type(Image)],
+                         sorted(x.uuid for x in images))
+        self.assertEqual(graph.count_of_type(Image), 2)
+        self.assertEqual(graph.nodes_of_type(Server), [])
+        self.assertEqual(graph.count_of_type(Server), 0)
+
+        # Adjacency.
+        image = graph.get_uuid(images[0].uuid)
+        self.assertEqual(set(x.uuid for x in graph.successors(node)),
+                         set(x.uuid for x in images))
+        self.assertEqual(graph.predecessors(image), [node])
+        self.assertEqual(graph.successors(image), [])
+        self.assertEqual(graph.get_edge_data(node, image),
+                         {0: {"edgescore": 7}})
+        self.assertEqual(graph.get_edge_data(node, image, 0),
+                         {"edgescore": 7})
+        self.assertIsNone(graph.get_edge_data(image, node))
+        self.assertTrue(networkx.has_path(graph, node, image))
+        self.assertFalse(networkx.has_path(graph, image, node))
+
+        # Instances looks nodes up in the mapped graph.
+        instances = Instances()
+
+        with patch.object(Instances, "graph", graph):
+            self.assertEqual(instances.get_uuid(project.uuid), node)
+            self.assertEqual(instances.get_native_id(Image, "foo"), image)
+            self.assertEqual(instances.get_attribute_id("abcd"), image)
+            self.assertEqual(instances.nodes_of_type(Image),
+                             graph.nodes_of_type(Image))
@@ -0,0 +1,332 @@
+"""Rollup unit tests."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from django.test import SimpleTestCase
+from mock import patch, MagicMock
+
+
+class Rollups(SimpleTestCase):
+    """Test the rollups of metric and API performance statistics, and of log
+    counts."""
+
+    HOUR = 3600000
+
+    @staticmethod
+    def _response(aggregations):
+        """Return an ES search response with these aggregations."""
+        from elasticsearch_dsl.result import Response
+
+        return Response({"hits": {"hits": [], "total": 0},
+                         "aggregations": aggregations})
+
+    @staticmethod
+    def _request(query):
+        """Return a DRF request for a query string."""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        return Request(APIRequestFactory().get("/summarize/?" + query))
+
+    @staticmethod
+    def _redis(progress):
+        """Return a mock redis connection class, whose tiers have this
+        progress.
+
+        :param progress: Each tier's origin and watermark
+        :type progress: dict
+
+        """
+        from .rollup import PROGRESS_KEY
+
+        values = {}
+        for tier, (origin, watermark) in progress.items():
+            values[PROGRESS_KEY % (tier, "origin")] = str(origin)
+            values[PROGRESS_KEY % (tier, "watermark")] = str(watermark)
+
+        connection = MagicMock()
+        # pylint: disable=E1101
+        connection.return_value.conn.mget.side_effect = \
+            lambda *keys: [values.get(x) for x in keys]
+
+        return connection
+
+    def test_rollup_docs(self):
+        """Each grouping's statistics in each bucket become a document."""
+        from elasticsearch_dsl import Search
+        from .models import MetricData
+        from .rollup import _rollup_docs
+
+        response = self._response(
+            {"per_interval": {"buckets": [
+                {"key": 0,
+                 "doc_count": 3,
+                 "name": {"buckets": [
+                     {"key": "cpu",
+                      "doc_count": 3,
+                      "stats": {"count": 3, "sum": 6, "min": 1, "max": 3,
+                                "sum_of_squares": 14},
+                      "units": {"buckets": [{"key": "percent"}]}}]}}]}})
+
+        with patch.object(MetricData, "search", return_value=Search()), \
+                patch.object(MetricData, "field_has_raw", return_value=True), \
+                patch.object(Search, "execute",
+                             return_value=response) as execute:
+            docs = list(_rollup_docs("metric", ("name", ), "1h", 0, self.HOUR))
+
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(len(docs), 1)
+
+        index, doc_id, doc = docs[0]
+        self.assertEqual(index, "goldstone_rollup-1970.01.01")
+        self.assertEqual(doc["name"], "cpu")
+        self.assertEqual(doc["grouping"], "name")
+        self.assertEqual(doc["sum_of_squares"], 14)
+        self.assertEqual(doc["units"], ["percent"])
+
+        # Rewriting a bucket replaces its document.
+        with patch.object(MetricData, "search", return_value=Search()), \
+                patch.object(MetricData, "field_has_raw", return_value=True), \
+                patch.object(Search, "execute", return_value=response):
+            self.assertEqual(
+                list(_rollup_docs("metric", ("name", ), "1h", 0,
+                                  self.HOUR))[0][1],
+                doc_id)
+
+    def test_span(self):
+        """A tier's span re-rolls its trailing buckets, a coarse tier's buckets
+        are rolled up once, and a new tier is backfilled."""
+        from .rollup import _span, PROGRESS_KEY
+
+        # pylint: disable=E1101
+        minute = self.HOUR / 60
+        conn = self._redis({"1m": (0, 10 * self.HOUR),
+                            "1h": (0, 10 * self.HOUR)}).return_value.conn
+
+        self.assertEqual(_span(conn, "1m", 13 * self.HOUR),
+                         (10 * self.HOUR - 10 * minute,
+                          13 * self.HOUR - 2 * minute))
+        self.assertEqual(_span(conn, "1h", 13 * self.HOUR),
+                         (10 * self.HOUR, 12 * self.HOUR))
+        self.assertFalse(conn.set.called)
+
+        # A closed hour isn't rolled up until its late documents are in, and
+        # then isn't rolled up again.
+        conn = self._redis({"1h": (0, 11 * self.HOUR)}).return_value.conn
+
+        self.assertEqual(_span(conn, "1h", 12 * self.HOUR + 11 * minute),
+                         (11 * self.HOUR, 11 * self.HOUR))
+        self.assertEqual(_span(conn, "1h", 12 * self.HOUR + 12 * minute),
+                         (11 * self.HOUR, 12 * self.HOUR))
+
+        conn = self._redis({"1h": (0, 12 * self.HOUR)}).return_value.conn
+
+        self.assertEqual(_span(conn, "1h", 12 * self.HOUR + 30 * minute),
+                         (12 * self.HOUR, 12 * self.HOUR))
+
+        # A new tier starts ROLLUP_BACKFILL before its first span's end.
+        conn = self._redis({}).return_value.conn
+
+        self.assertEqual(_span(conn, "1h", 30 * self.HOUR),
+                         (5 * self.HOUR, 29 * self.HOUR))
+        conn.set.assert_called_once_with(PROGRESS_KEY % ("1h", "origin"),
+                                         5 * self.HOUR)
+
+    def test_plan(self):
+        """The coarsest usable tier is chosen, and the rolled-up span is whole
+        tier buckets."""
+        from .rollup import _plan
+        from .views import MetricAggView
+
+        redis = self._redis({"1m": (0, 13 * self.HOUR),
+                             "1h": (0, 13 * self.HOUR)})
+        view = MetricAggView()
+        query = "name=cpu&@timestamp__range={'gte':%d,'lt':%d}" % \
+                (10.5 * self.HOUR, 14 * self.HOUR)
+
+        with patch("goldstone.models.RedisConnection", redis):
+            plan = _plan(view, self._request("interval=2h&" + query), "2h")
+            self.assertEqual(plan["tier"], "1h")
+            self.assertEqual(plan["head"], 11 * self.HOUR)
+            self.assertEqual(plan["tail"], 13 * self.HOUR)
+            self.assertEqual(plan["keys"], {"name": "cpu"})
+
+            plan = _plan(view, self._request("interval=30m&" + query),
+                         "30m")
+            self.assertEqual(plan["tier"], "1m")
+
+            # Intervals that no tier divides, queries that aren't a grouping,
+            # and open-ended ranges don't use rollups.
+            for bad in ["interval=90s&" + query,
+                        "interval=1h&other=x&" + query,
+                        "interval=1h&name__prefix=cpu&" + query[9:],
+                        "interval=1h&name=cpu&@timestamp__range={'lt':1}"]:
+                request = self._request(bad)
+                self.assertIsNone(
+                    _plan(view, request, request.query_params["interval"]))
+
+        # A range before the rollups' origin doesn't use rollups.
+        with patch("goldstone.models.RedisConnection",
+                   self._redis({"1h": (12 * self.HOUR, 13 * self.HOUR)})):
+            self.assertIsNone(
+                _plan(view, self._request("interval=1h&" + query), "1h"))
+
+    def test_aggregations(self):
+        """Raw and rollup statistics are merged, bucket by bucket."""
+        from elasticsearch_dsl import Search
+        from .models import MetricData, RollupData
+        from .rollup import rollup_aggregations
+        from .views import MetricAggView
+
+        raw = self._response(
+            {"per_interval": {"buckets": [
+                {"key": 10 * self.HOUR,
+                 "doc_count": 2,
+                 "stats": {"count": 2, "sum": 4, "min": 1, "max": 3,
+                           "sum_of_squares": 10}},
+                {"key": 13 * self.HOUR,
+                 "doc_count": 1,
+                 "stats": {"count": 1, "sum": 5, "min": 5, "max": 5,
+                           "sum_of_squares": 25}}]},
+             "units": {"buckets": [{"key": "gb"}]}})
+
+        rollups = self._response(
+            {"per_interval": {"buckets": [
+                {"key": 11 * self.HOUR,
+                 "doc_count": 2,
+                 "count": {"value": 3},
+                 "sum": {"value": 6},
+                 "min": {"value": 1},
+                 "max": {"value": 3},
+                 "sum_of_squares": {"value": 14}},
+                {"key": 12 * self.HOUR,
+                 "doc_count": 0,
+                 "count": {"value": 0},
+                 "sum": {"value": 0},
+                 "min": {"value": None},
+                 "max": {"value": None},
+                 "sum_of_squares": {"value": 0}}]},
+             "units": {"buckets": [{"key": "mb"}]}})
+
+        search = Search()
+        # pylint: disable=W0212
+        search.aggs.bucket("per_interval",
+                           MetricData._datehist_agg("1h")) \
+            .metric("stats", MetricData.stats_agg())
+        search.aggs.bucket("units", MetricData.units_agg())
+
+        request = self._request(
+            "interval=1h&name=cpu&@timestamp__range={'gte':%d,'lt':%d}" %
+            (10.5 * self.HOUR, 14 * self.HOUR))
+
+        with patch("goldstone.models.RedisConnection",
+                   self._redis({"1h": (0, 13 * self.HOUR)})), \
+                patch.object(RollupData, "search", return_value=Search()), \
+                patch.object(Search, "execute", side_effect=[raw, rollups]):
+            result = rollup_aggregations(MetricAggView(), request, search)
+
+        buckets = result.per_interval.buckets
+        self.assertEqual([x.key for x in buckets],
+                         [10 * self.HOUR, 11 * self.HOUR, 12 * self.HOUR,
+                          13 * self.HOUR])
+        self.assertEqual([x.doc_count for x in buckets], [2, 3, 0, 1])
+        self.assertEqual(buckets[1]["stats"]["avg"], 2.0)
+        self.assertAlmostEqual(buckets[1]["stats"]["variance"], 14 / 3.0 - 4)
+        self.assertIsNone(buckets[2]["stats"]["min"])
+        self.assertEqual([x.key for x in result.units.buckets], ["gb", "mb"])
+
+        # Without rollups, the raw search answers alone.
+        with patch("goldstone.models.RedisConnection", self._redis({})), \
+                patch.object(Search, "execute", return_value=raw) as execute:
+            result = rollup_aggregations(MetricAggView(), request, search)
+
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(len(result.per_interval.buckets), 2)
+
+    def test_log_aggregations(self):
+        """Raw and rollup log counts are merged per interval, host, and
+        level."""
+        from elasticsearch_dsl import Search
+        from goldstone.glogging.models import LogData
+        from goldstone.glogging.views import LogAggView
+        from .models import RollupData
+        from .rollup import rollup_log_aggregations
+
+        raw = self._response(
+            {"per_interval": {"buckets": [
+                {"key": 13 * self.HOUR,
+                 "doc_count": 2,
+                 "host": {"buckets": [
+                     {"key": "ctrl",
+                      "doc_count": 2,
+                      "syslog_severity": {"buckets": [
+                          {"key": "ERROR", "doc_count": 2}]}}]}}]}})
+
+        rollups = self._response(
+            {"per_interval": {"buckets": [
+                {"key": 11 * self.HOUR,
+                 "doc_count": 2,
+                 "host": {"buckets": [
+                     {"key": "ctrl",
+                      "doc_count": 1,
+                      "syslog_severity": {"buckets": [
+                          {"key": "INFO",
+                           "doc_count": 1,
+                           "count": {"value": 5}}]}},
+                     {"key": "compute",
+                      "doc_count": 1,
+                      "syslog_severity": {"buckets": [
+                          {"key": "ERROR",
+                           "doc_count": 1,
+                           "count": {"value": 1}}]}}]}}]}})
+
+        request = self._request(
+            "interval=1h&@timestamp__range={'gte':%d,'lt':%d}" %
+            (11 * self.HOUR, 14 * self.HOUR))
+
+        with patch("goldstone.models.RedisConnection",
+                   self._redis({"1h": (0, 13 * self.HOUR)})), \
+                patch.object(RollupData, "search", return_value=Search()), \
+                patch.object(Search, "execute", side_effect=[raw, rollups]):
+            result = rollup_log_aggregations(LogAggView(), request, Search(),
+                                             "1h", True)
+
+        self.assertEqual(
+            [(x.key, x.doc_count) for x in result.per_level.buckets],
+            [("INFO", 5), ("ERROR", 3)])
+        self.assertEqual(
+            [(x.key, x.doc_count) for x in result.per_host.buckets],
+            [("ctrl", 7), ("compute", 1)])
+
+        # The empty interval between the rollups and the raw logs is filled
+        # in, and each interval has every host and level.
+        buckets = result.per_interval.buckets
+        self.assertEqual([(x.key, x.doc_count) for x in buckets],
+                         [(11 * self.HOUR, 6), (12 * self.HOUR, 0),
+                          (13 * self.HOUR, 2)])
+        self.assertEqual([x.key for x in buckets[1].per_host.buckets],
+                         ["compute", "ctrl"])
+        self.assertEqual(
+            [(x.key, x.doc_count)
+             for x in buckets[2].per_host.buckets[0].per_level.buckets],
+            [("ERROR", 2), ("INFO", 0)])
+
+        # Without rollups, ranged_log_agg answers alone.
+        search = Search()
+
+        with patch("goldstone.models.RedisConnection", self._redis({})), \
+                patch.object(LogData, "ranged_log_agg") as ranged_log_agg:
+            rollup_log_aggregations(LogAggView(), request, search, "1h",
+                                    False)
+
+        ranged_log_agg.assert_called_once_with(search, "1h", False)
@@ -13,11 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from django.conf import settings
+from mock import patch
 
 from goldstone.core import resource
 from goldstone.test_utils import Setup
 
-from .models import Image, Network, Project, Server, Interface, Volume
+from .models import Image, Network, Project, Server, Interface, Volume, \
+    Region
 from .tests import load_persistent_rg
 from .views import TopologyView
 
@@ -340,3 +342,47 @@ class TopologyViewTests(Setup):
         del result["children"]
 
         self.assertEqual(result, EXPECTED)
+
+    def test_get_object(self):
+        """The region is passed down the topology, and the topology is rebuilt
+        only when the graph changes."""
+
+        # Create the PolyResource database rows, with a region that owns the
+        # project.
+        load_persistent_rg(NODES + [(Region, "r0")],
+                           EDGES + [((Region, "r0"),
+                                     (Project, "p0"),
+                                     {TYPE: TOPOLOGICALLY_OWNS,
+                                      MIN: 1,
+                                      MAX: 1})])
+
+        region = Region.objects.get(native_id="r0")
+        region.cloud_attributes = {"id": "RegionOne"}
+        region.save()
+
+        result = TopologyView().get_object()
+
+        region = result["children"][0]
+        self.assertEqual(region["label"], "RegionOne")
+
+        self.assertEqual(region["children"][0]["label"], Project().label())
+
+        def urls(node):
+            """Return the resource list URLs in a topology."""
+
+            return [node["resource_list_url"]] + \
+                [y for x in node["children"] or [] for y in urls(x)]
+
+        self.assertIn("/cinder/volumes/?region=RegionOne", urls(region))
+        self.assertNotIn("/cinder/volumes/?region=None", urls(region))
+
+        # An unchanged graph returns the same topology.
+        with patch.object(TopologyView, "_tree") as tree:
+            self.assertIs(TopologyView().get_object(), result)
+            self.assertFalse(tree.called)
+
+        # A changed graph rebuilds it.
+        Image.objects.create(native_id="new", native_name="new")
+        resource.instances._graph = None           # pylint: disable=W0212
+
+        self.assertIsNot(TopologyView().get_object(), result)
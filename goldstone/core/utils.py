@@ -13,18 +13,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import re
 
+from django.conf import settings
 import elasticsearch
 from rest_framework import status, serializers
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
-from goldstone.core.models import PolyResource
+from goldstone.core.models import PolyResource, EdgeMatcher
 from goldstone.drfes.utils import es_custom_exception_handler
 
 logger = logging.getLogger(__name__)
 
+TO = settings.R_ATTRIBUTE.TO
+
+# A parse() regex term that's a literal string, optionally anchored at its
+# beginning and end. The groups are the anchors and the string.
+LITERAL_TERM = re.compile(r"^(\^?)([^.^$*+?{}\[\]\\|()]*)(\$?)$")
+
 
 class JsonReadOnlySerializer(serializers.Serializer):   # pylint: disable=W0223
     """Serialize data that's already serialized."""
@@ -155,7 +163,47 @@ def custom_exception_handler(exc, context):
     return response
 
 
-def process_resource_type(nodetype):
+def collect_clouddata(nodetypes):
+    """Return the clouddata() results of many resource types, which are
+    queried concurrently.
+
+    The OpenStack API calls block, so a bounded pool of threads queries the
+    types. A collection cycle then takes about as long as its slowest API,
+    rather than the sum of them.
+
+    :param nodetypes: The resource types
+    :type nodetypes: list of PolyResource subclass
+    :return: Each type's clouddata() result
+    :rtype: dict of PolyResource subclass -> list
+
+    """
+    from django.db import connection
+    from multiprocessing.pool import ThreadPool
+
+    def clouddata(nodetype):
+        """Return one type's clouddata(), and close this thread's database
+        connection, which some clients use to read the cloud's credentials."""
+
+        try:
+            return nodetype.clouddata()
+        finally:
+            connection.close()
+
+    if not nodetypes:
+        return {}
+
+    pool = ThreadPool(min(settings.RESOURCE_CLOUDDATA_THREADS,
+                          len(nodetypes)))
+
+    try:
+        # If a query raises an exception, it's re-raised here.
+        return dict(zip(nodetypes, pool.map(clouddata, nodetypes)))
+    finally:
+        pool.terminate()
+
+
+def process_resource_type(nodetype,              # pylint: disable=R0914
+                          actual_node_data=None):
     """Update the persistent Resource graph nodes that are of this type.
 
     Special processing for Region nodes: Nodes representing integrations are
@@ -166,68 +214,96 @@ def process_resource_type(nodetype):
        - added if they are in the OpenStack cloud, but not in the graph.
        - updated from the cloud if they are already in the graph.
 
+    This doesn't update any edges. The caller must pass the returned uuids to
+    update_edges() after all the resource types have been processed.
+
     :param nodetype: A resource type
     :type nodetype: PolyResource subclass
+    :param actual_node_data: The type's clouddata(), if it's already been
+                             collected
+    :type actual_node_data: list or None
+    :return: The uuids of the nodes that were deleted, added, or changed
+    :rtype: set of str
 
     """
-    from django.core.exceptions import ObjectDoesNotExist
+    from django.db import transaction
     from goldstone.core.models import Host, Keystone, Nova, Neutron, Glance, \
-        Region, Cinder
+        Region, Cinder, utc_now
 
-    # Remove Resource graph nodes that no longer exist. First get the cloud
-    # instances of the desired type, and nodes of that type in the persistent
-    # resource graph.
-    actual_node_data = nodetype.clouddata()
-    persistent_nodes = nodetype.objects.all()
+    # Get the cloud instances of the desired type, and a native_id -> row map
+    # of the nodes of that type in the persistent resource graph.
+    #
+    # N.B. In glance, entries will be of type warlock.core.image instead of
+    # dict. So we simply use dict(entry) everywhere, to cover those
+    # situations.
+    if actual_node_data is None:
+        actual_node_data = nodetype.clouddata()
 
     nodetype_native_id_key = nodetype.native_id_key()
-    actual_cloud_instance_ids = set([x.get(nodetype_native_id_key)
-                                     for x in actual_node_data if x])
-
-    # For every node of this type in the persistent resource graph...
-    for entry in persistent_nodes:
-        if entry.native_id not in actual_cloud_instance_ids:
-            # This node isn't in the cloud anymore, so delete it from the
-            # persistent data.
-            entry.delete()
-
-    # Now, for every node of this type in the cloud, add it to the persistent
-    # Resource graph if it's not there, or update its information if it is.
-    for entry in actual_node_data:
-        native_id = entry.get(nodetype_native_id_key)
-
-        # If this node has a unique id... (All nodes should...)
-        if native_id:
-            # Try to find its corresponding persistent Resource graph node.
-            # Note: This try/except block works iff there's only one copy of
-            # this function executing at a time.
-            #
-            # N.B. In glance, entry will be of type warlock.core.image instead
-            # of dict. So we simply use dict(entry) everywhere, to cover those
-            # situations.
-            try:
-                persistent_node = nodetype.objects.get(native_id=native_id)
-            except ObjectDoesNotExist:
-                # The node doesn't exist. Create it. We need to treat Host
+    actual_nodes = dict((x.get(nodetype_native_id_key), x)
+                        for x in actual_node_data if x)
+
+    # The rows' cloud attributes aren't read, because their hashes tell us
+    # which have changed.
+    persistent_nodes = dict((x.native_id, x)
+                            for x in nodetype.objects.defer("cloud_attributes",
+                                                            "edges"))
+    changed = set()
+
+    # Note: This works iff there's only one copy of this function executing at
+    # a time.
+    with transaction.atomic():
+        # Delete the nodes that are no longer in the cloud, in one query.
+        stale = [x for native_id, x in persistent_nodes.iteritems()
+                 if native_id not in actual_nodes]
+
+        if stale:
+            changed.update(x.uuid for x in stale)
+            nodetype.objects.filter(pk__in=[x.pk for x in stale]).delete()
+
+        # Now, for every node of this type in the cloud, add it to the
+        # persistent Resource graph if it's not there, or update its
+        # information if it has changed.
+        for native_id, entry in actual_nodes.iteritems():
+            # If this node doesn't have a unique id, skip it. (All nodes
+            # should have one...)
+            if not native_id:
+                continue
+
+            attributes = dict(entry)
+            attributes_hash = PolyResource.hash_attributes(attributes)
+            persistent_node = persistent_nodes.get(native_id)
+
+            if persistent_node is None:
+                # The node doesn't exist. Create it. (Django can't
+                # bulk_create multi-table subclasses.) We need to treat Host
                 # instances a little differently that other nodes...
                 if nodetype == Host:
                     native_name = entry.get("host_name", '')
                     persistent_node = \
                         nodetype.objects.create(native_id=native_id,
                                                 native_name=native_name,
-                                                cloud_attributes=dict(entry),
+                                                cloud_attributes=attributes,
                                                 fqdn=native_name+".com")
                 else:
                     native_name = entry.get("name", '')
                     persistent_node = \
                         nodetype.objects.create(native_id=native_id,
                                                 native_name=native_name,
-                                                cloud_attributes=dict(entry))
-            else:
-                # Persistent_node corresponds to the actual node in entry.
-                # Update its persistent information, in the database.
-                persistent_node.cloud_attributes = dict(entry)
-                persistent_node.save()
+                                                cloud_attributes=attributes)
+
+                changed.add(persistent_node.uuid)
+
+            elif persistent_node.attributes_hash != attributes_hash:
+                # Update the changed node's cloud attributes. The attributes
+                # are in the PolyResource table, so we update only it rather
+                # than saving every table of the subclass.
+                PolyResource.objects \
+                    .filter(pk=persistent_node.pk) \
+                    .update(cloud_attributes=attributes,
+                            attributes_hash=attributes_hash,
+                            updated=utc_now())
+                changed.add(persistent_node.uuid)
 
     # Special processing for Region nodes. Each region must have nodes
     # representing the integrations. (Nova, Keystone, etc.)
@@ -236,17 +312,63 @@ def process_resource_type(nodetype):
             regionname = region.cloud_attributes["id"]
 
             for integration in [Keystone, Nova, Neutron, Glance, Cinder]:
-                integration.objects.get_or_create(
+                row, created = integration.objects.get_or_create(
                     native_id=regionname,
                     cloud_attributes={integration.native_id_key(): regionname})
 
-    # The persistent nodes have been updated. Now fill in / update all
-    # nodes' outgoing edges.
-    #
-    # TODO: Perhaps make this a table Manager method, to hide the loop &
-    # optimize it.
-    for node in PolyResource.objects.all():
-        node.update_edges()
+                if created:
+                    changed.add(row.uuid)
+
+    return changed
+
+
+def update_edges(changed):
+    """Update the persistent Resource graph's edges that may have been
+    affected by changed nodes.
+
+    This is called once, after all the resource types' nodes have been
+    processed. The edges that are recomputed are those leaving a changed
+    node, those leaving a node that had an edge to a changed node, and those
+    leaving a node whose type has edges to a changed node's type. Only rows
+    whose edge lists actually change are written.
+
+    :param changed: The uuids of the nodes that were deleted, added, or
+                    changed
+    :type changed: set of str
+    :return: The number of rows whose edges were written
+    :rtype: int
+
+    """
+
+    if not changed:
+        return 0
+
+    nodes = list(PolyResource.objects.all())
+
+    # The types of the changed nodes that still exist, and a memo of whether
+    # a resource type has edges to any of those types.
+    changed_types = set(type(x) for x in nodes if x.uuid in changed)
+    links_to_changed = {}
+
+    # One matcher is shared by all the nodes, so each neighbor type is read
+    # and indexed once.
+    matcher = EdgeMatcher()
+    written = 0
+
+    for node in nodes:
+        nodetype = type(node)
+
+        if nodetype not in links_to_changed:
+            links_to_changed[nodetype] = \
+                any(x[TO] in changed_types
+                    for x in nodetype.type_outgoing_edges())
+
+        if node.uuid in changed or links_to_changed[nodetype] or \
+                any(x[0] in changed for x in node.edges):
+            if node.update_edges(matcher):
+                written += 1
+
+    return written
 
 
 ########################
@@ -300,11 +422,82 @@ def parse(query_string):
     return result
 
 
+def _text_filter(field):
+    """Return a function that translates a parse() regex on a text field into
+    an ORM filter.
+
+    A regex of literal terms, each optionally anchored by ^ or $, uses
+    indexable lookups. Anything else is matched as a regex by the database.
+
+    :param field: A PolyResource field name
+    :type field: str
+    :rtype: callable
+
+    """
+
+    def text_filter(regex):
+        """Return an ORM filter that matches regex against the field."""
+        from django.db.models import Q
+
+        terms = [LITERAL_TERM.match(x) for x in regex.split('|')]
+        if not all(terms):
+            return Q(**{field + "__regex": regex})
+
+        # Fully anchored terms are exact matches, which are done together.
+        exact = [x.group(2) for x in terms if x.group(1) and x.group(3)]
+        result = Q(**{field + "__in": exact}) if exact else None
+
+        for start, text, end in (x.groups() for x in terms):
+            if start and end:
+                continue
+
+            lookup = "startswith" if start else \
+                "endswith" if end else "contains"
+            term = Q(**{"%s__%s" % (field, lookup): text})
+            result = term if result is None else result | term
+
+        return result
+
+    return text_filter
+
+
+def _integration_filter(regex):
+    """Return an ORM filter that matches a parse() regex against a row's
+    integration name.
+
+    The integration is a property of a resource type, so the regex is matched
+    against the loaded PolyResource subclasses, and the rows are filtered by
+    their polymorphic content types.
+
+    :param regex: A regex
+    :type regex: str
+    :rtype: Q
+
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from django.db.models import Q
+
+    compiled = re.compile(regex)
+    types = []
+    pending = PolyResource.__subclasses__()        # pylint: disable=E1101
+
+    while pending:
+        nodetype = pending.pop()
+        pending.extend(nodetype.__subclasses__())
+
+        if compiled.search(nodetype.integration()):
+            types.append(nodetype)
+
+    return Q(polymorphic_ctype__in=[ContentType.objects.get_for_model(x)
+                                    for x in types])
+
+
 def query_filter_map(key):
     """Return information about how to filter the content of a response.
 
     This is used to control the filtering of nodes in the response from a
-    /core/resources/xxxx/ API endpoint.
+    /core/resources/xxxx/ API endpoint. The filtering is done by the
+    database, so that only the matching rows are read.
 
     It will grow in sophistication as is necessary.
 
@@ -312,23 +505,17 @@ def query_filter_map(key):
 
     :param key: The key the user wants to filter on.
     :type key: str
-    :return: Information that tells the caller how to filter on the key
-    :rtype: (callable, str). The callable is a two-parameter function that is
-            called with (node_data, filter_value). It returns True if the node
-            should be included in the response content. The str is "db" or
-            "node", and indicates whether node_data is a node's table row or
-            its resource graph node.
+    :return: A one-parameter function that's called with the key's regex from
+             parse(), and returns a filter on PolyResource rows; or None if
+             the key can't be filtered on
+    :rtype: callable or None
 
     """
-    import re
 
     # Each entry defines a function return value.
-    MAPPING = {"native_name":
-               (lambda n, f: bool(re.search(f, n.native_name)), "db"),
-               "native_id":
-               (lambda n, f: bool(re.search(f, n.native_id)), "db"),
-               "integration_name":
-               (lambda n, f: bool(re.search(f, n.integration())), "db"),
+    MAPPING = {"native_name": _text_filter("native_name"),
+               "native_id": _text_filter("native_id"),
+               "integration_name": _integration_filter,
                }
 
     return MAPPING.get(key)
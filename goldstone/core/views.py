@@ -12,6 +12,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import namedtuple, OrderedDict
+from itertools import chain
 import logging
 
 from django.conf import settings
@@ -23,6 +25,7 @@ from goldstone.drfes.views import ElasticListAPIView, SimpleAggView, \
     DateHistogramAggView
 
 from goldstone.core import resource
+from goldstone.core.rollup import rollup_aggregations
 from .models import MetricData, ReportData, PolyResource, EventData, \
     ApiPerfData
 from .serializers import MetricDataSerializer, ReportDataSerializer, \
@@ -35,9 +38,33 @@ from .utils import parse, query_filter_map
 TYPE = settings.R_ATTRIBUTE.TYPE
 TOPOLOGICALLY_OWNS = settings.R_EDGE.TOPOLOGICALLY_OWNS
 
+# The table information that the resource views return.
+NativeNames = namedtuple("NativeNames", "native_id native_name")
+
 logger = logging.getLogger(__name__)
 
 
+def _native_names(uuids=None, filters=()):
+    """Return the native ids and names of PolyResource rows, in one query.
+
+    :param uuids: The rows' UUIDs. If None, all the rows are returned
+    :type uuids: iterable of str or None
+    :param filters: Filters that the rows must also match
+    :type filters: iterable of Q
+    :return: Each row's native id and name, by UUID
+    :rtype: dict of str: NativeNames
+
+    """
+
+    rows = PolyResource.objects.non_polymorphic().filter(*filters)
+    if uuids is not None:
+        rows = rows.filter(uuid__in=list(uuids))
+
+    return dict((uuid, NativeNames(native_id, native_name))
+                for uuid, native_id, native_name in
+                rows.values_list("uuid", "native_id", "native_name"))
+
+
 # Our API documentation extracts this docstring.
 class ReportDataListView(ElasticListAPIView):
     """Return events from Logstash data.
@@ -201,7 +228,7 @@ class MetricAggView(DateHistogramAggView):
         """Meta."""
         model = MetricData
 
-    def get(self, request):
+    def _get_response(self, request):
         """Handle get request. Override default to add nested aggregations."""
 
         search = self._get_search(request)
@@ -211,7 +238,8 @@ class MetricAggView(DateHistogramAggView):
         search.aggs[self.AGG_NAME].bucket(self.STATS_AGG_NAME,
                                           self.Meta.model.stats_agg())
 
-        serializer = self.serializer_class(search.execute().aggregations)
+        serializer = self.serializer_class(
+            rollup_aggregations(self, request, search))
 
         return Response(serializer.data)
 
@@ -226,28 +254,60 @@ class TopologyView(RetrieveAPIView):
 
     serializer_class = PassthruSerializer
 
-    def _tree(self, node):
+    # The last topology returned by this process, and the resource graph
+    # generation from which it was built.
+    _topology = (None, None)
+
+    @staticmethod
+    def _region(node):
+        """Return the id of the region from which a node is reachable, or None.
+
+        :param node: A resource graph node
+        :type node: GraphNode
+        :rtype: str or None
+
+        """
+        from networkx import has_path
+        from goldstone.core.models import Region
+
+        for region in resource.instances.nodes_of_type(Region):
+            if has_path(resource.instances.graph, region, node):
+                return region.attributes["id"]
+
+        return None
+
+    def _tree(self, node, region=False):
         """Return the topology of the cloud starting at a node.
 
+        The region is found once, for the starting node, and passed down to
+        its children.
+
         :param node: A resource graph node
         :type node: GraphNode
+        :param region: The id of the node's region, or None if it has none. If
+                       False, it's looked up
+        :type region: str or None or bool
         :return: The topology of this down "downward," including all of its
                  children
         :rtype: dict
 
         """
-        from networkx import has_path
         from goldstone.core.models import Region
 
+        graph = resource.instances.graph
+
+        # A region is its own region.
+        if node.resourcetype is Region:
+            region = node.attributes.get("id")
+        elif region is False:
+            region = self._region(node)
+
         # Get all the topological children by looking for a TOPOLOGICALLY_OWNS
         # edge between this node and its children.
-        children = \
-            [self._tree(x)
-             for x in resource.instances.graph.successors(node)
-             if any(y[TYPE] == TOPOLOGICALLY_OWNS
-                    for y in
-                    resource.instances.graph.get_edge_data(node, x)
-                    .values())]
+        children = [self._tree(x, region)
+                    for x in graph.successors(node)
+                    if any(y[TYPE] == TOPOLOGICALLY_OWNS
+                           for y in graph.get_edge_data(node, x).values())]
 
         # Now we concoct the return value. If no children, return None rather
         # than an empty list.
@@ -256,17 +316,8 @@ class TopologyView(RetrieveAPIView):
 
         # Create the resource list URL formatting dictionary.
         #
-        # Find this node's region, and its predecessor's Integration name.
-        regionnodes = resource.instances.nodes_of_type(Region)
-        for region in regionnodes:
-            if has_path(resource.instances.graph, region, node):
-                region = region.attributes["id"]
-                break
-        else:
-            region = None
-
         # Find a predecessor's Integration name. Any one will do.
-        predecessor_nodes = resource.instances.graph.predecessors(node)
+        predecessor_nodes = graph.predecessors(node)
         parent_integration = \
             predecessor_nodes[0].resourcetype.integration().lower() \
             if predecessor_nodes else None
@@ -276,12 +327,14 @@ class TopologyView(RetrieveAPIView):
                       "zone": node.attributes.get("zone"),
                       }
 
+        # The label comes from the node's cloud attributes, which the graph
+        # already holds, so an unsaved instance is enough.
+        label = node.resourcetype(cloud_attributes=node.attributes).label()
+
         result = {"uuid": node.uuid,
                   "integration": node.resourcetype.integration(),
-                  "resourcetype":
-                  node.resourcetype.objects.get(uuid=node.uuid).resourcetype(),
-                  "label":
-                  node.resourcetype.objects.get(uuid=node.uuid).label(),
+                  "resourcetype": node.resourcetype.resourcetype(),
+                  "label": label,
                   "resource_list_url":
                   node.resourcetype.resource_list_url().format(**url_values),
                   "children": children}
@@ -300,15 +353,21 @@ class TopologyView(RetrieveAPIView):
     def get_object(self):
         """Return the cloud's toplogy.
 
+        The topology is rebuilt only when the resource graph has changed since
+        it was last built.
+
         :rtype: dict
 
         """
         from .models import Region
 
+        generation = resource.instances.generation()
+        if self._topology[0] == generation:
+            return self._topology[1]
+
         # We do this in multiple steps in order to be more robust in the face
         # of bad cloud data.
-        regionnodes = set([resource.instances.get_uuid(x.uuid)
-                           for x in Region.objects.all()])
+        regionnodes = set(resource.instances.nodes_of_type(Region))
         if not regionnodes:
             return {"label": "No data found"}
         elif len(regionnodes) > 1:
@@ -318,11 +377,14 @@ class TopologyView(RetrieveAPIView):
             regionnodes = list(regionnodes)[:1]
 
         # Find the children of each region.
-        children = [self._tree(x) for x in regionnodes if x]
+        children = [self._tree(x) for x in regionnodes]
 
         # Return a "cloud" response. The children are the regions cloud's
         # regions.
-        return {"label": "cloud", "uuid": None, "children": children}
+        result = {"label": "cloud", "uuid": None, "children": children}
+
+        TopologyView._topology = (generation, result)
+        return result
 
 
 # Our API documentation extracts this docstring.
@@ -357,7 +419,7 @@ class ResourceTypeList(ListAPIView):
                   "resourcetype": entry().resourcetype(),
                   "label": entry().label(),
                   "unique_id": entry.unique_class_id(),
-                  "present": bool(resource.instances.nodes_of_type(entry))}
+                  "present": resource.instances.count_of_type(entry) > 0}
                  for entry in resource.types.graph.nodes()]
 
         # Gather the edges.
@@ -415,9 +477,17 @@ class ResourceTypeRetrieve(RetrieveAPIView):
         if target_type is not None:
             # The desired resource type was found. Each instance's information
             # comes from its resource graph node, and its PolyResource table
-            # row.
-            for node in resource.instances.nodes_of_type(target_type):
-                row = PolyResource.objects.get(uuid=node.uuid)
+            # row. The rows are read in one query.
+            nodes = resource.instances.nodes_of_type(target_type)
+            rows = _native_names(x.uuid for x in nodes)
+
+            for node in nodes:
+                row = rows.get(node.uuid)
+
+                # A node without a row was deleted since the graph was loaded.
+                if row is None:
+                    continue
+
                 result.append({"uuid": node.uuid,
                                "native_id": row.native_id,
                                "native_name": row.native_name,
@@ -439,7 +509,10 @@ class ResourcesList(ListAPIView):
 
     serializer_class = PassthruSerializer
 
-    def get(self, request, *args, **kwargs):
+    # These query parameters page the response instead of filtering it.
+    reserved_params = ['page', 'page_size']
+
+    def get(self, request, *args, **kwargs):     # pylint: disable=R0914
         """Return the resource graph's nodes and edges.
 
         The response payload is:
@@ -466,7 +539,12 @@ class ResourcesList(ListAPIView):
         an integration filter of <b>nova|keystone</b>.\n\n
 
         Edges are included in the response if and only if they are from or to
-        a node in the response.
+        a node in the response.\n\n
+
+        If page or page_size is given, the nodes are returned a page at a
+        time, ordered by UUID, with the edges that are from or to the page's
+        nodes. The payload then also has "count", "next", and "previous"
+        keys, as other paginated responses do.
 
         ---
 
@@ -480,58 +558,71 @@ class ResourcesList(ListAPIView):
             - name: integration_name
               description: An integration name regex to filter against.
               paramType: query
+            - name: page
+              description: The page number of nodes to return.
+              paramType: query
+            - name: page_size
+              description: The number of nodes per page.
+              paramType: query
 
         """
 
-        # Get the filtering parameters, and gather their mapping information
-        # now.
+        # Translate the filtering parameters into database filters.
         parsed_query_string = parse(request.META["QUERY_STRING"])
-        filters = [(query_filter_map(k), v)
-                   for k, v in parsed_query_string.items()]
-
-        nodes = []
-        node_uuids = []
-
-        # For every node in the resource graph...
-        for node in resource.instances.graph.nodes():
-            # Get this node's matching table row.
-            row = PolyResource.objects.get(uuid=node.uuid)
-
-            # Apply the user's filters to determine if this node should be
-            # included in the response.
-            proceed = True
-            for (filterfn, db_or_node), regex in filters:
-                if db_or_node == "db":
-                    # This filter is against infomration in the table row.
-                    proceed = proceed and filterfn(row, regex)
-                else:
-                    # This filter is against infomration in the graph node.
-                    proceed = proceed and filterfn(node, regex)
-
-            if proceed:
-                # Include this node!
-                nodes.append(
-                    {"resourcetype":
-                     {"unique_id":
-                      node.resourcetype.unique_class_id(),
-                      "label": node.resourcetype().label(),
-                      "resourcetype": node.resourcetype().resourcetype()},
-                     "uuid": node.uuid,
-                     "native_id": row.native_id,
-                     "native_name": row.native_name
-                     })
-
-                node_uuids.append(node.uuid)
-
-        # Gather the edges that are to or from the gathered nodes.
-        edges = \
-            [{"from": str(entry[0]),
-              "to": str(entry[1]),
-              "type": entry[2][TYPE]}
-             for entry in resource.instances.graph.edges_iter(data=True)
-             if entry[0].uuid in node_uuids or entry[1].uuid in node_uuids]
-
-        return Response({"nodes": nodes, "edges": edges})
+        filters = [query_filter_map(k)(v)
+                   for k, v in parsed_query_string.items()
+                   if k not in self.reserved_params and query_filter_map(k)]
+
+        graph = resource.instances.graph
+
+        # Read the matching rows' table information in one query. A node
+        # whose row didn't match, or was deleted since the graph was loaded,
+        # isn't included in the response.
+        rows = _native_names(filters=filters)
+
+        selected = [node for node in graph.nodes_iter() if node.uuid in rows]
+
+        # Page the nodes if the client asked for it.
+        paginate = any(x in request.query_params for x in self.reserved_params)
+
+        if paginate:
+            selected.sort(key=lambda x: x.uuid)
+            selected = self.paginate_queryset(selected)
+
+        nodes = [{"resourcetype":
+                  {"unique_id": node.resourcetype.unique_class_id(),
+                   "label": node.resourcetype().label(),
+                   "resourcetype": node.resourcetype().resourcetype()},
+                  "uuid": node.uuid,
+                  "native_id": rows[node.uuid].native_id,
+                  "native_name": rows[node.uuid].native_name
+                  }
+                 for node in selected]
+
+        # Gather the edges that are to or from the gathered nodes, from their
+        # adjacencies. An edge between two gathered nodes is found as the
+        # source's out-edge.
+        selected_set = set(selected)
+        edges = []
+
+        for node in selected:
+            for source, dest, data in \
+                    chain(graph.out_edges_iter(node, data=True),
+                          (x for x in graph.in_edges_iter(node, data=True)
+                           if x[0] not in selected_set)):
+                edges.append({"from": str(source),
+                              "to": str(dest),
+                              "type": data[TYPE]})
+
+        if not paginate:
+            return Response({"nodes": nodes, "edges": edges})
+
+        return Response(
+            OrderedDict([("count", self.paginator.page.paginator.count),
+                         ("next", self.paginator.get_next_link()),
+                         ("previous", self.paginator.get_previous_link()),
+                         ("nodes", nodes),
+                         ("edges", edges)]))
 
 
 # Our API documentation extracts this docstring.
@@ -624,7 +715,7 @@ class ApiPerfSummarizeView(DateHistogramAggView):
     class Meta:          # pylint: disable=C0111,W0232,C1001
         model = ApiPerfData
 
-    def get(self, request):
+    def _get_response(self, request):
         """Return a response to a GET request."""
 
         search = self._get_search(request)
@@ -632,7 +723,8 @@ class ApiPerfSummarizeView(DateHistogramAggView):
             metric(self.STATS_AGG_NAME, self.Meta.model.stats_agg()). \
             bucket(self.RANGE_AGG_NAME, self.Meta.model.range_agg())
 
-        serializer = self.serializer_class(search.execute().aggregations)
+        serializer = self.serializer_class(
+            rollup_aggregations(self, request, search))
 
         return Response(serializer.data)
 
@@ -676,6 +768,9 @@ class ApiPerfSearchView(ElasticListAPIView):
 
     serializer_class = ApiPerfSerializer
 
+    # The fields that the serializer adds.
+    export_extra_fields = tuple(ApiPerfSerializer.METADATA)
+
     class Meta:     # pylint: disable=C1001,W0232,C0111
         model = ApiPerfData
 
@@ -722,7 +817,7 @@ class EventSummarizeView(DateHistogramAggView):
     class Meta:             # pylint: disable=C1001,W0232,C0111
         model = EventData
 
-    def get(self, request):
+    def _get_response(self, request):
         """Return a response to a GET request."""
         import ast
 
@@ -785,10 +880,21 @@ class EventSearchView(ElasticListAPIView):
              description: The number of results on each page
              type: integer
              paramType: query
+           - name: export
+             description: If ndjson or csv, stream all of the results in that
+                          format instead of returning a page of them
+             paramType: query
 
     """
 
     serializer_class = EventSerializer
 
+    # The fields that the serializer adds.
+    export_extra_fields = \
+        tuple(EventSerializer.METADATA) + \
+        tuple(x + suffix
+              for x in EventSerializer.INSTANCE_GRAPH_IDS
+              for suffix in ("_name", "_type"))
+
     class Meta:     # pylint: disable=C1001,W0232,C0111
         model = EventData
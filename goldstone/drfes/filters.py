@@ -85,7 +85,8 @@ class ElasticFilter(BaseFilterBackend):
 
         reserved_params = view.reserved_params + \
             [view.pagination_class.page_query_param,
-             view.pagination_class.page_size_query_param]
+             view.pagination_class.page_size_query_param,
+             view.pagination_class.cursor_query_param]
 
         for param in request.query_params:
             # We don't want these in our queryset.
@@ -13,8 +13,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+
+from django.conf import settings
+from elasticsearch.exceptions import NotFoundError
 from elasticsearch_dsl import DocType, Search
-from goldstone.models import es_conn, es_indices, daily_index
+from elasticsearch_dsl.connections import connections
+from goldstone.models import es_conn, es_indices, daily_index, \
+    clear_indices_cache
+
+# field_has_raw results, keyed by (model, field). Each value is (result,
+# expiration time, the model's daily index when the result was found).
+_RAW_FIELDS = {}
+_RAW_FIELDS_LOCK = threading.Lock()
+
+
+def clear_field_mapping_cache():
+    """Forget the cached field_has_raw results."""
+
+    with _RAW_FIELDS_LOCK:
+        _RAW_FIELDS.clear()
+
+
+class DailyIndexSearch(Search):
+    """A search of a set of daily indices, some of which may have been
+    deleted since their names were cached.
+
+    Search.count() doesn't pass the search's parameters to Elasticsearch, so
+    this passes the ones that say how to treat missing indices.
+
+    """
+
+    INDEX_PARAMS = ("ignore_unavailable", "allow_no_indices")
+
+    def count(self):
+        """Return the number of hits matching the query and filters."""
+
+        conn = connections.get_connection(self._using)
+        params = dict((k, v) for k, v in self._params.items()
+                      if k in self.INDEX_PARAMS)
+
+        return conn.count(index=self._index,
+                          doc_type=self._doc_type,
+                          body=self.to_dict(count=True),
+                          **params)['count']
 
 
 class DailyIndexDocType(DocType):
@@ -30,13 +72,15 @@ class DailyIndexDocType(DocType):
     def search(cls):
         """Gets a generic Log search object.
 
-        See elasticsearch-dsl for parameter information.
+        See elasticsearch-dsl for parameter information. The index names may
+        be cached, so the search tolerates deleted ones.
+
         """
 
-        return Search(
+        return DailyIndexSearch(
             index=es_indices(cls.INDEX_PREFIX),
             doc_type={cls._doc_type.name: cls.from_es},
-        ).sort(cls.SORT).using(es_conn())
+        ).sort(cls.SORT).using(es_conn()).params(ignore_unavailable=True)
 
     def save(self, using=None, index=None, **kwargs):
         """Posts a record to the database.
@@ -49,6 +93,30 @@ class DailyIndexDocType(DocType):
 
         return super(DailyIndexDocType, self).save(using, index, **kwargs)
 
+    @classmethod
+    def _retry_missing(cls, call, index):
+        """Make a call on the model's daily indices.
+
+        If the caller didn't give an index, the cached index names are used.
+        One of them may have since been deleted, so if the call raises
+        NotFoundError, the names are re-read and it's retried once.
+
+        :param call: Callable(index)
+        :type call: callable
+        :param index: The index the caller asked for, or None
+        :type index: str or list or None
+
+        """
+
+        if index is not None:
+            return call(index)
+
+        try:
+            return call(es_indices(cls.INDEX_PREFIX))
+        except NotFoundError:
+            clear_indices_cache()
+            return call(es_indices(cls.INDEX_PREFIX))
+
     @classmethod
     def get(cls, id, using=None, index=None, **kwargs):
         """Gets a record from the database.
@@ -56,10 +124,12 @@ class DailyIndexDocType(DocType):
         See elasticsearch-dsl for parameter information.
         """
 
-        if index is None:
-            index = es_indices(cls.INDEX_PREFIX)
-
-        return super(DailyIndexDocType, cls).get(id, using, index, **kwargs)
+        return cls._retry_missing(
+            lambda x: super(DailyIndexDocType, cls).get(id,
+                                                        using,
+                                                        x,
+                                                        **kwargs),
+            index)
 
     def delete(self, using=None, index=None, **kwargs):
         """Deletes a record from the database.
@@ -67,10 +137,11 @@ class DailyIndexDocType(DocType):
         See elasticsearch-dsl for parameter information.
         """
 
-        if index is None:
-            index = es_indices(self.INDEX_PREFIX)
-
-        return super(DailyIndexDocType, self).delete(using, index, **kwargs)
+        return self._retry_missing(
+            lambda x: super(DailyIndexDocType, self).delete(using,
+                                                            x,
+                                                            **kwargs),
+            index)
 
     @classmethod
     def bounded_search(cls, start=None, end=None, key_field='@timestamp'):
@@ -190,6 +261,7 @@ class DailyIndexDocType(DocType):
                                               index,
                                               cls._doc_type.name,
                                               include_defaults=True,
+                                              ignore_unavailable=True,
                                               allow_no_indices=False)
 
     @classmethod
@@ -197,15 +269,34 @@ class DailyIndexDocType(DocType):
         """Return True if the Elasticsearch mapping for a field has a 'raw'
         representation.
 
+        The answer is cached until it's settings.ES_FIELD_MAPPING_CACHE_TTL
+        old, or a new daily index appears.
+
         :param field: the field name in ES
         :return: bool
 
         """
+        from datetime import datetime
+
+        now = datetime.now()
+        today = daily_index(cls.INDEX_PREFIX)
+
+        with _RAW_FIELDS_LOCK:
+            cached = _RAW_FIELDS.get((cls, field))
+
+        if cached is not None and now < cached[1] and today == cached[2]:
+            return cached[0]
 
         try:
             mapping = cls.get_field_mapping(field)
-            return 'raw' in \
-                   mapping[mapping.keys()[-1]]['mappings'][cls._doc_type.name][
-                       field]['mapping'][field]['fields']
+            result = 'raw' in \
+                mapping[mapping.keys()[-1]]['mappings'][cls._doc_type.name][
+                    field]['mapping'][field]['fields']
         except KeyError:
-            return False
+            result = False
+
+        with _RAW_FIELDS_LOCK:
+            _RAW_FIELDS[(cls, field)] = \
+                (result, now + settings.ES_FIELD_MAPPING_CACHE_TTL, today)
+
+        return result
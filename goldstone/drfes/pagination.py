@@ -12,16 +12,49 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections import OrderedDict
+
+from django.conf import settings
 from rest_framework import pagination
 from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 import six
 
+# The redis key under which a cursor's scroll id is kept. An ES scroll id can
+# be several kilobytes long, too long for a URL, so the cursor is a short
+# token for it.
+CURSOR_KEY = "goldstone:drfes:cursor:%s"
+
 
 class ElasticPageNumberPagination(pagination.PageNumberPagination):
+    """Page through ES search results.
+
+    A request with a cursor parameter is paged through an ES scroll instead of
+    by page number. Its first page is requested with an empty cursor, and each
+    response's "next" link carries the cursor for the following page. This
+    costs the same for every page regardless of its depth, and doesn't need a
+    separate count query. A scroll can't go backwards, so "previous" is always
+    null. A cursor can be used once, and expires with its scroll.
+
+    """
 
     # Allow the API call to specify a custom page size.
     page_size_query_param = "page_size"
 
+    # The request parameter that selects scroll paging.
+    cursor_query_param = "cursor"
+
+    def __init__(self):
+        """Initialize the object."""
+
+        super(ElasticPageNumberPagination, self).__init__()
+
+        self.count = None
+        self.cursor = None
+        self.page = None
+        self.request = None
+
     def paginate_queryset(self, queryset, request, view=None):
         """Paginate a queryset if required, either returning a page object, or
         `None` if pagination is not configured for this view."""
@@ -34,6 +67,9 @@ class ElasticPageNumberPagination(pagination.PageNumberPagination):
         if not page_size:
             return None
 
+        if self.cursor_query_param in request.query_params:
+            return self._paginate_cursor(queryset, request, page_size)
+
         paginator = DjangoPaginator(queryset, page_size)
         page_number = request.query_params.get(self.page_query_param, 1)
         if page_number in self.last_page_strings:
@@ -55,3 +91,125 @@ class ElasticPageNumberPagination(pagination.PageNumberPagination):
 
         self.request = request
         return list(self.page)
+
+    @staticmethod
+    def _take_scroll_id(cursor):
+        """Return a cursor's scroll id, and forget the cursor.
+
+        :param cursor: A cursor token
+        :type cursor: str
+        :return: The scroll id, or None if the cursor is unknown or expired
+        :rtype: str or None
+
+        """
+        from goldstone.models import RedisConnection
+
+        conn = RedisConnection().conn
+        pipeline = conn.pipeline()
+        pipeline.get(CURSOR_KEY % cursor)
+        pipeline.delete(CURSOR_KEY % cursor)
+
+        return pipeline.execute()[0]
+
+    @staticmethod
+    def _new_cursor(scroll_id):
+        """Return a new cursor token for a scroll id.
+
+        :param scroll_id: An ES scroll id
+        :type scroll_id: str
+        :rtype: str
+
+        """
+        from uuid import uuid4
+        from goldstone.drfes.utils import interval_seconds
+        from goldstone.models import RedisConnection
+
+        result = uuid4().hex
+        RedisConnection().conn.setex(
+            CURSOR_KEY % result,
+            int(interval_seconds(settings.ES_SCROLL_TIMEOUT)),
+            scroll_id)
+
+        return result
+
+    def _paginate_cursor(self, queryset, request, page_size):
+        """Return one page of a scroll through the queryset.
+
+        :param queryset: The search
+        :type queryset: Search
+        :param request: The HTTP request
+        :type request: Request
+        :param page_size: The number of results per page
+        :type page_size: int
+        :rtype: list
+
+        """
+        from elasticsearch.exceptions import NotFoundError
+        from elasticsearch_dsl.connections import connections
+        from elasticsearch_dsl.result import Response as ESResponse
+
+        EXPIRED = "Invalid cursor, or the cursor has expired."
+
+        cursor = request.query_params[self.cursor_query_param]
+
+        # pylint: disable=W0212
+        conn = connections.get_connection(queryset._using)
+
+        try:
+            if cursor:
+                scroll_id = self._take_scroll_id(cursor)
+
+                if scroll_id is None:
+                    raise NotFound(EXPIRED)
+
+                response = ESResponse(
+                    conn.scroll(scroll_id=scroll_id,
+                                scroll=settings.ES_SCROLL_TIMEOUT),
+                    callbacks=queryset._doc_type_map)
+            else:
+                response = queryset[:page_size] \
+                    .params(scroll=settings.ES_SCROLL_TIMEOUT) \
+                    .execute()
+        except NotFoundError:
+            raise NotFound(EXPIRED)
+
+        results = list(response)
+
+        self.page = None
+        self.count = response.hits.total
+        self.cursor = None
+        self.request = request
+
+        # Keep the scroll for the next page, or release it if this was the
+        # last one.
+        if len(results) >= page_size:
+            self.cursor = self._new_cursor(response._scroll_id)
+        else:
+            conn.clear_scroll(scroll_id=response._scroll_id, ignore=404)
+
+        return results
+
+    def get_paginated_response(self, data):
+        """Return a paginated response for the page's serialized data."""
+
+        if self.page is not None:
+            return super(ElasticPageNumberPagination,
+                         self).get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_cursor_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+    def get_next_cursor_link(self):
+        """Return the link to the next page of a scroll, or None if this is the
+        last page."""
+
+        if self.cursor is None:
+            return None
+
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.cursor)
@@ -15,20 +15,19 @@
 from django.http import QueryDict
 import elasticsearch
 from elasticsearch.client import IndicesClient
-
-from rest_framework.test import APITestCase
-
 from elasticsearch_dsl import Search
 from elasticsearch_dsl.result import Response
-from goldstone.drfes.models import DailyIndexDocType
+from mock import MagicMock, patch
+from rest_framework.test import APITestCase
+
+from goldstone.drfes.models import DailyIndexDocType, \
+    clear_field_mapping_cache
 from goldstone.drfes.utils import custom_exception_handler
 
 from goldstone.drfes.views import ElasticListAPIView
 from goldstone.drfes.filters import ElasticFilter
 from goldstone.drfes.serializers import ReadOnlyElasticSerializer
 
-from mock import MagicMock, patch
-
 
 def dummy_response():
     """Return a document for an Elasticsearch DSL Response object"""
@@ -246,6 +245,217 @@ class ViewTests(APITestCase):
 
         self.assertEqual(view.get_queryset(), expectation)
 
+    @staticmethod
+    def _mappings(*fields):
+        """Return a get_mapping response, with an index per list of fields."""
+
+        return dict(("index%d" % i,
+                     {"mappings":
+                      {"Solinea":
+                       {"properties": dict((x, {"type": "string"})
+                                           for x in index)}}})
+                    for i, index in enumerate(fields))
+
+    @patch('elasticsearch.helpers.scan')
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    def test_export(self, get_connection, scan):
+        """Exports stream each result as NDJSON or CSV."""
+        from rest_framework.exceptions import ValidationError
+
+        get_connection.return_value.indices.get_mapping.return_value = \
+            self._mappings(["include", "exclude"])
+
+        hit = dummy_response()["hits"]["hits"][0]
+        other = dict(hit, _source={"include": u"caf\xe9",
+                                   "exclude": {"nested": 1}})
+        scan.side_effect = lambda *_, **__: iter([hit, other])
+
+        view = ElasticListAPIView()
+        view.request = None
+        view.format_kwarg = None
+        search = Search().sort("-@timestamp")
+
+        response = view._export(search, "ndjson")   # pylint: disable=W0212
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = "".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"the good stuff"', lines[0])
+
+        # The search's sort order is kept.
+        self.assertTrue(scan.call_args[1]["preserve_order"])
+        self.assertEqual(scan.call_args[1]["query"]["sort"],
+                         [{"@timestamp": {"order": "desc"}}])
+
+        response = view._export(search, "csv")      # pylint: disable=W0212
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            "".join(response.streaming_content).splitlines(),
+            ["exclude,include",
+             "the bad stuff,the good stuff",
+             '"{""nested"": 1}",caf\xc3\xa9'])
+
+        with self.assertRaises(ValidationError):
+            view._export(search, "xml")             # pylint: disable=W0212
+
+    @patch('elasticsearch.helpers.scan')
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    def test_export_mixed(self, get_connection, scan):
+        """A CSV export has a column for every mapped field, whichever
+        document has it."""
+
+        # The serializer excludes "secret", and the view adds "extra".
+        class Serializer(ReadOnlyElasticSerializer):  # pylint: disable=W0223
+            """Exclude a field."""
+
+            class Meta:    # pylint: disable=C0111,C1001,W0232
+                exclude = ("secret", )
+
+        get_connection.return_value.indices.get_mapping.return_value = \
+            self._mappings(["a", "secret"], ["b", "c"])
+
+        hits = [{"_type": "Solinea", "_source": source}
+                for source in [{"a": 1, "secret": 2},
+                               {"b": 3, "c": 4},
+                               {"a": 5, "unmapped": 6}]]
+        scan.side_effect = lambda *_, **__: iter(hits)
+
+        view = ElasticListAPIView()
+        view.request = None
+        view.format_kwarg = None
+        view.serializer_class = Serializer
+        view.export_extra_fields = ("extra", )
+
+        with patch("goldstone.drfes.views.logger") as logger:
+            response = view._export(Search(), "csv")  # pylint: disable=W0212
+            self.assertEqual(
+                "".join(response.streaming_content).splitlines(),
+                ["a,b,c,extra",
+                 "1,,,",
+                 ",3,4,",
+                 "5,,,"])
+            self.assertIn("unmapped", logger.warning.call_args[0][1])
+
+        # Declared columns are used as they are.
+        view.export_fields = ["c", "a"]
+        response = view._export(Search(), "csv")      # pylint: disable=W0212
+        self.assertEqual(
+            "".join(response.streaming_content).splitlines(),
+            ["c,a", ",1", "4,", ",5"])
+
+
+class PaginationTests(APITestCase):
+    """Pagination tests."""
+
+    @staticmethod
+    def _request(query):
+        """Return a DRF request for a query string."""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        return Request(APIRequestFactory().get("/search/?" + query))
+
+    @staticmethod
+    def _cursor_store(redis):
+        """Back a mock RedisConnection with a dict, and return the dict.
+
+        Taking a cursor pipelines a get and a delete.
+
+        """
+
+        result = {}
+        taken = []
+
+        conn = redis.return_value.conn
+        conn.setex.side_effect = \
+            lambda key, lifetime, value: result.__setitem__(key, value)
+
+        pipeline = conn.pipeline.return_value
+        pipeline.get.side_effect = taken.append
+        pipeline.execute.side_effect = \
+            lambda: [result.pop(taken.pop(), None), 1]
+
+        return result
+
+    @patch("goldstone.models.RedisConnection")
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    def test_cursor(self, get_connection, redis):
+        """A cursor request pages through a scroll, without a count query."""
+        from urlparse import parse_qs, urlparse
+        from goldstone.drfes.pagination import ElasticPageNumberPagination, \
+            CURSOR_KEY
+
+        store = self._cursor_store(redis)
+
+        response = dummy_response()
+        response["_scroll_id"] = "scroll1" * 1000
+        conn = get_connection.return_value
+        conn.search.return_value = response
+
+        paginator = ElasticPageNumberPagination()
+        page = paginator.paginate_queryset(
+            Search(), self._request("cursor=&page_size=1&page=3"))
+
+        self.assertEqual(len(page), 1)
+        self.assertEqual(conn.search.call_args[1]["body"]["size"], 1)
+        self.assertIn("scroll", conn.search.call_args[1])
+        self.assertFalse(conn.count.called)
+
+        result = paginator.get_paginated_response([]).data
+        self.assertEqual(result["count"], 123)
+        self.assertIsNone(result["previous"])
+        self.assertNotIn("page=", result["next"])
+
+        # The next link carries a short token for the scroll id.
+        cursor = parse_qs(urlparse(result["next"]).query)["cursor"][0]
+        self.assertLess(len(cursor), 64)
+        self.assertEqual(store, {CURSOR_KEY % cursor: "scroll1" * 1000})
+
+        # The next page comes from the scroll, and is the last one.
+        response = dummy_response()
+        response["_scroll_id"] = "scroll2"
+        response["hits"]["hits"] = []
+        conn.scroll.return_value = response
+
+        page = paginator.paginate_queryset(
+            Search(), self._request("cursor=%s&page_size=1" % cursor))
+
+        self.assertEqual(page, [])
+        self.assertEqual(conn.scroll.call_args[1]["scroll_id"],
+                         "scroll1" * 1000)
+        self.assertIsNone(paginator.get_paginated_response([]).data["next"])
+
+        # The last page's scroll is released, and the cursor can't be reused.
+        conn.clear_scroll.assert_called_once_with(scroll_id="scroll2",
+                                                  ignore=404)
+        self.assertEqual(store, {})
+
+    @patch("goldstone.models.RedisConnection")
+    @patch('elasticsearch_dsl.connections.connections.get_connection')
+    def test_cursor_expired(self, get_connection, redis):
+        """An unknown cursor is reported as not found."""
+        from elasticsearch.exceptions import NotFoundError
+        from goldstone.drfes.pagination import ElasticPageNumberPagination
+        from rest_framework.exceptions import NotFound
+
+        # The token is unknown.
+        pipeline = redis.return_value.conn.pipeline.return_value
+        pipeline.execute.return_value = [None, 0]
+
+        with self.assertRaises(NotFound):
+            ElasticPageNumberPagination().paginate_queryset(
+                Search(), self._request("cursor=gone"))
+
+        self.assertFalse(get_connection.return_value.scroll.called)
+
+        # The scroll has expired.
+        pipeline.execute.return_value = ["scroll1", 1]
+        get_connection.return_value.scroll.side_effect = \
+            NotFoundError(404, "SearchContextMissingException")
+
+        with self.assertRaises(NotFound):
+            ElasticPageNumberPagination().paginate_queryset(
+                Search(), self._request("cursor=gone"))
+
 
 class CustomExceptionHandlerTests(APITestCase):
     """Tests for DRF custom exception handling."""
@@ -314,6 +524,13 @@ class CustomExceptionHandlerTests(APITestCase):
 class DailyIndexDocTypeTests(APITestCase):
     """Tests for the LogData model"""
 
+    def setUp(self):
+        """Run before every test."""
+
+        clear_field_mapping_cache()
+
+    tearDown = setUp
+
     def test_field_has_raw_true(self):
         """field_has_raw returns True if mapping has a raw field."""
 
@@ -344,6 +561,39 @@ class DailyIndexDocTypeTests(APITestCase):
             self.assertTrue(gfm.called)
             self.assertFalse(result)
 
+    def test_field_has_raw_cached(self):
+        """field_has_raw caches its answer until it expires, or a new daily
+        index appears."""
+        from datetime import timedelta
+
+        with patch.object(DailyIndexDocType, "get_field_mapping") as gfm:
+
+            field = 'field'
+            gfm.return_value = {'index': {'mappings': {
+                'syslog': {field: {'mapping': {field: {'fields': {
+                    'raw': True}}}}}}}}
+
+            self.assertTrue(DailyIndexDocType.field_has_raw(field))
+            self.assertTrue(DailyIndexDocType.field_has_raw(field))
+            self.assertEqual(gfm.call_count, 1)
+
+            # Another field is looked up separately.
+            DailyIndexDocType.field_has_raw('other')
+            self.assertEqual(gfm.call_count, 2)
+
+            # A new daily index appears.
+            with patch("goldstone.drfes.models.daily_index") as d_i:
+                d_i.return_value = "logstash-tomorrow"
+                DailyIndexDocType.field_has_raw(field)
+                self.assertEqual(gfm.call_count, 3)
+
+            # The cached answer expires.
+            with self.settings(ES_FIELD_MAPPING_CACHE_TTL=timedelta(0)):
+                clear_field_mapping_cache()
+                DailyIndexDocType.field_has_raw(field)
+                DailyIndexDocType.field_has_raw(field)
+                self.assertEqual(gfm.call_count, 5)
+
     def test_field_has_raw_key_error(self):
         """field_has_raw returns False if KeyError raised."""
 
@@ -364,3 +614,146 @@ class DailyIndexDocTypeTests(APITestCase):
             gfm.return_value = 'pass me through'
             result = DailyIndexDocType.get_field_mapping('field')
             self.assertEqual(result, 'pass me through')
+            self.assertTrue(gfm.call_args[1]["ignore_unavailable"])
+
+    @patch("goldstone.drfes.models.es_indices")
+    def test_count(self, es_indices):
+        """A search's count tolerates deleted indices."""
+
+        es_indices.return_value = ["logstash-1", "logstash-2"]
+
+        with patch.object(elasticsearch.Elasticsearch, "count") as count:
+            count.return_value = {"count": 5}
+
+            self.assertEqual(DailyIndexDocType.search().count(), 5)
+            self.assertEqual(count.call_args[1]["index"],
+                             ["logstash-1", "logstash-2"])
+            self.assertTrue(count.call_args[1]["ignore_unavailable"])
+
+    @patch("goldstone.drfes.models.clear_indices_cache")
+    @patch("goldstone.drfes.models.es_indices")
+    def test_get_missing_index(self, es_indices, clear_indices_cache):
+        """A get is retried with fresh index names if an index is missing."""
+
+        es_indices.side_effect = [["logstash-1", "logstash-2"],
+                                  ["logstash-2"]]
+
+        with patch.object(elasticsearch.Elasticsearch, "get") as get:
+            get.side_effect = [elasticsearch.NotFoundError(404, "missing"),
+                               {"_id": "1", "_source": {"a": 1}}]
+
+            self.assertEqual(DailyIndexDocType.get("1").a, 1)
+            self.assertTrue(clear_indices_cache.called)
+            self.assertEqual(get.call_args[1]["index"], ["logstash-2"])
+
+            # An explicit index isn't retried.
+            get.side_effect = [elasticsearch.NotFoundError(404, "missing")]
+            with self.assertRaises(elasticsearch.NotFoundError):
+                DailyIndexDocType.get("1", index="logstash-1")
+            self.assertEqual(get.call_count, 3)
+
+
+class AggregationCacheTests(APITestCase):
+    """Aggregation response cache tests."""
+
+    @staticmethod
+    def _request(query):
+        """Return a DRF request for a query string."""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        return Request(APIRequestFactory().get("/summarize/?" + query))
+
+    def test_entry(self):
+        """Ranges are aligned, and closed ranges live longer."""
+        import time
+        from goldstone.drfes.utils import _agg_cache_entry
+
+        view = ElasticListAPIView()
+        now = int(time.time()) * 1000
+        start = now - 3600 * 1000
+
+        def entry(low, high, interval="10s"):
+            """Return the cache entry for a range query."""
+
+            return _agg_cache_entry(
+                view,
+                self._request("interval=%s&@timestamp__range={'gte':%d,"
+                              "'lte':%d}" % (interval, low, high)))
+
+        # Ranges in the same 10 second granule share a key, and live for the
+        # interval.
+        key, lifetime = entry(start - start % 10000, now - now % 10000 + 1)
+        self.assertEqual(lifetime, 10)
+        self.assertEqual(
+            entry(start - start % 10000 + 9999, now - now % 10000 + 9999),
+            (key, 10))
+        self.assertNotEqual(entry(start - 10000, now)[0], key)
+
+        # The granularity is capped.
+        self.assertEqual(entry(start, now, "1d")[1], 60)
+
+        # A range that ended a while ago lives longer.
+        self.assertEqual(entry(start - 3600000, now - 3600000)[1], 3600)
+
+    @patch('goldstone.models.RedisConnection')
+    def test_cached(self, redis_connection):
+        """A response is computed once, and then served from the cache."""
+        from rest_framework.response import Response as DRFResponse
+        from goldstone.drfes.utils import cached_aggregation
+
+        store = {}
+        conn = redis_connection.return_value.conn
+        conn.get.side_effect = store.get
+        conn.setex.side_effect = \
+            lambda key, _, value: store.update({key: value})
+
+        calls = []
+
+        class View(ElasticListAPIView):
+            """A view whose get method counts its calls."""
+
+            @cached_aggregation
+            def get(self, request):
+                calls.append(request)
+                return DRFResponse({"buckets": [1, 2]})
+
+        with self.settings(AGG_CACHE_ENABLED=True):
+            for _ in range(2):
+                response = View().get(self._request("interval=1m"))
+                self.assertEqual(response.data, {"buckets": [1, 2]})
+
+            self.assertEqual(len(calls), 1)
+
+            View().get(self._request("interval=5m"))
+            self.assertEqual(len(calls), 2)
+
+    @patch('goldstone.models.RedisConnection')
+    def test_subclass(self, redis_connection):
+        """A DateHistogramAggView subclass's responses are cached by the base
+        class's get."""
+        from rest_framework.response import Response as DRFResponse
+        from goldstone.drfes.views import DateHistogramAggView
+
+        store = {}
+        conn = redis_connection.return_value.conn
+        conn.get.side_effect = store.get
+        conn.setex.side_effect = \
+            lambda key, _, value: store.update({key: value})
+
+        calls = []
+
+        class View(DateHistogramAggView):
+            """A view that counts its computed responses."""
+
+            def _get_response(self, request):
+                calls.append(request)
+                return DRFResponse({"buckets": [1, 2]})
+
+        with self.settings(AGG_CACHE_ENABLED=True):
+            for _ in range(2):
+                response = View().get(self._request("interval=1m"))
+                self.assertEqual(response.data, {"buckets": [1, 2]})
+
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(conn.get.call_count, 2)
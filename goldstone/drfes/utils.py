@@ -13,11 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from functools import wraps
+import json
+import logging
+
+from django.conf import settings
 import elasticsearch
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
+logger = logging.getLogger(__name__)
+
+# The redis key under which an aggregation response is cached. It's formatted
+# with the view's name and the normalized query.
+AGG_CACHE_KEY = "goldstone:drfes:agg:%s:%s"
+
+# The number of seconds in each interval unit.
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
 
 def custom_exception_handler(exc, context):
     """An example handler for custom exceptions that aren't taken care of by
@@ -93,3 +107,160 @@ def es_custom_exception_handler(exc):
         data['detail'] = "An ES exception has occurred that's we're not " \
                          "familiar with."
         return Response(data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def interval_seconds(interval):
+    """Return the length of an aggregation interval, e.g., "5m", in seconds,
+    or None if it's malformed."""
+
+    try:
+        return float(interval[:-1]) * INTERVAL_UNITS[interval[-1]]
+    except (TypeError, ValueError, KeyError, IndexError):
+        return None
+
+
+def _align_range(value, step, granularity):
+    """Return a range query parameter's value with its epoch bounds aligned to
+    a step, and whether its range ended more than a granularity ago.
+
+    :param value: The parameter's value, e.g., "{'gte': 1430164651890}"
+    :type value: str
+    :param step: The alignment, in milliseconds
+    :type step: int
+    :param granularity: The alignment, in seconds
+    :type granularity: float
+    :return: The aligned bounds, or the value if it isn't a literal
+    :rtype: tuple of (dict or str, bool)
+
+    """
+    import ast
+    import math
+    import time
+
+    try:
+        bounds = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value, False
+
+    closed = False
+
+    if isinstance(bounds, dict):
+        for relation, bound in bounds.items():
+            if not isinstance(bound, (int, long, float)):
+                continue
+
+            upper = relation in ("lt", "lte")
+            rounding = math.ceil if upper else math.floor
+            bounds[relation] = int(rounding(float(bound) / step))
+
+            if upper and bounds[relation] * step < \
+                    (time.time() - granularity) * 1000:
+                closed = True
+
+    return bounds, closed
+
+
+def _agg_cache_entry(view, request):
+    """Return the cache key and lifetime for an aggregation request.
+
+    Every time range bound in the query is aligned to a granularity that's
+    the request's interval, or settings.AGG_CACHE_MAX_TTL if that's shorter.
+    So, requests whose ranges differ by less than the granularity, e.g., a
+    dashboard's successive refreshes, share an entry. An entry whose range
+    ended more than a granularity ago has only closed intervals, so it lives
+    for settings.AGG_CACHE_CLOSED_TTL. Otherwise it includes the live
+    interval, and lives for the granularity.
+
+    :param view: The view
+    :type view: APIView
+    :param request: The HTTP request
+    :type request: Request
+    :return: The key, and the lifetime in seconds
+    :rtype: tuple
+
+    """
+
+    live = settings.AGG_CACHE_MAX_TTL.total_seconds()
+    granularity = \
+        min(interval_seconds(request.query_params.get('interval')) or live,
+            live)
+    step = int(granularity * 1000)        # Range bounds are epoch millis.
+    closed = False
+
+    query = []
+
+    for param, values in sorted(request.query_params.lists()):
+        if param.endswith("__range"):
+            aligned = [_align_range(x, step, granularity) for x in values]
+            values = [x[0] for x in aligned]
+            closed = closed or any(x[1] for x in aligned)
+
+        query.append((param, values))
+
+    key = AGG_CACHE_KEY % ("%s.%s" % (view.__module__,
+                                      view.__class__.__name__),
+                           json.dumps([step, query], sort_keys=True))
+    lifetime = settings.AGG_CACHE_CLOSED_TTL.total_seconds() if closed \
+        else granularity
+
+    return key, max(int(lifetime), 1)
+
+
+def cached_aggregation(get):
+    """Decorate an aggregation view's get method so that its responses are
+    shared through redis.
+
+    Many users, and each one's dashboard refreshes, request the same
+    aggregations. See _agg_cache_entry for how requests are matched, and how
+    long a response is reused. Only successful responses are cached. If redis
+    is unavailable, every request is computed.
+
+    Whole responses are cached, rather than closed buckets and the live one.
+    These views' responses include range-wide aggregations, e.g., units and
+    per_type terms, which can't be rebuilt exactly from per-bucket pieces.
+    Instead, the metric, API performance and log views read their closed
+    buckets from rollups (see goldstone.core.rollup), so only a range's ends
+    are aggregated from the raw documents.
+
+    Decorate a view class's get method once. DateHistogramAggView's get is
+    decorated, so its subclasses override _get_response instead.
+
+    """
+
+    @wraps(get)
+    def wrapper(self, request, *args, **kwargs):
+        """Return the cached response, or compute and cache it."""
+        from redis import RedisError
+        from goldstone.models import RedisConnection
+        from rest_framework.utils.encoders import JSONEncoder
+
+        if not settings.AGG_CACHE_ENABLED:
+            return get(self, request, *args, **kwargs)
+
+        key, lifetime = _agg_cache_entry(self, request)
+
+        try:
+            conn = RedisConnection().conn
+            cached = conn.get(key)
+        except RedisError:
+            logger.warning("Couldn't read the aggregation cache",
+                           exc_info=True)
+            return get(self, request, *args, **kwargs)
+
+        if cached is not None:
+            return Response(json.loads(cached))
+
+        response = get(self, request, *args, **kwargs)
+
+        if response.status_code == status.HTTP_200_OK:
+            try:
+                conn.setex(key,
+                           lifetime,
+                           json.dumps(response.data, cls=JSONEncoder))
+            except RedisError:
+                logger.warning("Couldn't write the aggregation cache",
+                               exc_info=True)
+
+        return response
+
+    return wrapper
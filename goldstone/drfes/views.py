@@ -13,23 +13,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import ast
+import logging
+
+from django.conf import settings
 from rest_framework.exceptions import ValidationError
 
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
 from goldstone.drfes.filters import ElasticFilter
 from goldstone.drfes.pagination import ElasticPageNumberPagination
+from goldstone.drfes.utils import cached_aggregation
 from goldstone.drfes.serializers import ReadOnlyElasticSerializer, \
     SimpleAggSerializer, DateHistogramAggSerializer
 
+logger = logging.getLogger(__name__)
+
 
 class ElasticListAPIView(ListAPIView):
-    """A view that handles requests for ES search results."""
+    """A view that handles requests for ES search results.
+
+    A request with export=ndjson or export=csv streams every matching result
+    in that format, instead of returning a page of them.
+
+    """
 
     serializer_class = ReadOnlyElasticSerializer
     pagination_class = ElasticPageNumberPagination
     filter_backends = (ElasticFilter, )
-    reserved_params = ['page_size', 'page']
+    reserved_params = ['page_size', 'page', 'cursor', 'export']
+
+    # The CSV export's columns. If None, they're every top-level field in the
+    # searched indices' mappings, less the serializer's exclusions, plus
+    # export_extra_fields.
+    export_fields = None
+
+    # The fields that the serializer adds to a document's fields.
+    export_extra_fields = ()
 
     class Meta:            # pylint: disable=C0111,C1001,W0232
         model = None
@@ -48,6 +67,11 @@ class ElasticListAPIView(ListAPIView):
         """Return a response to a GET request."""
 
         queryset = self.filter_queryset(self.get_queryset())
+
+        export = request.query_params.get('export')
+        if export is not None:
+            return self._export(queryset, export)
+
         page = self.paginate_queryset(queryset)
 
         if page is not None:
@@ -57,6 +81,155 @@ class ElasticListAPIView(ListAPIView):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    def _scan(self, queryset):
+        """Yield every result of a search, in the search's sort order.
+
+        The results are fetched through an ES scroll, in batches of
+        settings.ES_EXPORT_BATCH_SIZE.
+
+        :param queryset: The search
+        :type queryset: Search
+        :return: The serialized results
+        :rtype: generator of dict
+
+        """
+        from elasticsearch.helpers import scan
+        from elasticsearch_dsl.connections import connections
+        from elasticsearch_dsl.result import Result
+
+        # pylint: disable=W0212
+        hits = scan(connections.get_connection(queryset._using),
+                    query=queryset.to_dict(),
+                    scroll=settings.ES_SCROLL_TIMEOUT,
+                    preserve_order=True,
+                    index=queryset._index,
+                    doc_type=queryset._doc_type,
+                    size=settings.ES_EXPORT_BATCH_SIZE,
+                    **queryset._params)
+
+        for hit in hits:
+            result = queryset._doc_type_map.get(hit['_type'], Result)(hit)
+            yield self.get_serializer(result).data
+
+    def _export(self, queryset, export):
+        """Return a response that streams every result of a search.
+
+        :param queryset: The search
+        :type queryset: Search
+        :param export: The format, "ndjson" or "csv"
+        :type export: str
+        :rtype: StreamingHttpResponse
+
+        """
+        from django.http import StreamingHttpResponse
+
+        if export == "ndjson":
+            rows = self._ndjson_rows(self._scan(queryset))
+            content_type = "application/x-ndjson"
+        elif export == "csv":
+            rows = self._csv_rows(self._csv_fields(queryset),
+                                  self._scan(queryset))
+            content_type = "text/csv"
+        else:
+            raise ValidationError("Parameter 'export' must be 'ndjson' or "
+                                  "'csv'.")
+
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response["Content-Disposition"] = \
+            'attachment; filename="export.%s"' % export
+        return response
+
+    @staticmethod
+    def _ndjson_rows(results):
+        """Yield each result as a line of JSON."""
+        import json
+        from rest_framework.utils.encoders import JSONEncoder
+
+        for result in results:
+            yield json.dumps(result, cls=JSONEncoder) + "\n"
+
+    def _csv_fields(self, queryset):
+        """Return the CSV export's columns for a search.
+
+        Documents of one type can have different fields, so unless the view
+        declares its columns, they're taken from the mappings rather than from
+        any one result.
+
+        :param queryset: The search
+        :type queryset: Search
+        :rtype: list of str
+
+        """
+        from elasticsearch_dsl.connections import connections
+
+        if self.export_fields is not None:
+            return list(self.export_fields)
+
+        # pylint: disable=W0212
+        conn = connections.get_connection(queryset._using)
+        mappings = conn.indices.get_mapping(
+            index=queryset._index,
+            doc_type=",".join(x for x in queryset._doc_type if x) or None,
+            ignore_unavailable=True,
+            allow_no_indices=True)
+
+        fields = set(self.export_extra_fields)
+        for index in mappings.values():
+            for mapping in index["mappings"].values():
+                fields.update(mapping.get("properties", {}))
+
+        return sorted(fields - set(self.get_serializer_class().Meta.exclude))
+
+    @staticmethod
+    def _csv_rows(fields, results):
+        """Yield a CSV header line, and then each result as a CSV line.
+
+        Values that aren't strings or numbers are written as JSON. Fields that
+        aren't columns are dropped, and logged.
+
+        :param fields: The columns
+        :type fields: list of str
+        :param results: The serialized results
+        :type results: iterable of dict
+
+        """
+        import csv
+        import json
+        from cStringIO import StringIO
+        from rest_framework.utils.encoders import JSONEncoder
+
+        def encode(value):
+            """Return a value as a CSV writer wants it."""
+
+            if isinstance(value, unicode):
+                return value.encode("utf-8")
+            elif value is None or isinstance(value, (str, int, long, float)):
+                return value
+            else:
+                return json.dumps(value, cls=JSONEncoder)
+
+        buf = StringIO()
+        writer = csv.DictWriter(buf, fields, extrasaction="ignore")
+        columns = set(fields)
+        dropped = set()
+
+        writer.writeheader()
+
+        for result in results:
+            # Yield each line as it's written, so memory use stays flat.
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+            dropped.update(x for x in result if x not in columns)
+            writer.writerow({k: encode(v) for k, v in result.items()})
+
+        yield buf.getvalue()
+
+        if dropped:
+            logger.warning("The CSV export dropped these fields: %s",
+                           ", ".join(sorted(dropped)))
+
 
 class SimpleAggView(ElasticListAPIView):
     """A view that handles requests for terms aggregations.
@@ -110,9 +283,20 @@ class DateHistogramAggView(ElasticListAPIView):
     class Meta:              # pylint: disable=C0111,C1001,W0232
         model = None
 
+    @cached_aggregation
     def get(self, request):
         """Handle get request."""
 
+        return self._get_response(request)
+
+    def _get_response(self, request):
+        """Return the response to a get request.
+
+        Subclasses override this instead of get, so that their responses are
+        cached.
+
+        """
+
         search = self._get_search(request)
         serializer = self.serializer_class(search.execute().aggregations)
         return Response(serializer.data)
@@ -14,17 +14,43 @@
 # limitations under the License.
 
 
-def update_nodes():
-    """Update the Resource graph's Glance nodes and edges from the current
-    OpenStack cloud state.
+def node_types():
+    """Return the Glance resource types, in the order in which their nodes are
+    updated.
+
+    :rtype: list of PolyResource subclass
+
+    """
+    from goldstone.core.models import Image
+
+    return [Image]
+
+
+def update_nodes(clouddata=None):
+    """Update the Resource graph's Glance nodes from the current OpenStack
+    cloud state.
 
     Glance nodes are:
        - deleted if they are no longer in the OpenStack cloud.
        - added if they are in the OpenStack cloud, but not in the graph.
        - updated from the cloud if they are already in the graph.
 
+    :param clouddata: The resource types' clouddata() results, if they've
+                      already been collected. Types that are missing are
+                      queried here.
+    :type clouddata: dict of PolyResource subclass -> list, or None
+    :return: The uuids of the nodes that were deleted, added, or changed
+    :rtype: set of str
+
     """
-    from goldstone.core.models import Image
     from goldstone.core.utils import process_resource_type
 
-    process_resource_type(Image)
+    if clouddata is None:
+        clouddata = {}
+
+    changed = set()
+
+    for nodetype in node_types():
+        changed |= process_resource_type(nodetype, clouddata.get(nodetype))
+
+    return changed
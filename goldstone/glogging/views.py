@@ -12,11 +12,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from rest_framework.response import Response
+
+from goldstone.core.rollup import rollup_log_aggregations
+from goldstone.drfes.utils import cached_aggregation
 from goldstone.drfes.views import ElasticListAPIView
 from goldstone.glogging.models import LogData
 from goldstone.glogging.serializers import LogDataSerializer, \
     LogAggSerializer
-from rest_framework.response import Response
 
 
 class LogDataView(ElasticListAPIView):
@@ -40,6 +43,10 @@ class LogDataView(ElasticListAPIView):
              description: A regular expression for which to search.  This is
                           lowercased before its use
              paramType: query
+           - name: export
+             description: If ndjson or csv, stream all of the results in that
+                          format instead of returning a page of them
+             paramType: query
 
     """
 
@@ -79,6 +86,7 @@ class LogAggView(ElasticListAPIView):
         """Meta"""
         model = LogData
 
+    @cached_aggregation
     def get(self, request, *args, **kwargs):
         """Return a response to a GET request."""
         import ast
@@ -88,7 +96,8 @@ class LogAggView(ElasticListAPIView):
         per_host = ast.literal_eval(
             self.request.query_params.get('per_host', 'True'))
 
-        data = LogData.ranged_log_agg(base_queryset, interval, per_host)
+        data = rollup_log_aggregations(self, request, base_queryset,
+                                       interval, per_host)
         serializer = self.serializer_class(data)
 
         return Response(serializer.data)
@@ -15,12 +15,13 @@
 from __future__ import absolute_import
 
 from goldstone.celery import app as celery_app
+from goldstone.models import BulkWriter
 import logging
 from .models import EndpointsData, RolesData, ServicesData, \
     TenantsData, UsersData
 
 
-def _update_keystone_records(rec_type, region, database, items):
+def _update_keystone_records(rec_type, region, database, items, writer=None):
     from goldstone.utils import to_es_date
     import arrow
 
@@ -29,7 +30,7 @@ def _update_keystone_records(rec_type, region, database, items):
             "region": region,
             rec_type: [item.to_dict() for item in items]}
     try:
-        database.post(body)
+        database.post(body, writer=writer)
     except Exception:           # pylint: disable=W0703
         logging.exception("failed to index keystone %s", rec_type)
 
@@ -44,17 +45,24 @@ def discover_keystone_topology():
     client = access['client']
     reg = get_region_for_keystone_client(client)
 
-    _update_keystone_records("endpoints",
-                             reg,
-                             EndpointsData(),
-                             client.endpoints.list())
-    _update_keystone_records("roles", reg, RolesData(), client.roles.list())
-    _update_keystone_records("services",
-                             reg,
-                             ServicesData(),
-                             client.services.list())
-    _update_keystone_records("tenants",
-                             reg,
-                             TenantsData(),
-                             client.projects.list())
-    _update_keystone_records("users", reg, UsersData(), client.users.list())
+    with BulkWriter() as writer:
+        _update_keystone_records("endpoints",
+                                 reg,
+                                 EndpointsData(),
+                                 client.endpoints.list(), writer)
+        _update_keystone_records("roles",
+                                 reg,
+                                 RolesData(),
+                                 client.roles.list(), writer)
+        _update_keystone_records("services",
+                                 reg,
+                                 ServicesData(),
+                                 client.services.list(), writer)
+        _update_keystone_records("tenants",
+                                 reg,
+                                 TenantsData(),
+                                 client.projects.list(), writer)
+        _update_keystone_records("users",
+                                 reg,
+                                 UsersData(),
+                                 client.users.list(), writer)
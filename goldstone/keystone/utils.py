@@ -14,20 +14,44 @@
 # limitations under the License.
 
 
-def update_nodes():
-    """Update the Resource graph's Keystone nodes and edges from the current
-    OpenStack cloud state.
+def node_types():
+    """Return the Keystone resource types, in the order in which their nodes are
+    updated.
+
+    :rtype: list of PolyResource subclass
+
+    """
+    from goldstone.core.models import User, Project, Group, Domain, Region, \
+        Endpoint, Service, Role
+
+    return [Domain, Project, Group, User, Region, Endpoint, Service, Role]
+
+
+def update_nodes(clouddata=None):
+    """Update the Resource graph's Keystone nodes from the current OpenStack
+    cloud state.
 
     Nodes are:
        - deleted if they are no longer in the OpenStack cloud.
        - added if they are in the OpenStack cloud, but not in the graph.
        - updated from the cloud if they are already in the graph.
 
+    :param clouddata: The resource types' clouddata() results, if they've
+                      already been collected. Types that are missing are
+                      queried here.
+    :type clouddata: dict of PolyResource subclass -> list, or None
+    :return: The uuids of the nodes that were deleted, added, or changed
+    :rtype: set of str
+
     """
-    from goldstone.core.models import User, Project, Group, Domain, Region, \
-        Endpoint, Service, Role
     from goldstone.core.utils import process_resource_type
 
-    for entry in [Domain, Project, Group, User, Region, Endpoint, Service,
-                  Role]:
-        process_resource_type(entry)
+    if clouddata is None:
+        clouddata = {}
+
+    changed = set()
+
+    for nodetype in node_types():
+        changed |= process_resource_type(nodetype, clouddata.get(nodetype))
+
+    return changed
@@ -12,14 +12,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+import logging
+import threading
+
 from django.conf import settings
 from elasticsearch_dsl import Search
 from elasticsearch_dsl.connections import connections
 import redis
 
-import json
-import logging
-
 logger = logging.getLogger(__name__)
 
 
@@ -38,9 +39,75 @@ def es_conn(server=settings.ES_SERVER):
     return connections.get_connection()
 
 
+# The cluster's index names, cached for settings.ES_INDICES_CACHE_TTL.
+_INDICES_CACHE = {"names": None, "expires": None, "day": None}
+_INDICES_LOCK = threading.Lock()
+
+
+def _all_indices(conn):
+    """Return the names of all of the cluster's indices.
+
+    The names are cached until they're settings.ES_INDICES_CACHE_TTL old, or
+    the day rolls over and a new set of daily indices is due. Until one of
+    today's indices exists, they're cached only for
+    settings.ES_INDICES_ROLLOVER_CACHE_TTL, so that the new indices are found
+    soon after they're created.
+
+    :type conn: Elasticsearch
+    :param conn: an ES connection object
+    :rtype: list of str
+
+    """
+    from datetime import datetime
+
+    now = datetime.now()
+    today = daily_index()
+
+    with _INDICES_LOCK:
+        if _INDICES_CACHE["names"] is None or \
+                now >= _INDICES_CACHE["expires"] or \
+                today != _INDICES_CACHE["day"]:
+            names = conn.indices.status()['indices'].keys()
+
+            lifetime = settings.ES_INDICES_CACHE_TTL
+
+            if not any(x.endswith(today) for x in names):
+                lifetime = min(lifetime,
+                               settings.ES_INDICES_ROLLOVER_CACHE_TTL)
+
+            _INDICES_CACHE.update({"names": set(names),
+                                   "expires": now + lifetime,
+                                   "day": today})
+
+        return list(_INDICES_CACHE["names"])
+
+
+def note_index(name):
+    """Record that an index exists, e.g., because we just wrote to it.
+
+    :type name: str
+    :param name: The index name
+
+    """
+
+    with _INDICES_LOCK:
+        if _INDICES_CACHE["names"] is not None:
+            _INDICES_CACHE["names"].add(name)
+
+
+def clear_indices_cache():
+    """Forget the cached index names, e.g., after indices are deleted."""
+
+    with _INDICES_LOCK:
+        _INDICES_CACHE["names"] = None
+
+
 def es_indices(prefix="", conn=None):
     """ es_indices gets a potentially filtered list of index names.
 
+    The cluster's index names are cached, so this usually doesn't make an ES
+    call.
+
     :type prefix: str
     :param prefix: the prefix to filter for
     :type conn: Elasticsearch
@@ -53,8 +120,7 @@ def es_indices(prefix="", conn=None):
         if conn is None:
             conn = es_conn()
 
-        all_indices = conn.indices.status()['indices'].keys()
-        return [i for i in all_indices if i.startswith(prefix)]
+        return [i for i in _all_indices(conn) if i.startswith(prefix)]
     else:
         return "_all"
 
@@ -89,6 +155,123 @@ class RedisConnection(object):
         self.conn = redis.StrictRedis(host=host, port=port, db=db)
 
 
+class BulkWriter(object):
+    """Buffer documents, and index them through the Elasticsearch bulk API.
+
+    The buffered documents are sent when there are settings.ES_BULK_FLUSH_SIZE
+    of them, when settings.ES_BULK_FLUSH_INTERVAL has passed since the last
+    send, or when flush() is called. The index isn't refreshed after a send,
+    so the documents become searchable on the cluster's normal refresh
+    schedule.
+
+    A document that ES rejects, or that's in a request that fails, is logged
+    and counted in self.failed, and the other documents are still sent. So
+    one bad document doesn't cost its caller the rest.
+
+    Use this as a context manager to send the remaining documents on exit.
+
+    """
+
+    def __init__(self, conn=None, size=None, interval=None):
+        """Initialize the object.
+
+        :param conn: An ES connection, or None to use the default connection
+        :type conn: Elasticsearch
+        :param size: The number of documents that triggers a send
+        :type size: int
+        :param interval: The time since the last send that triggers a send
+        :type interval: timedelta
+
+        """
+        from datetime import datetime
+
+        self.conn = conn if conn is not None else es_conn()
+        self.size = size or settings.ES_BULK_FLUSH_SIZE
+        self.interval = interval or settings.ES_BULK_FLUSH_INTERVAL
+
+        self.failed = 0
+
+        self._actions = []
+        self._flushed = datetime.now()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        """Send the remaining documents."""
+
+        if exc_type is None:
+            self.flush()
+        else:
+            # Don't mask the block's exception with a send error.
+            try:
+                self.flush()
+            except Exception:           # pylint: disable=W0703
+                logger.exception("failed to send buffered documents")
+
+    def add(self, index, doc_type, body, doc_id=None):
+        """Buffer a document, and send the buffer if it's time to.
+
+        :param index: The document's index
+        :type index: str
+        :param doc_type: The document's type
+        :type doc_type: str
+        :param body: The document
+        :type body: dict
+        :param doc_id: The document's id. If supplied, the document replaces
+                       any existing one with this id. Otherwise, ES assigns
+                       one
+        :type doc_id: str
+
+        """
+        from datetime import datetime
+
+        action = {"_index": index, "_type": doc_type, "_source": body}
+        if doc_id is not None:
+            action["_id"] = doc_id
+
+        self._actions.append(action)
+
+        if len(self._actions) >= self.size or \
+                datetime.now() - self._flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Send the buffered documents.
+
+        :return: The number of documents sent
+        :rtype: int
+
+        """
+        from datetime import datetime
+        from elasticsearch.helpers import bulk
+
+        actions, self._actions = self._actions, []
+        self._flushed = datetime.now()
+
+        if actions:
+            logger.debug("[flush] sending %d documents", len(actions))
+            _, errors = bulk(self.conn,
+                             actions,
+                             chunk_size=self.size,
+                             raise_on_error=False,
+                             raise_on_exception=False)
+
+            for error in errors:
+                info = error.values()[0]
+                logger.error("failed to index a %s document in %s: %s",
+                             info.get("_type"),
+                             info.get("_index"),
+                             info.get("error"))
+
+            self.failed += len(errors)
+
+            for index in set(x["_index"] for x in actions):
+                note_index(index)
+
+        return len(actions)
+
+
 class TopologyData(object):
     """A base class used by models that are really Elasticsearch entries, and
     not db tables."""
@@ -106,6 +289,9 @@ class TopologyData(object):
         self.search._doc_type = self._DOC_TYPE
         self.search._index = es_indices(self._INDEX_PREFIX, self.conn)
 
+        # The index names may be cached, so tolerate deleted ones.
+        self.search._params["ignore_unavailable"] = True
+
     @classmethod
     def _sort_arg(cls, key, order):
         """Return key as, key or -key, depending on the sort order."""
@@ -140,22 +326,30 @@ class TopologyData(object):
             logger.exception(exc)
             raise
 
-    def post(self, body, **_):
+    def post(self, body, writer=None, **_):
         """Post a record to the database.
 
+        The index isn't refreshed, so the record becomes searchable on the
+        cluster's normal refresh schedule.
+
         :arg body: record body as JSON object
+        :arg writer: If not None, the record is buffered in this writer
+                     instead of being sent now
+        :type writer: BulkWriter
         :arg _: Unused.
-        :return: id of the inserted record
+        :return: id of the inserted record, or None if it was buffered
 
         """
 
         logger.debug("post called with body = %s", json.dumps(body))
 
-        response = self.conn.create(
-            daily_index(self._INDEX_PREFIX),
-            self._DOC_TYPE,
-            body,
-            refresh=True)
+        if writer is not None:
+            writer.add(daily_index(self._INDEX_PREFIX), self._DOC_TYPE, body)
+            return None
+
+        index = daily_index(self._INDEX_PREFIX)
+        response = self.conn.create(index, self._DOC_TYPE, body)
+        note_index(index)
 
         logger.debug('[post] response = %s', json.dumps(response))
         return response['_id']
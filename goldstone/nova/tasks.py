@@ -29,6 +29,7 @@ from goldstone.nova.models import AgentsData, AggregatesData, \
     SecGroupsData, ServersData, ServicesData
 from goldstone.core.models import Host, MetricData
 from goldstone.celery import app as celery_app
+from goldstone.models import BulkWriter
 from goldstone.utils import get_region_for_nova_client
 
 
@@ -39,7 +40,7 @@ logger = logging.getLogger(__name__)
 def nova_hypervisors_stats():
     """Get stats from the nova API and add them as Goldstone metrics."""
     from goldstone.utils import get_nova_client
-    from goldstone.models import es_conn, daily_index
+    from goldstone.models import daily_index
 
     novaclient = get_nova_client()['client']
     response = \
@@ -47,41 +48,40 @@ def nova_hypervisors_stats():
     region = get_region_for_nova_client(novaclient)
     metric_prefix = 'nova.hypervisor.'
     now = arrow.utcnow()
-    conn = es_conn()
     es_index = daily_index(MetricData.INDEX_PREFIX)
     es_doc_type = MetricData._doc_type.name      # pylint: disable=W0212
 
-    for key, value in response.items():
-        doc = {
-            'type': es_doc_type,
-            'name': metric_prefix + key,
-            'value': value,
-            'metric_type': 'gauge',
-            '@timestamp': now.isoformat(),
-            'region': region
-        }
-
-        if key in ['disk_available_least', 'free_disk_gb', 'local_gb',
-                   'local_gb_used']:
-            doc['unit'] = 'GB'
-        elif key in ['free_ram_mb', 'memory_mb', 'memory_mb_used']:
-            doc['unit'] = 'MB'
-        else:
-            doc['unit'] = 'count'
-
-        conn.create(es_index, es_doc_type, doc)
-
-
-def _update_nova_records(rec_type, region, database, items):
+    with BulkWriter() as writer:
+        for key, value in response.items():
+            doc = {
+                'type': es_doc_type,
+                'name': metric_prefix + key,
+                'value': value,
+                'metric_type': 'gauge',
+                '@timestamp': now.isoformat(),
+                'region': region
+            }
+
+            if key in ['disk_available_least', 'free_disk_gb', 'local_gb',
+                       'local_gb_used']:
+                doc['unit'] = 'GB'
+            elif key in ['free_ram_mb', 'memory_mb', 'memory_mb_used']:
+                doc['unit'] = 'MB'
+            else:
+                doc['unit'] = 'count'
+
+            writer.add(es_index, es_doc_type, doc)
+
+
+def _update_nova_records(rec_type, region, database, items, writer=None):
     """Do the work for the discover_nova_topology task."""
     from goldstone.utils import to_es_date
 
-    # image list is a generator, so we need to make it not sol lazy it...
     body = {"@timestamp": to_es_date(arrow.utcnow().datetime),
             "region": region,
-            rec_type: [item.__dict__['_info'] for item in items]}
+            rec_type: items}
     try:
-        database.post(body)
+        database.post(body, writer=writer)
     except Exception:           # pylint: disable=W0703
         logging.exception("failed to index nova %s", rec_type)
 
@@ -94,61 +94,61 @@ def discover_nova_topology():
     :return: None
 
     """
-    from goldstone.utils import get_nova_client
-
-    nova_access = get_nova_client()
-
-    nova_client = nova_access['client']
-    nova_client.client.authenticate()
+    from goldstone.utils import get_nova_client, nova_listing
 
+    # The listings are shared with the resource graph's discovery.
+    nova_client = get_nova_client()['client']
     reg = get_region_for_nova_client(nova_client)
 
-    _update_nova_records("agents",
-                         reg,
-                         AgentsData(),
-                         nova_client.agents.list())
-    _update_nova_records("aggregates",
-                         reg,
-                         AggregatesData(),
-                         nova_client.aggregates.list())
-    _update_nova_records("availability_zones",
-                         reg,
-                         AvailZonesData(),
-                         nova_client.availability_zones.list())
-    _update_nova_records("cloudpipes",
-                         reg,
-                         CloudpipesData(),
-                         nova_client.cloudpipe.list())
-    _update_nova_records("flavors",
-                         reg,
-                         FlavorsData(),
-                         nova_client.flavors.list())
-    _update_nova_records("floating_ip_pools",
-                         reg,
-                         FloatingIpPoolsData(),
-                         nova_client.floating_ip_pools.list())
-    _update_nova_records("hosts", reg, HostsData(), nova_client.hosts.list())
-    _update_nova_records("hypervisors",
-                         reg,
-                         HypervisorsData(),
-                         nova_client.hypervisors.list())
-    _update_nova_records("networks",
-                         reg,
-                         NetworksData(),
-                         nova_client.networks.list())
-    _update_nova_records("secgroups",
-                         reg,
-                         SecGroupsData(),
-                         nova_client.security_groups.list())
-    _update_nova_records("servers",
-                         reg,
-                         ServersData(),
-                         nova_client.servers.list(
-                             search_opts={'all_tenants': 1}))
-    _update_nova_records("services",
-                         reg,
-                         ServicesData(),
-                         nova_client.services.list())
+    with BulkWriter() as writer:
+        _update_nova_records("agents",
+                             reg,
+                             AgentsData(),
+                             nova_listing("agents"), writer)
+        _update_nova_records("aggregates",
+                             reg,
+                             AggregatesData(),
+                             nova_listing("aggregates"), writer)
+        _update_nova_records("availability_zones",
+                             reg,
+                             AvailZonesData(),
+                             nova_listing("availability_zones"), writer)
+        _update_nova_records("cloudpipes",
+                             reg,
+                             CloudpipesData(),
+                             nova_listing("cloudpipe"), writer)
+        _update_nova_records("flavors",
+                             reg,
+                             FlavorsData(),
+                             nova_listing("flavors"), writer)
+        _update_nova_records("floating_ip_pools",
+                             reg,
+                             FloatingIpPoolsData(),
+                             nova_listing("floating_ip_pools"), writer)
+        _update_nova_records("hosts", reg, HostsData(), nova_listing("hosts"),
+                             writer)
+        _update_nova_records("hypervisors",
+                             reg,
+                             HypervisorsData(),
+                             nova_listing("hypervisors"), writer)
+        _update_nova_records("networks",
+                             reg,
+                             NetworksData(),
+                             nova_listing("networks"), writer)
+        _update_nova_records("secgroups",
+                             reg,
+                             SecGroupsData(),
+                             nova_listing("security_groups"), writer)
+        _update_nova_records("servers",
+                             reg,
+                             ServersData(),
+                             nova_listing("servers",
+                                          search_opts={'all_tenants': 1}),
+                             writer)
+        _update_nova_records("services",
+                             reg,
+                             ServicesData(),
+                             nova_listing("services"), writer)
 
 
 #
@@ -180,7 +180,7 @@ def reconcile_hosts():
     # Relations available here are service and zone, both are single values.
 
     hosts = get_nova_host_list()
-    incoming = frozenset([host.host_name for host in hosts])
+    incoming = frozenset([host["host_name"] for host in hosts])
     incoming = frozenset([parse_host_name(host_name)
                           for host_name in incoming])
     incoming_names = frozenset([item[0] for item in incoming])
@@ -202,13 +202,14 @@ def reconcile_hosts():
 
 
 def get_nova_host_list():
-    """Retrieve a list of hosts from nova."""
-    from goldstone.utils import get_nova_client
+    """Retrieve a list of hosts from nova.
+
+    :rtype: list of dict
+
+    """
+    from goldstone.utils import nova_listing
 
-    nova_access = get_nova_client()
-    nova_client = nova_access['client']
-    nova_client.client.authenticate()
-    return nova_client.hosts.list()
+    return nova_listing("hosts")
 
 
 def parse_host_name(host_name):
@@ -0,0 +1,126 @@
+"""Nova utilities tests."""
+# Copyright 2015 Solinea, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from django.test import SimpleTestCase
+from mock import patch, MagicMock
+from redis import ConnectionError
+
+from goldstone.utils import nova_listing
+
+
+class NovaListingTests(SimpleTestCase):
+    """Test the shared nova listings."""
+
+    @staticmethod
+    def _server(info):
+        """Return a mock nova resource."""
+
+        result = MagicMock()
+        result.to_dict.return_value = info
+        return result
+
+    @staticmethod
+    def _cloud(password="pw"):
+        """Return mock cloud credentials."""
+
+        return MagicMock(username="fred",
+                         password=password,
+                         tenant_name="tenant",
+                         auth_url="http://foo/v2.0/")
+
+    @patch("goldstone.utils.get_cloud")
+    @patch("goldstone.utils.get_nova_client")
+    @patch("goldstone.models.RedisConnection")
+    def test_shared(self, redis, get_nova_client, get_cloud):
+        """A listing is fetched once, and then read from redis."""
+
+        get_cloud.return_value = self._cloud()
+
+        store = {}
+        conn = redis.return_value.conn
+        conn.get.side_effect = store.get
+        conn.setex.side_effect = \
+            lambda key, lifetime, value: store.__setitem__(key, value)
+
+        servers = get_nova_client.return_value["client"].servers
+        servers.list.return_value = [self._server({"id": "a"}),
+                                     self._server({"id": "b"})]
+
+        for _ in range(2):
+            self.assertEqual(nova_listing("servers",
+                                          search_opts={"all_tenants": 1}),
+                             [{"id": "a"}, {"id": "b"}])
+
+        servers.list.assert_called_once_with(search_opts={"all_tenants": 1})
+        self.assertEqual(conn.lock.call_count, 2)
+
+        # Another cloud's listing isn't shared.
+        get_cloud.return_value = self._cloud(password="newpw")
+        nova_listing("servers", search_opts={"all_tenants": 1})
+        self.assertEqual(servers.list.call_count, 2)
+        self.assertEqual(len(store), 2)
+
+    @patch("goldstone.utils.get_cloud")
+    @patch("goldstone.utils.get_nova_client")
+    @patch("goldstone.models.RedisConnection")
+    def test_no_redis(self, redis, get_nova_client, get_cloud):
+        """If redis is unavailable, the listing is fetched directly."""
+
+        get_cloud.return_value = self._cloud()
+        redis.return_value.conn.lock.side_effect = ConnectionError
+
+        hosts = get_nova_client.return_value["client"].hosts
+        hosts.list.return_value = [self._server({"host_name": "a"})]
+
+        self.assertEqual(nova_listing("hosts"), [{"host_name": "a"}])
+        hosts.list.assert_called_once_with()
+
+    @patch("goldstone.utils.get_cloud")
+    @patch("goldstone.utils.get_nova_client")
+    @patch("goldstone.models.RedisConnection")
+    def test_lock_expired(self, redis, get_nova_client, get_cloud):
+        """If the lock expires during the API call, the listing is still
+        returned without being fetched again."""
+        from redis.exceptions import LockError
+
+        get_cloud.return_value = self._cloud()
+        conn = redis.return_value.conn
+        conn.get.return_value = None
+        conn.lock.return_value.release.side_effect = LockError
+
+        hosts = get_nova_client.return_value["client"].hosts
+        hosts.list.return_value = [self._server({"host_name": "a"})]
+
+        self.assertEqual(nova_listing("hosts"), [{"host_name": "a"}])
+        hosts.list.assert_called_once_with()
+        self.assertEqual(conn.setex.call_count, 1)
+
+    @patch("goldstone.utils.get_cloud")
+    @patch("goldstone.utils.get_nova_client")
+    @patch("goldstone.models.RedisConnection")
+    def test_lock_wait(self, redis, get_nova_client, get_cloud):
+        """If the lock isn't acquired in time, the listing is fetched
+        directly."""
+
+        get_cloud.return_value = self._cloud()
+        conn = redis.return_value.conn
+        conn.lock.return_value.acquire.return_value = False
+
+        hosts = get_nova_client.return_value["client"].hosts
+        hosts.list.return_value = [self._server({"host_name": "a"})]
+
+        self.assertEqual(nova_listing("hosts"), [{"host_name": "a"}])
+        hosts.list.assert_called_once_with()
+        self.assertFalse(conn.get.called)
+        self.assertFalse(conn.lock.return_value.release.called)
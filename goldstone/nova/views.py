@@ -316,7 +316,8 @@ class SpawnsAggView(DateHistogramAggView):
         """Meta."""
         model = SpawnsData
 
-    def get(self, request):
+    def _get_response(self, request):
+        """Return a response to a GET request."""
         from elasticsearch.exceptions import NotFoundError
 
         try:
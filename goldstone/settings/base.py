@@ -144,6 +144,17 @@ REDIS_PORT = str(os.environ.get('GOLDSTONE_REDIS_PORT', '6379'))
 REDIS_DB = str(os.environ.get('GOLDSTONE_REDIS_DB', '0'))
 REDIS_CONNECT_STR = 'redis://' + REDIS_HOST + ':' + REDIS_PORT + '/' + REDIS_DB
 
+# If True, the graph task publishes resource graph snapshots, and the web
+# workers load them instead of unpacking the graph themselves.
+RESOURCE_GRAPH_SNAPSHOTS = True
+
+# If set, the resource graph snapshots are shared through this file, instead
+# of being stored in redis. The web workers map the file read-only, so they
+# share one copy of the graph through the page cache. The celery and web
+# workers must then share a filesystem.
+RESOURCE_GRAPH_SNAPSHOT_FILE = \
+    os.environ.get('GOLDSTONE_RESOURCE_GRAPH_FILE', None)
+
 # Goldstone's User model.
 AUTH_USER_MODEL = "user.User"
 
@@ -166,8 +177,24 @@ CELERY_QUEUES = (
 DAILY_INDEX_CURATION_SCHEDULE = crontab(minute='0', hour='0', day_of_week='*')
 ES_GOLDSTONE_RETENTION = 30
 ES_LOGSTASH_RETENTION = 30
+ES_ROLLUP_RETENTION = 365
 TOPOLOGY_QUERY_INTERVAL = crontab(minute='*/2')
 RESOURCE_QUERY_INTERVAL = crontab(minute='*/2')
+ROLLUP_INTERVAL = crontab(minute='*')
+# The maximum number of concurrent OpenStack queries made by a resource graph
+# update.
+RESOURCE_CLOUDDATA_THREADS = 8
+# How long an OpenStack client object is reused, and how soon before its
+# token expires it's replaced.
+OPENSTACK_CLIENT_CACHE_TTL = timedelta(minutes=30)
+OPENSTACK_CLIENT_TOKEN_STALE = timedelta(minutes=5)
+# How long a nova listing is shared by the tasks and resource types that
+# need it. This should be shorter than the discovery interval.
+NOVA_LISTING_TTL = timedelta(seconds=60)
+# How long a nova listing's lock can be held, which must outlast a slow nova
+# API call; and how long other callers wait for it before listing directly.
+NOVA_LISTING_LOCK_TIMEOUT = timedelta(minutes=5)
+NOVA_LISTING_LOCK_WAIT = timedelta(minutes=2)
 HOST_AVAILABLE_PING_THRESHOLD = timedelta(seconds=300)
 HOST_AVAILABLE_PING_INTERVAL = crontab(minute='*/1')
 
@@ -192,6 +219,15 @@ CELERYBEAT_SCHEDULE = {
         'schedule': DAILY_INDEX_CURATION_SCHEDULE,
         'args': ('goldstone_metrics-', ES_LOGSTASH_RETENTION)
     },
+    'delete_goldstone_rollup_indices': {
+        'task': 'goldstone.core.tasks.delete_indices',
+        'schedule': DAILY_INDEX_CURATION_SCHEDULE,
+        'args': ('goldstone_rollup-', ES_ROLLUP_RETENTION)
+    },
+    'update_rollups': {
+        'task': 'goldstone.core.tasks.update_rollups',
+        'schedule': ROLLUP_INTERVAL
+    },
     'create_daily_index': {
         'task': 'goldstone.core.tasks.create_daily_index',
         'schedule': DAILY_INDEX_CURATION_SCHEDULE
@@ -303,6 +339,49 @@ ES_HOST = "127.0.0.1"
 ES_PORT = "9200"
 ES_SERVER = {'hosts': [ES_HOST + ":" + ES_PORT]}
 
+# A BulkWriter sends its buffered Elasticsearch documents when it has this
+# many, or when this much time has passed since its last send.
+ES_BULK_FLUSH_SIZE = 500
+ES_BULK_FLUSH_INTERVAL = timedelta(seconds=10)
+
+# How long the cluster's index names are cached.
+ES_INDICES_CACHE_TTL = timedelta(minutes=5)
+
+# How long they're cached when none of today's daily indices exist yet, e.g.,
+# just after the day rolls over.
+ES_INDICES_ROLLOVER_CACHE_TTL = timedelta(seconds=30)
+
+# How long a model's field mapping lookups are cached.
+ES_FIELD_MAPPING_CACHE_TTL = timedelta(minutes=10)
+
+# How long an API client's cursor pagination scroll, and its cursor token, are
+# kept alive between requests.
+ES_SCROLL_TIMEOUT = "1m"
+
+# The number of documents fetched per scroll request by a search export.
+ES_EXPORT_BATCH_SIZE = 1000
+
+# Whether aggregation responses are cached. A response whose time range
+# includes the live interval is reused for the interval, or AGG_CACHE_MAX_TTL
+# if the interval is longer. A response with only closed intervals is reused
+# for AGG_CACHE_CLOSED_TTL.
+AGG_CACHE_ENABLED = True
+AGG_CACHE_MAX_TTL = timedelta(seconds=60)
+AGG_CACHE_CLOSED_TTL = timedelta(hours=1)
+
+# The rollup tiers, as aggregation intervals. Each one is rolled up to
+# ROLLUP_DELAY ago, to give late documents time to arrive, and its last
+# ROLLUP_REROLL of buckets are rolled up again, to add documents that arrived
+# later. (A tier whose buckets are longer than ROLLUP_REROLL instead waits
+# ROLLUP_DELAY plus ROLLUP_REROLL, and rolls up each bucket once.) A new tier
+# is backfilled for ROLLUP_BACKFILL, and at most ROLLUP_MAX_SPAN is rolled up
+# per task run.
+ROLLUP_TIERS = ("1m", "1h")
+ROLLUP_DELAY = timedelta(minutes=2)
+ROLLUP_REROLL = timedelta(minutes=10)
+ROLLUP_BACKFILL = timedelta(days=1)
+ROLLUP_MAX_SPAN = timedelta(days=1)
+
 
 class ConstantDict(object):
     """An enumeration class with 'real' members and testing methods.
@@ -395,6 +474,11 @@ class ResourceAttribute(ConstantDict):
     # A callable(x, y). To find an edge from a starting node to a destination
     # node, This is called with the from_attr_dict and to_attr_dict.
     MATCHING_FN = "matchingattributes"
+    # Optional. A (from_key, to_key) tuple that states MATCHING_FN as an
+    # equality join, so that edges can be found through an index instead of
+    # by calling MATCHING_FN on every candidate. Each key is an attribute
+    # name, or a callable(attr_dict) that returns the value to join on.
+    JOIN_KEYS = "joinkeys"
 
 # We need this because classes aren't imported via "from django.conf import
 # settings."
@@ -29,6 +29,14 @@ SECRET_KEY = 'test%u*@8-qcj=se3v430@xp!e&^)@e+s1*3oe=3ka)r$fk_a-1$%&'
 
 NOTIFICATION_SENDER = "notify@solinea.com"
 
+# Compute every aggregation, so that view tests don't see each other's
+# responses.
+AGG_CACHE_ENABLED = False
+
+# Build the resource graph from the test database, and don't publish test
+# graphs. The snapshot tests turn this on, with redis mocked out.
+RESOURCE_GRAPH_SNAPSHOTS = False
+
 JENKINS_TASKS = (
     'django_jenkins.tasks.with_coverage',
 )
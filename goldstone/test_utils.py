@@ -14,6 +14,7 @@
 # limitations under the License.
 from django.contrib.auth import get_user_model
 from django.test import SimpleTestCase
+from django.test.utils import override_settings
 from rest_framework.status import HTTP_200_OK
 
 # Test URLs.
@@ -45,6 +46,9 @@ BAD_TOKEN = '4' * 40
 BAD_UUID = '4' * 32
 
 
+# The tests may be run with a development environment's settings. The resource
+# graph must still come from the test database, not a published snapshot.
+@override_settings(RESOURCE_GRAPH_SNAPSHOTS=False)
 class Setup(SimpleTestCase):
     """A base class to do housekeeping before each test."""
 
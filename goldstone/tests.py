@@ -12,13 +12,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from datetime import timedelta
+import os
+import sys
+
 import arrow
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import SimpleTestCase
 from elasticsearch import Elasticsearch
-import os
-import sys
 
 # This is needed here for mock to work.
 from elasticsearch.client import IndicesClient
@@ -26,7 +28,8 @@ from elasticsearch_dsl.connections import connections, Connections
 from mock import patch
 import mock
 
-from goldstone.models import es_conn, daily_index, es_indices, TopologyData
+from goldstone.models import es_conn, daily_index, es_indices, \
+    TopologyData, BulkWriter, clear_indices_cache, note_index
 from goldstone.tenants.models import Tenant
 from goldstone.test_utils import Setup
 
@@ -157,6 +160,7 @@ class ElasticSearchTests(SimpleTestCase):
             }
         }
         m_conn.return_value = m_es
+        clear_indices_cache()
 
         # test with no prefix provided
         self.assertEqual(es_indices(conn=es_conn()), "_all")
@@ -175,6 +179,41 @@ class ElasticSearchTests(SimpleTestCase):
         self.assertIn('index1', result)
         self.assertNotIn('not_index1', result)
 
+        # The index names were cached.
+        self.assertEqual(m_es.indices.status.call_count, 1)
+
+        # A noted index is added to the cache.
+        note_index('index2')
+        self.assertIn('index2', es_indices('index'))
+        self.assertEqual(m_es.indices.status.call_count, 1)
+
+        # Clearing the cache re-reads the index names.
+        clear_indices_cache()
+        self.assertNotIn('index2', es_indices('index'))
+        self.assertEqual(m_es.indices.status.call_count, 2)
+
+        # So does an expired cache entry.
+        with self.settings(ES_INDICES_CACHE_TTL=timedelta(0)):
+            clear_indices_cache()
+            es_indices('index')
+            es_indices('index')
+            self.assertEqual(m_es.indices.status.call_count, 4)
+
+        # Until one of today's indices exists, the names are cached briefly.
+        with self.settings(ES_INDICES_ROLLOVER_CACHE_TTL=timedelta(0)):
+            clear_indices_cache()
+            es_indices('index')
+            es_indices('index')
+            self.assertEqual(m_es.indices.status.call_count, 6)
+
+            m_es.indices.status.return_value['indices'][
+                daily_index('index-')] = 'value4'
+            es_indices('index')
+            es_indices('index')
+            self.assertEqual(m_es.indices.status.call_count, 7)
+
+        clear_indices_cache()
+
 
 class TopologyDataTest(SimpleTestCase):
     """Topology data tests."""
@@ -190,3 +229,198 @@ class TopologyDataTest(SimpleTestCase):
         self.assertEquals(TopologyData._sort_arg("key", "asc"), "key")
         self.assertEquals(TopologyData._sort_arg("key", "-"), "-key")
         self.assertEquals(TopologyData._sort_arg("key", "desc"), "-key")
+
+
+class BulkWriterTest(SimpleTestCase):
+    """Elasticsearch bulk writer tests."""
+
+    @patch("elasticsearch.helpers.bulk")
+    def test_flush(self, bulk):
+        """Documents are sent when the buffer fills, and on exit."""
+
+        bulk.return_value = (2, [])
+        conn = mock.Mock()
+
+        with BulkWriter(conn, size=2, interval=timedelta(hours=1)) as writer:
+            writer.add("index", "type", {"a": 1})
+            self.assertEqual(bulk.call_count, 0)
+
+            writer.add("index", "type", {"a": 2})
+            self.assertEqual(bulk.call_count, 1)
+            self.assertEqual(
+                bulk.call_args[0],
+                (conn,
+                 [{"_index": "index", "_type": "type", "_source": {"a": 1}},
+                  {"_index": "index", "_type": "type", "_source": {"a": 2}}]))
+
+            writer.add("index", "type", {"a": 3})
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(len(bulk.call_args[0][1]), 1)
+
+        # An empty buffer isn't sent.
+        self.assertEqual(writer.flush(), 0)
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(writer.failed, 0)
+
+    @patch("elasticsearch.helpers.bulk")
+    def test_failed(self, bulk):
+        """Documents that fail are counted, and don't raise an exception."""
+
+        bulk.return_value = \
+            (1, [{"index": {"_index": "index",
+                            "_type": "type",
+                            "status": 400,
+                            "error": "MapperParsingException"}}])
+
+        with BulkWriter(mock.Mock(), size=2) as writer:
+            writer.add("index", "type", {"a": 1})
+            writer.add("index", "type", {"a": "b"})
+            writer.add("index", "type", {"a": 3})
+
+        self.assertEqual(bulk.call_count, 2)
+        self.assertEqual(bulk.call_args[1]["raise_on_error"], False)
+        self.assertEqual(writer.failed, 2)
+
+    @patch("elasticsearch.helpers.bulk")
+    def test_post(self, bulk):
+        """TopologyData.post buffers its record in a writer."""
+
+        class Data(TopologyData):
+            """A topology record type."""
+
+            _INDEX_PREFIX = "prefix"
+            _DOC_TYPE = "type"
+
+        bulk.return_value = (1, [])
+        conn = mock.Mock()
+        data = Data()
+        data.conn = conn
+
+        with BulkWriter(mock.Mock()) as writer:
+            self.assertIsNone(data.post({"a": 1}, writer=writer))
+
+        self.assertEqual(conn.create.call_count, 0)
+        self.assertEqual(bulk.call_count, 1)
+        self.assertEqual(bulk.call_args[0][1][0]["_type"], "type")
+
+
+class ClientCacheTest(SimpleTestCase):
+    """OpenStack client caching tests."""
+
+    def setUp(self):
+        """Run before every test."""
+        from goldstone.utils import clear_client_cache
+
+        clear_client_cache()
+
+    tearDown = setUp
+
+    @patch("goldstone.utils.nvclient")
+    @patch("goldstone.utils.get_cloud")
+    def test_reuse(self, get_cloud, nvclient):
+        """A client is reused until its cache entry expires, or the
+        credentials change."""
+        from goldstone.utils import get_nova_client
+
+        get_cloud.return_value = mock.Mock(username="fred",
+                                           password="pw",
+                                           tenant_name="tenant",
+                                           auth_url="http://foo/v2.0/")
+        nvclient.Client.return_value.auth_ref = None
+
+        first = get_nova_client()
+        self.assertIs(get_nova_client(), first)
+        self.assertEqual(nvclient.Client.call_count, 1)
+        self.assertEqual(nvclient.Client.return_value.authenticate.call_count,
+                         1)
+
+        # The credentials change.
+        get_cloud.return_value.password = "newpw"
+        get_nova_client()
+        self.assertEqual(nvclient.Client.call_count, 2)
+
+        # The cache entry expires.
+        with self.settings(OPENSTACK_CLIENT_CACHE_TTL=timedelta(0)):
+            self.setUp()
+            get_nova_client()
+            get_nova_client()
+            self.assertEqual(nvclient.Client.call_count, 4)
+
+    @patch("goldstone.utils.ksclient")
+    @patch("goldstone.utils.get_cloud")
+    def test_token_expiring(self, get_cloud, ksclient):
+        """A client whose token will soon expire is replaced."""
+        from goldstone.utils import get_keystone_client
+
+        get_cloud.return_value = mock.Mock(username="fred",
+                                           password="pw",
+                                           tenant_name="tenant",
+                                           auth_url="http://foo/v2.0/")
+        auth_ref = ksclient.Client.return_value.auth_ref
+
+        auth_ref.will_expire_soon.return_value = False
+        get_keystone_client()
+        get_keystone_client()
+        self.assertEqual(ksclient.Client.call_count, 1)
+
+        auth_ref.will_expire_soon.return_value = True
+        get_keystone_client()
+        self.assertEqual(ksclient.Client.call_count, 2)
+
+    @patch("goldstone.utils.get_region_for_glance_client")
+    @patch("goldstone.utils.glclient")
+    @patch("goldstone.utils.ksclient")
+    @patch("goldstone.utils.get_cloud")
+    def test_token_only(self, get_cloud, ksclient, glclient, _):
+        """A client that was given a keystone token is replaced before the
+        token expires."""
+        from goldstone.utils import get_glance_client
+
+        get_cloud.return_value = mock.Mock(username="fred",
+                                           password="pw",
+                                           tenant_name="tenant",
+                                           auth_url="http://foo/v2.0/")
+        glclient.Client.return_value.auth_ref = None
+        auth_ref = ksclient.Client.return_value.auth_ref
+        auth_ref.will_expire_soon.return_value = False
+
+        # The token outlives the stale duration.
+        auth_ref.expires = \
+            arrow.utcnow().replace(minutes=+10).datetime + \
+            settings.OPENSTACK_CLIENT_TOKEN_STALE
+        get_glance_client()
+        get_glance_client()
+        self.assertEqual(glclient.Client.call_count, 1)
+
+        # The token is near expiry.
+        self.setUp()
+        auth_ref.expires = \
+            arrow.utcnow().replace(minutes=-1).datetime + \
+            settings.OPENSTACK_CLIENT_TOKEN_STALE
+        get_glance_client()
+        get_glance_client()
+        self.assertEqual(glclient.Client.call_count, 3)
+
+    @patch("goldstone.utils.nvclient")
+    @patch("goldstone.utils.get_cloud")
+    def test_unlocked_create(self, get_cloud, nvclient):
+        """The cache's lock isn't held while a client authenticates."""
+        from goldstone.utils import get_nova_client, _CLIENT_CACHE_LOCK
+
+        def authenticate():
+            """Check that the cache's lock is free."""
+
+            self.assertTrue(_CLIENT_CACHE_LOCK.acquire(False))
+            _CLIENT_CACHE_LOCK.release()
+
+        get_cloud.return_value = mock.Mock(username="fred",
+                                           password="pw",
+                                           tenant_name="tenant",
+                                           auth_url="http://foo/v2.0/")
+        nvclient.Client.return_value.auth_ref = None
+        nvclient.Client.return_value.authenticate.side_effect = authenticate
+
+        get_nova_client()
+        self.assertEqual(nvclient.Client.return_value.authenticate.call_count,
+                         1)
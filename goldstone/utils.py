@@ -12,9 +12,16 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from datetime import datetime
+from hashlib import sha256
+import json
+import logging
 import socket
+import threading
 
 import cinderclient.v2.services
+from django.conf import settings
+from django.utils import timezone
 from keystoneclient.v3 import client as ksclient
 from novaclient.v2 import client as nvclient
 from cinderclient.v2 import client as ciclient
@@ -29,6 +36,8 @@ from cinderclient.openstack.common.apiclient.exceptions \
 from neutronclient.common.exceptions import Unauthorized as NeutronUnauthorized
 from rest_framework.exceptions import PermissionDenied
 
+logger = logging.getLogger(__name__)
+
 
 def _patched_cinder_service_repr(self):
     """Hacking in a patch for the cinder service __repr__ method."""
@@ -145,10 +154,16 @@ def _v2_auth_url(auth_url):
         raise GoldstoneAuthError("Unknown os_auth_url version: %s", auth_url)
 
 
-def get_client(service):
-    """Return a client object and authorization token.
+def _new_client(service, cloud):
+    """Return a new, authenticated client object and authorization token.
 
-    :rtype: dict
+    :param service: The OpenStack service
+    :type service: str
+    :param cloud: The OpenStack cloud's credentials
+    :type cloud: Cloud
+    :return: The client dict, and for a client that was given a bare token,
+             the keystone access info that the token came from
+    :rtype: tuple of (dict, AccessInfo or None)
 
     """
     from goldstone.neutron.utils import get_neutron_client
@@ -158,52 +173,46 @@ def get_client(service):
               " goldstone settings."
 
     try:
-        cloud = get_cloud()
-        os_username = cloud.username
-        os_password = cloud.password
-        os_tenant_name = cloud.tenant_name
-        os_auth_url = cloud.auth_url
-
         if service == 'keystone':
             client = ksclient.Client(
-                username=os_username,
-                password=os_password,
-                tenant_name=os_tenant_name,
-                auth_url=_v3_auth_url(os_auth_url))
+                username=cloud.username,
+                password=cloud.password,
+                tenant_name=cloud.tenant_name,
+                auth_url=_v3_auth_url(cloud.auth_url))
 
             if client.auth_token is None:
                 raise GoldstoneAuthError("Keystone client call succeeded, but "
                                          "auth token was not returned.  Check "
                                          "credentials in goldstone settings.")
             else:
-                return {'client': client, 'hex_token': client.auth_token}
+                return {'client': client, 'hex_token': client.auth_token}, \
+                    None
 
         elif service == 'nova':
-            client = nvclient.Client(
-                os_username,
-                os_password,
-                os_tenant_name,
-                _v2_auth_url(os_auth_url))
+            nova = nvclient.Client(cloud.username,
+                                   cloud.password,
+                                   cloud.tenant_name,
+                                   _v2_auth_url(cloud.auth_url))
 
-            client.authenticate()
-            return {'client': client, 'hex_token': client.client.auth_token}
+            nova.authenticate()
+            return {'client': nova, 'hex_token': nova.client.auth_token}, None
 
         elif service == 'cinder':
             cinderclient.v2.services.Service.__repr__ = \
                 _patched_cinder_service_repr
-            client = ciclient.Client(os_username,
-                                     os_password,
-                                     os_tenant_name,
-                                     _v2_auth_url(os_auth_url))
-            region = _get_region_for_cinder_client(client)
-            return {'client': client, 'region': region}
+            cinder = ciclient.Client(cloud.username,
+                                     cloud.password,
+                                     cloud.tenant_name,
+                                     _v2_auth_url(cloud.auth_url))
+            region = _get_region_for_cinder_client(cinder)
+            return {'client': cinder, 'region': region}, None
 
         elif service == 'neutron':
-            client = get_neutron_client(os_username,
-                                        os_password,
-                                        os_tenant_name,
-                                        _v3_auth_url(os_auth_url))
-            return {'client': client}
+            neutron = get_neutron_client(cloud.username,
+                                         cloud.password,
+                                         cloud.tenant_name,
+                                         _v3_auth_url(cloud.auth_url))
+            return {'client': neutron}, None
 
         elif service == 'glance':
             keystoneclient = get_client("keystone")['client']
@@ -218,9 +227,10 @@ def get_client(service):
                                               interface="admin").url
 
             region = get_region_for_glance_client(keystoneclient)
-            client = glclient.Client(endpoint=mgmt_url,
+            glance = glclient.Client(endpoint=mgmt_url,
                                      token=keystoneclient.auth_token)
-            return {'client': client, 'region': region}
+            return {'client': glance, 'region': region}, \
+                keystoneclient.auth_ref
 
         else:
             raise GoldstoneAuthError("Unknown service")
@@ -230,6 +240,196 @@ def get_client(service):
         raise GoldstoneAuthError(NO_AUTH % service.capitalize())
 
 
+# The cached clients. (service, cloud credentials) -> (expiration time,
+# get_client() result). The lock guards only the dict; clients are created
+# outside of it.
+_CLIENT_CACHE = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+
+
+def clear_client_cache():
+    """Discard all the cached OpenStack clients."""
+
+    with _CLIENT_CACHE_LOCK:
+        _CLIENT_CACHE.clear()
+
+
+def _token_expiring(client):
+    """Return True if a client's authorization token will expire soon.
+
+    Only clients that have an auth_ref can tell. For others, we rely on the
+    cache's lifetime.
+
+    """
+
+    auth_ref = getattr(client, "auth_ref", None)
+
+    return auth_ref is not None and \
+        auth_ref.will_expire_soon(
+            stale_duration=int(
+                settings.OPENSTACK_CLIENT_TOKEN_STALE.total_seconds()))
+
+
+def _cache_expiration(auth_ref):
+    """Return when a new cache entry should expire.
+
+    A client that was given a bare token can't re-authenticate, and has no
+    auth_ref of its own, so its entry must expire before the token does.
+
+    :param auth_ref: The keystone access info of a bare token, or None
+    :type auth_ref: AccessInfo or None
+    :return: A naive UTC time
+    :rtype: datetime
+
+    """
+
+    result = datetime.utcnow() + settings.OPENSTACK_CLIENT_CACHE_TTL
+
+    if auth_ref is not None and auth_ref.expires is not None:
+        expires = timezone.make_naive(auth_ref.expires, timezone.utc) - \
+            settings.OPENSTACK_CLIENT_TOKEN_STALE
+        result = min(result, expires)
+
+    return result
+
+
+def get_client(service):
+    """Return a client object and authorization token.
+
+    Clients are cached per process, keyed by the cloud's credentials, and
+    reused until settings.OPENSTACK_CLIENT_CACHE_TTL has passed or their token
+    is about to expire. (For a client that was given a keystone token, that's
+    the keystone token.) A reused client reuses its authorization token and its
+    pooled HTTP connections, so a process authenticates once per service
+    instead of once per call.
+
+    A new client is created outside of the cache's lock, so that a slow
+    authentication doesn't hold up other services' callers. If two threads
+    miss the cache at once, both create a client and the last one is cached.
+
+    :param service: The OpenStack service
+    :type service: str
+    :rtype: dict
+
+    """
+
+    cloud = get_cloud()
+    key = (service,
+           cloud.username,
+           cloud.password,
+           cloud.tenant_name,
+           cloud.auth_url)
+
+    with _CLIENT_CACHE_LOCK:
+        entry = _CLIENT_CACHE.get(key)
+
+    if entry is not None and entry[0] > datetime.utcnow() and \
+            not _token_expiring(entry[1].get("client")):
+        return entry[1]
+
+    result, auth_ref = _new_client(service, cloud)
+
+    with _CLIENT_CACHE_LOCK:
+        _CLIENT_CACHE[key] = (_cache_expiration(auth_ref), result)
+
+    return result
+
+
+# The redis key under which a nova listing is shared. It's formatted with a
+# hash of the cloud's credentials, the collection name, and the list()
+# arguments.
+NOVA_LISTING_KEY = "goldstone:nova:listing:%s:%s:%s"
+
+
+def nova_listing(collection, **kwargs):
+    """Return the entries of a nova collection, as dicts.
+
+    A discovery cycle lists some collections more than once; e.g., the
+    topology task and several resource types list the servers. So a listing
+    is shared through redis for settings.NOVA_LISTING_TTL, and a lock makes
+    concurrent callers wait for the first one's API call instead of making
+    their own. A caller waits at most settings.NOVA_LISTING_LOCK_WAIT, and
+    then lists the collection itself. If redis is unavailable, the collection
+    is listed directly.
+
+    Listings are shared per cloud, keyed by a hash of its credentials, so
+    that different credentials never see each other's listings.
+
+    :param collection: The name of a nova client manager, e.g., "servers"
+    :type collection: str
+    :param kwargs: The manager's list() arguments
+    :return: The entries' to_dict() values. These are new objects, which the
+             caller may modify.
+    :rtype: list of dict
+
+    """
+    from redis import RedisError
+    from redis.exceptions import LockError
+    from goldstone.models import RedisConnection
+
+    def fetch():
+        """Return the listing from the nova API."""
+
+        client = get_nova_client()["client"]
+        return [x.to_dict()
+                for x in getattr(client, collection).list(**kwargs)]
+
+    cloud = get_cloud()
+    identity = sha256(json.dumps([cloud.username,
+                                  cloud.password,
+                                  cloud.tenant_name,
+                                  cloud.auth_url])).hexdigest()
+
+    key = NOVA_LISTING_KEY % (identity,
+                              collection,
+                              json.dumps(kwargs, sort_keys=True))
+    lifetime = int(settings.NOVA_LISTING_TTL.total_seconds())
+
+    try:
+        conn = RedisConnection().conn
+        lock = conn.lock(
+            key + ":lock",
+            timeout=int(settings.NOVA_LISTING_LOCK_TIMEOUT.total_seconds()),
+            blocking_timeout=settings.NOVA_LISTING_LOCK_WAIT.total_seconds())
+
+        if not lock.acquire():
+            logger.warning("Timed out waiting for the nova %s listing",
+                           collection)
+            return fetch()
+
+    except RedisError:
+        logger.warning("Couldn't share the nova %s listing", collection,
+                       exc_info=True)
+        return fetch()
+
+    result = None
+
+    try:
+        cached = conn.get(key)
+
+        if cached is not None:
+            result = json.loads(cached)
+        else:
+            result = fetch()
+            conn.setex(key, lifetime, json.dumps(result))
+
+    except RedisError:
+        logger.warning("Couldn't share the nova %s listing", collection,
+                       exc_info=True)
+
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # The lock expired while we held it. The listing is still good.
+            logger.warning("The nova %s listing's lock expired", collection)
+        except RedisError:
+            logger.warning("Couldn't release the nova %s listing's lock",
+                           collection, exc_info=True)
+
+    return fetch() if result is None else result
+
+
 def django_admin_only(wrapped_function):
     """A decorator that raises an exception if self.request.user is not a
     superuser, i.e., a Django admin."""